@@ -17,6 +17,11 @@ from app.models.transaction import Transaction
 from app.models.audit_log import AuditLog
 from app.models.bank_settings import BankSettings
 from app.models.loan import Loan
+from app.models.kibor_fixing import KiborFixing, KiborFixingsVersion
+from app.models.backfill_job import BackfillJob
+from app.models.kibor_coverage import LoanKiborCoverage
+from app.models.principal_total import LoanPrincipalTotal
+from app.models.loan_tranche import LoanTranche
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -0,0 +1,80 @@
+"""Market-wide KIBOR fixings shared by all banks.
+
+Revision ID: 0007_kibor_fixings
+Revises: 0006_rate_precision
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_kibor_fixings"
+down_revision = "0006_rate_precision"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "kibor_fixings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("effective_date", sa.Date(), nullable=False),
+        sa.Column("tenor_months", sa.Integer(), nullable=False),
+        sa.Column("rate", sa.Numeric(12, 6), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.UniqueConstraint("effective_date", "tenor_months", name="uq_kibor_fixings_date_tenor"),
+    )
+    op.create_index("ix_kibor_fixings_effective_date", "kibor_fixings", ["effective_date"])
+
+    # The most common value per (date, tenor) across banks becomes the fixing.
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO kibor_fixings (effective_date, tenor_months, rate)
+            SELECT effective_date, tenor_months, annual_rate_percent
+            FROM (
+              SELECT
+                effective_date,
+                tenor_months,
+                annual_rate_percent,
+                row_number() OVER (
+                  PARTITION BY effective_date, tenor_months
+                  ORDER BY count(*) DESC, min(id) ASC
+                ) AS rn
+              FROM rates
+              GROUP BY effective_date, tenor_months, annual_rate_percent
+            ) ranked
+            WHERE rn = 1;
+            """
+        )
+    )
+
+    # Rows equal to the fixing are duplicates; anything else stays as a bank override.
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM rates r
+            USING kibor_fixings f
+            WHERE r.effective_date = f.effective_date
+              AND r.tenor_months = f.tenor_months
+              AND r.annual_rate_percent = f.rate;
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO rates (bank_id, tenor_months, effective_date, annual_rate_percent)
+            SELECT b.id, f.tenor_months, f.effective_date, f.rate
+            FROM kibor_fixings f
+            CROSS JOIN banks b
+            ON CONFLICT (bank_id, tenor_months, effective_date) DO NOTHING;
+            """
+        )
+    )
+    op.drop_index("ix_kibor_fixings_effective_date", table_name="kibor_fixings")
+    op.drop_table("kibor_fixings")
@@ -0,0 +1,47 @@
+"""Durable KIBOR backfill job queue.
+
+Revision ID: 0008_backfill_jobs
+Revises: 0007_kibor_fixings
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_backfill_jobs"
+down_revision = "0007_kibor_fixings"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backfill_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bank_id", sa.Integer(), sa.ForeignKey("banks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("total_days", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("processed_days", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_processed_date", sa.Date(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="5"),
+        sa.Column("run_after", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("locked_by", sa.String(length=64), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("message", sa.String(length=512), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.UniqueConstraint("loan_id", name="uq_backfill_jobs_loan"),
+    )
+    op.create_index("ix_backfill_jobs_bank_id", "backfill_jobs", ["bank_id"])
+    op.create_index("ix_backfill_jobs_status_run_after", "backfill_jobs", ["status", "run_after"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_backfill_jobs_status_run_after", table_name="backfill_jobs")
+    op.drop_index("ix_backfill_jobs_bank_id", table_name="backfill_jobs")
+    op.drop_table("backfill_jobs")
@@ -0,0 +1,35 @@
+"""Per-loan KIBOR coverage record used by is_ready.
+
+Revision ID: 0009_loan_kibor_coverage
+Revises: 0008_backfill_jobs
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_loan_kibor_coverage"
+down_revision = "0008_backfill_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows are computed lazily on the first is_ready check for each loan.
+    op.create_table(
+        "loan_kibor_coverage",
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("bank_id", sa.Integer(), sa.ForeignKey("banks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("covered_through", sa.Date(), nullable=False),
+        sa.Column("missing_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("missing_dates", sa.JSON(), nullable=True),
+        sa.Column("stale", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+    op.create_index("ix_loan_kibor_coverage_bank_id", "loan_kibor_coverage", ["bank_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loan_kibor_coverage_bank_id", table_name="loan_kibor_coverage")
+    op.drop_table("loan_kibor_coverage")
@@ -0,0 +1,22 @@
+"""Composite (loan_id, date, id) index for paginated transaction lists.
+
+Revision ID: 0010_transactions_keyset_index
+Revises: 0009_loan_kibor_coverage
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "0010_transactions_keyset_index"
+down_revision = "0009_loan_kibor_coverage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_transactions_loan_date_id", "transactions", ["loan_id", "date", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_loan_date_id", table_name="transactions")
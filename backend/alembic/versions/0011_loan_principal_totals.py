@@ -0,0 +1,43 @@
+"""Per-loan running principal total for max-loan checks and balance reads.
+
+Revision ID: 0011_loan_principal_totals
+Revises: 0010_transactions_keyset_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_loan_principal_totals"
+down_revision = "0010_transactions_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "loan_principal_totals",
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("bank_id", sa.Integer(), sa.ForeignKey("banks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("principal_total", sa.Numeric(16, 2), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+    op.create_index("ix_loan_principal_totals_bank_id", "loan_principal_totals", ["bank_id"])
+
+    # Seed every existing loan so the first write after the upgrade only locks.
+    op.execute(
+        """
+        INSERT INTO loan_principal_totals (loan_id, bank_id, principal_total)
+        SELECT l.id, l.bank_id, COALESCE(SUM(t.amount), 0)
+        FROM loans l
+        LEFT JOIN transactions t
+          ON t.loan_id = l.id AND t.bank_id = l.bank_id AND t.category = 'principal'
+        GROUP BY l.id, l.bank_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loan_principal_totals_bank_id", table_name="loan_principal_totals")
+    op.drop_table("loan_principal_totals")
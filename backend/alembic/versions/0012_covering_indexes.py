@@ -0,0 +1,63 @@
+"""Composite covering indexes for ledger, balance and rate reads.
+
+Revision ID: 0012_covering_indexes
+Revises: 0011_loan_principal_totals
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_covering_indexes"
+down_revision = "0011_loan_principal_totals"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (bank_id, loan_id, date, id) serves the ledger, reports and keyset pages
+    # in order without a sort; amount and category ride along so principal
+    # sums are index-only scans.
+    op.create_index(
+        "ix_transactions_bank_loan_date_id",
+        "transactions",
+        ["bank_id", "loan_id", "date", "id"],
+        postgresql_include=["category", "amount"],
+    )
+    op.create_index(
+        "ix_transactions_drawdowns",
+        "transactions",
+        ["bank_id", "loan_id", "date"],
+        postgresql_where=sa.text("category = 'principal' AND amount > 0"),
+    )
+    op.create_index(
+        "ix_rates_bank_tenor_date_rate",
+        "rates",
+        ["bank_id", "tenor_months", "effective_date"],
+        postgresql_include=["annual_rate_percent"],
+    )
+    op.create_index(
+        "ix_kibor_fixings_tenor_date_rate",
+        "kibor_fixings",
+        ["tenor_months", "effective_date"],
+        postgresql_include=["rate"],
+    )
+
+    # Each of these is a prefix of (or superseded by) an index above.
+    op.drop_index("ix_transactions_loan_date_id", table_name="transactions")
+    op.drop_index("ix_transactions_bank_id", table_name="transactions")
+    op.drop_index("ix_rates_bank_id", table_name="rates")
+    op.drop_index("ix_rates_tenor_months", table_name="rates")
+
+
+def downgrade() -> None:
+    op.create_index("ix_rates_tenor_months", "rates", ["tenor_months"])
+    op.create_index("ix_rates_bank_id", "rates", ["bank_id"])
+    op.create_index("ix_transactions_bank_id", "transactions", ["bank_id"])
+    op.create_index("ix_transactions_loan_date_id", "transactions", ["loan_id", "date", "id"])
+
+    op.drop_index("ix_kibor_fixings_tenor_date_rate", table_name="kibor_fixings")
+    op.drop_index("ix_rates_bank_tenor_date_rate", table_name="rates")
+    op.drop_index("ix_transactions_drawdowns", table_name="transactions")
+    op.drop_index("ix_transactions_bank_loan_date_id", table_name="transactions")
@@ -0,0 +1,27 @@
+"""Per-loan and per-bank data versions for conditional GETs.
+
+Revision ID: 0013_data_versions
+Revises: 0012_covering_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_data_versions"
+down_revision = "0012_covering_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("banks", "loans"):
+        op.add_column(table, sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+        op.add_column(table, sa.Column("data_updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")))
+
+
+def downgrade() -> None:
+    for table in ("loans", "banks"):
+        op.drop_column(table, "data_updated_at")
+        op.drop_column(table, "data_version")
@@ -0,0 +1,39 @@
+"""Locked KIBOR base rate on drawdown transactions.
+
+Revision ID: 0014_transactions_kibor_rate
+Revises: 0013_data_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014_transactions_kibor_rate"
+down_revision = "0013_data_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("kibor_rate_percent", sa.Numeric(12, 6), nullable=True))
+
+    # Same rule as services.locked_rates: an override on the drawdown date wins
+    # over the fixing; drawdowns with neither stay NULL until one lands.
+    op.execute(
+        """
+        UPDATE transactions AS t
+        SET kibor_rate_percent = COALESCE(
+            (SELECT r.annual_rate_percent FROM rates r
+             WHERE r.bank_id = t.bank_id AND r.tenor_months = l.kibor_tenor_months AND r.effective_date = t.date),
+            (SELECT f.rate FROM kibor_fixings f
+             WHERE f.tenor_months = l.kibor_tenor_months AND f.effective_date = t.date)
+        )
+        FROM loans l
+        WHERE l.id = t.loan_id AND t.category = 'principal' AND t.amount > 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("transactions", "kibor_rate_percent")
@@ -0,0 +1,94 @@
+"""Persisted FIFO tranche book per loan.
+
+Revision ID: 0015_loan_tranches
+Revises: 0014_transactions_kibor_rate
+Create Date: 2026-10-19
+"""
+
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_loan_tranches"
+down_revision = "0014_transactions_kibor_rate"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tranches = op.create_table(
+        "loan_tranches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bank_id", sa.Integer(), sa.ForeignKey("banks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("loan_id", sa.Integer(), sa.ForeignKey("loans.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "source_tx_id",
+            sa.Integer(),
+            sa.ForeignKey("transactions.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("original_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("remaining_amount", sa.Numeric(14, 2), nullable=False),
+        sa.Column("locked_rate_percent", sa.Numeric(12, 6), nullable=True),
+        sa.Column("closed_date", sa.Date(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+    op.create_index(
+        "ix_loan_tranches_loan_open", "loan_tranches", ["loan_id", "closed_date", "start_date", "id"]
+    )
+
+    # Same replay as services.tranche_book.rebuild_tranches, inlined so the
+    # migration does not depend on the models as they evolve.
+    txs = op.get_bind().execute(
+        sa.text(
+            """
+            SELECT id, bank_id, loan_id, date, amount, kibor_rate_percent
+            FROM transactions
+            WHERE category = 'principal' AND loan_id IS NOT NULL
+            ORDER BY loan_id, date, id
+            """
+        ).columns(date=sa.Date())
+    )
+    rows: list[dict] = []
+    open_rows: list[dict] = []
+    current_loan = None
+    for tx_id, bank_id, loan_id, day, amount, rate in txs:
+        if loan_id != current_loan:
+            current_loan, open_rows = loan_id, []
+        amt = Decimal(str(amount))
+        if amt > 0:
+            row = {
+                "bank_id": bank_id,
+                "loan_id": loan_id,
+                "source_tx_id": tx_id,
+                "start_date": day,
+                "original_amount": amt,
+                "remaining_amount": amt,
+                "locked_rate_percent": rate,
+                "closed_date": None,
+            }
+            rows.append(row)
+            open_rows.append(row)
+        elif amt < 0:
+            repay = -amt
+            for row in open_rows:
+                if repay <= 0:
+                    break
+                take = min(row["remaining_amount"], repay)
+                row["remaining_amount"] -= take
+                repay -= take
+                if row["remaining_amount"] == 0:
+                    row["closed_date"] = day
+            open_rows = [r for r in open_rows if r["closed_date"] is None]
+
+    if rows:
+        op.bulk_insert(tranches, rows)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_loan_tranches_loan_open", table_name="loan_tranches")
+    op.drop_table("loan_tranches")
@@ -0,0 +1,25 @@
+"""Version counter on loan_kibor_coverage for conditional recomputes.
+
+Revision ID: 0016_coverage_version
+Revises: 0015_loan_tranches
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016_coverage_version"
+down_revision = "0015_loan_tranches"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "loan_kibor_coverage", sa.Column("version", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("loan_kibor_coverage", "version")
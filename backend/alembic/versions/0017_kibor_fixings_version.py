@@ -0,0 +1,29 @@
+"""Single shared version counter for kibor_fixings.
+
+Revision ID: 0017_kibor_fixings_version
+Revises: 0016_coverage_version
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0017_kibor_fixings_version"
+down_revision = "0016_coverage_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "kibor_fixings_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("data_updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+    op.execute("INSERT INTO kibor_fixings_version (id, data_version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table("kibor_fixings_version")
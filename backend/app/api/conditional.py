@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+
+from fastapi import Request, Response
+
+from app.services.data_versions import Stamp
+
+# Conditional GET support. Validators come from the loan/bank data versions, so
+# a matching If-None-Match is answered before any ledger or list work is done.
+# Browsers get "no-cache" (store, but always revalidate); nginx may additionally
+# hold fully historical responses for a short while via X-Accel-Expires, which
+# it strips before the response leaves the proxy.
+
+
+def _etag(version: str, variant: str) -> str:
+    return f'W/"{version}-{variant}"' if variant else f'W/"{version}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    bare = etag.removeprefix("W/")
+    return "*" in tags or any(t.removeprefix("W/") == bare for t in tags)
+
+
+def _not_modified_since(if_modified_since: str, modified: datetime) -> bool:
+    # HTTP dates have whole-second precision; the ETag is the exact check.
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    stamp: Stamp | None,
+    *,
+    variant: str = "",
+    shared_max_age: int = 0,
+) -> Response | None:
+    if stamp is None:
+        return None
+    version, modified = stamp
+
+    headers = {"ETag": _etag(version, variant), "Cache-Control": "no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True)
+    if shared_max_age > 0:
+        headers["X-Accel-Expires"] = str(int(shared_max_age))
+
+    # If-Modified-Since only counts when no If-None-Match was sent (RFC 9110).
+    inm = request.headers.get("if-none-match")
+    if inm:
+        if _matches(inm, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    else:
+        ims = request.headers.get("if-modified-since")
+        if ims and modified is not None and _not_modified_since(ims, modified):
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import gzip
+from decimal import Decimal
+from typing import Any
+
+import brotli
+import orjson
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+# Fast path for large read responses. Engine output (plain dicts or column
+# lists of dates and floats) is encoded by orjson straight into one bytes
+# buffer, skipping the Pydantic model construction and response_model
+# re-validation of the default path, then compressed when the client accepts
+# it and the body is big enough.
+
+
+def _default(v: Any) -> Any:
+    if isinstance(v, Decimal):
+        return float(v)
+    raise TypeError(f"not json serializable: {type(v).__name__}")
+
+
+def _accepted(header: str) -> dict[str, float]:
+    out: dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[token] = q
+    return out
+
+
+def _choose_encoding(header: str) -> str | None:
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    if accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def encoded_response(
+    request: Request,
+    response: Response,
+    body: bytes,
+    *,
+    media_type: str,
+    status_code: int = 200,
+) -> Response:
+    # Headers set on the injected response (ETag, X-Next-Cursor, ...) are only
+    # merged by FastAPI when the route returns data, so carry them over here.
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    headers["Vary"] = "Accept-Encoding"
+
+    min_bytes = int(getattr(settings, "http_compress_min_bytes", 8192) or 0)
+    encoding = _choose_encoding(request.headers.get("accept-encoding", "")) if len(body) >= min_bytes else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=4)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def json_response(request: Request, response: Response, content: Any, *, status_code: int = 200) -> Response:
+    body = orjson.dumps(content, default=_default)
+    return encoded_response(request, response, body, media_type="application/json", status_code=status_code)
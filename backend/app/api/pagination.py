@@ -0,0 +1,21 @@
+import base64
+import binascii
+from datetime import date
+
+from fastapi import HTTPException
+
+# Keyset cursors for lists ordered newest first by (date, id): the token is
+# the last row's key, and the next page starts strictly below it.
+
+
+def encode_cursor(d: date, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{d.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        d, row_id = raw.split("|", 1)
+        return date.fromisoformat(d), int(row_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="cursor_invalid")
@@ -1,20 +1,79 @@
 from __future__ import annotations
 
+import asyncio
+import json
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import db, current_user
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.schemas.backfill import BackfillStatusOut
-from app.services.kibor_backfill import get_status, ensure_started
+from app.services.backfill_events import subscribe
+from app.services.kibor_backfill import get_status, ensure_started, is_ready
 
 router = APIRouter(prefix="/banks/{bank_id}/loans/{loan_id}/kibor-backfill", tags=["kibor"])
 
 
 @router.get("/status", response_model=BackfillStatusOut)
 def status(bank_id: int, loan_id: int, s: Session = Depends(db), u=Depends(current_user)):
-    return get_status(bank_id, loan_id)
+    return get_status(bank_id, loan_id, s)
 
 
 @router.post("/start", response_model=BackfillStatusOut)
 def start(bank_id: int, loan_id: int, s: Session = Depends(db), u=Depends(current_user)):
-    return ensure_started(bank_id, loan_id)
\ No newline at end of file
+    return ensure_started(bank_id, loan_id, s)
+
+
+def _snapshot(bank_id: int, loan_id: int) -> tuple[dict, bool]:
+    with SessionLocal() as s:
+        st = get_status(bank_id, loan_id, s)
+        if st["status"] == "running":
+            return st, False
+        if is_ready(s, bank_id, loan_id):
+            return st, True
+        if st["status"] != "error":
+            st = ensure_started(bank_id, loan_id, s)
+        return st, False
+
+
+def _sse(event: str, st: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(BackfillStatusOut(**st).model_dump())}\n\n"
+
+
+async def _events(bank_id: int, loan_id: int) -> AsyncIterator[str]:
+    poll = max(1, int(getattr(settings, "backfill_events_poll_seconds", 15) or 15))
+    with subscribe(loan_id) as wake:
+        last = None
+        while True:
+            wake.clear()
+            st, ready = await run_in_threadpool(_snapshot, bank_id, loan_id)
+            if ready:
+                yield _sse("done", st)
+                return
+            if st["status"] == "error":
+                yield _sse("error", st)
+                return
+            if st != last:
+                yield _sse("progress", st)
+                last = st
+
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=poll)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream; the loop re-reads
+                # the job in case a worker in another process moved it along.
+                yield ": keepalive\n\n"
+
+
+@router.get("/events")
+def events(bank_id: int, loan_id: int, u=Depends(current_user)):
+    return StreamingResponse(
+        _events(bank_id, loan_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.orm import Session
+
+from app.api.deps import db, require_admin
+from app.schemas.kibor_import import KiborImportOut
+from app.services.audit import log_event
+from app.services.kibor_import import load_rates_from_upload, upsert_rates
+
+router = APIRouter(prefix="/kibor-import", tags=["kibor"])
+
+
+@router.post("", response_model=KiborImportOut)
+def import_kibor(
+    file: UploadFile = File(...),
+    bank_ids: list[int] | None = Query(None),
+    overwrite: bool = Query(False),
+    s: Session = Depends(db),
+    u=Depends(require_admin),
+):
+    name = (file.filename or "").strip()
+    if not name.lower().endswith((".zip", ".csv", ".pdf")):
+        raise HTTPException(status_code=400, detail="kibor_import_unsupported_file")
+
+    try:
+        result = load_rates_from_upload(name, file.file.read())
+    except Exception:
+        raise HTTPException(status_code=400, detail="kibor_import_unreadable")
+
+    written = upsert_rates(s, result.rates, bank_ids=bank_ids, overwrite=overwrite)
+    days = sorted({r.effective_date for r in result.rates})
+
+    log_event(
+        s,
+        username=u.get("sub"),
+        action="kibor.import",
+        entity_type="rate",
+        entity_id=None,
+        details={
+            "file": name,
+            "bank_ids": bank_ids,
+            "overwrite": overwrite,
+            "days": len(days),
+            "rows_written": written,
+            "skipped": len(result.skipped),
+        },
+    )
+
+    return KiborImportOut(
+        days=len(days),
+        rows_written=written,
+        first_date=days[0] if days else None,
+        last_date=days[-1] if days else None,
+        skipped=result.skipped,
+    )
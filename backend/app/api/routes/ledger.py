@@ -1,33 +1,138 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+import base64
+import binascii
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
 from datetime import date
 from sqlalchemy.orm import Session
 
+from app.api.conditional import conditional_get
 from app.api.deps import db, current_user
+from app.api.fast_json import encoded_response, json_response
+from app.core.config import settings
 from app.schemas.backfill import BackfillStatusOut
-from app.schemas.ledger import LedgerRow
-from app.services.ledger import compute_ledger
-from app.services.kibor_backfill import is_ready, ensure_started, get_status
+from app.schemas.ledger import LedgerColumnarOut, LedgerRow, ProvisionalLedgerOut, ProvisionalLedgerRow
+from app.services.ledger import compute_ledger, compute_ledger_columns
+from app.services.ledger_wire import ARROW_MEDIA_TYPE, arrow_available, arrow_ipc, columnar
+from app.services.data_versions import loan_stamp
+from app.services.kibor_backfill import is_ready, ensure_started, get_status, missing_days
+from app.utils.timezone import today_karachi
 
 router = APIRouter(prefix="/banks/{bank_id}/loans/{loan_id}/ledger", tags=["ledger"])
 
 
-@router.get("", response_model=list[LedgerRow])
+# The version token is the first day whose row used an estimated rate. Rows
+# before it are final; accrual carries forward, so every row from it on may
+# change once the missing rates land.
+def _encode_version(first_provisional: date) -> str:
+    return base64.urlsafe_b64encode(f"v1:{first_provisional.isoformat()}".encode()).decode().rstrip("=")
+
+
+def _decode_version(token: str) -> date:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        prefix, day = raw.split(":", 1)
+        if prefix != "v1":
+            raise ValueError(prefix)
+        return date.fromisoformat(day)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="ledger_version_invalid")
+
+
+# Non-provisional reads are encoded on the fast path, so the body is described
+# here per format rather than validated against a response_model.
+@router.get(
+    "",
+    response_model=None,
+    responses={
+        200: {
+            "model": list[LedgerRow] | LedgerColumnarOut | ProvisionalLedgerOut,
+            "description": "format=json: LedgerRow list (ProvisionalLedgerOut when provisional=true); "
+            "format=columnar: LedgerColumnarOut; format=arrow: an Arrow IPC stream.",
+            "content": {ARROW_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        },
+        202: {"model": BackfillStatusOut, "description": "KIBOR backfill still running; retry later."},
+        304: {"description": "Not modified."},
+    },
+)
 def ledger(
     bank_id: int,
     loan_id: int,
+    request: Request,
+    response: Response,
     start: date = Query(...),
     end: date = Query(...),
+    provisional: bool = Query(False),
+    since: str | None = Query(None),
+    fmt: Literal["json", "columnar", "arrow"] = Query("json", alias="format"),
     s: Session = Depends(db),
     u=Depends(current_user),
 ):
-    if not is_ready(s, bank_id, loan_id):
-        st = get_status(bank_id, loan_id)
+    if fmt != "json" and provisional:
+        raise HTTPException(status_code=400, detail="ledger_format_not_provisional")
+    if fmt == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="ledger_arrow_unavailable")
+
+    if not provisional:
+        # A range ending before today only changes through a version bump; one
+        # reaching today also moves with the date (new month-start anchors).
+        today = today_karachi()
+        historical = end < today
+        not_modified = conditional_get(
+            request,
+            response,
+            loan_stamp(s, bank_id, loan_id),
+            variant="" if historical else today.isoformat(),
+            shared_max_age=int(getattr(settings, "http_cache_historical_seconds", 60) or 0) if historical else 0,
+        )
+        if not_modified is not None:
+            return not_modified
+
+        if not is_ready(s, bank_id, loan_id):
+            st = get_status(bank_id, loan_id, s)
+            if st.get("status") != "running":
+                st = ensure_started(bank_id, loan_id, s)
+            return JSONResponse(status_code=202, content=BackfillStatusOut(**st).model_dump())
+
+        if fmt == "columnar":
+            cols = compute_ledger_columns(s, bank_id, loan_id, start, end)
+            return json_response(request, response, columnar(cols, start))
+        if fmt == "arrow":
+            cols = compute_ledger_columns(s, bank_id, loan_id, start, end)
+            return encoded_response(request, response, arrow_ipc(cols), media_type=ARROW_MEDIA_TYPE)
+
+        # Rows already have LedgerRow's shape; encode them as they are.
+        return json_response(request, response, compute_ledger(s, bank_id, loan_id, start, end))
+
+    missing = missing_days(s, bank_id, loan_id)
+    st = None
+    if missing:
+        st = get_status(bank_id, loan_id, s)
         if st.get("status") != "running":
-            st = ensure_started(bank_id, loan_id)
-        return JSONResponse(status_code=202, content=BackfillStatusOut(**st).model_dump())
+            st = ensure_started(bank_id, loan_id, s)
+
+    # Missing anchors fall back to the latest known rate or the loan placeholder.
+    first_provisional = min(missing) if missing else None
+    row_start = start
+    if since:
+        # A gap that opened before the client's version (e.g. a backdated
+        # drawdown) means those rows changed too.
+        changed_from = _decode_version(since)
+        if first_provisional is not None:
+            changed_from = min(changed_from, first_provisional)
+        row_start = max(start, changed_from)
+    rows = compute_ledger(s, bank_id, loan_id, row_start, end) if row_start <= end else []
 
-    rows = compute_ledger(s, bank_id, loan_id, start, end)
-    return [LedgerRow(**r) for r in rows]
\ No newline at end of file
+    return ProvisionalLedgerOut(
+        rows=[
+            ProvisionalLedgerRow(**r, provisional=first_provisional is not None and r["date"] >= first_provisional)
+            for r in rows
+        ],
+        provisional=bool(missing),
+        missing_dates=missing,
+        version=_encode_version(first_provisional) if first_provisional is not None else None,
+        backfill=BackfillStatusOut(**st) if st is not None else None,
+    )
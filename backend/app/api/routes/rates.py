@@ -1,22 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import exists, literal, select, tuple_, union_all
+from app.api.conditional import conditional_get
 from app.api.deps import db, current_user, require_admin
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
 from app.schemas.rate import RateCreate, RateOut
+from app.models.kibor_fixing import KiborFixing
 from app.models.rate import Rate
 from app.services.audit import log_event
+from app.services.data_versions import bank_stamp, bump_bank
+from app.services.kibor_coverage import invalidate_coverage
+from app.services.locked_rates import refresh_locked_rates
 
 router = APIRouter(prefix="/banks/{bank_id}/rates", tags=["rates"])
 
+def _in_window(q, model, tenor_months: int | None, start: date | None, end: date | None):
+    if tenor_months is not None:
+        q = q.where(model.tenor_months == tenor_months)
+    if start is not None:
+        q = q.where(model.effective_date >= start)
+    if end is not None:
+        q = q.where(model.effective_date <= end)
+    return q
+
 @router.get("", response_model=list[RateOut])
-def list_rates(bank_id: int, s: Session = Depends(db), u=Depends(current_user)):
-    # Sort by order of addition (newest first) so the most recently-added rate
-    # is always at the top ("current" in the UI).
-    return s.execute(
-        select(Rate)
-        .where(Rate.bank_id == bank_id)
-        .order_by(Rate.created_at.desc(), Rate.id.desc())
-    ).scalars().all()
+def list_rates(
+    bank_id: int,
+    request: Request,
+    response: Response,
+    tenor_months: int | None = Query(None),
+    start: date | None = Query(None),
+    end: date | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = Query(None),
+    s: Session = Depends(db),
+    u=Depends(current_user),
+):
+    not_modified = conditional_get(request, response, bank_stamp(s, bank_id))
+    if not_modified is not None:
+        return not_modified
+
+    overrides = select(
+        Rate.id,
+        Rate.tenor_months,
+        Rate.effective_date,
+        Rate.annual_rate_percent,
+        Rate.created_at,
+        literal("override").label("source"),
+    ).where(Rate.bank_id == bank_id)
+    # Fixings are shared across banks and cannot be deleted here; the negated
+    # id keeps them out of the overrides' id space. A bank's own override for
+    # the same tenor and date hides the fixing.
+    fixings = select(
+        (-KiborFixing.id).label("id"),
+        KiborFixing.tenor_months,
+        KiborFixing.effective_date,
+        KiborFixing.rate.label("annual_rate_percent"),
+        KiborFixing.created_at,
+        literal("fixing").label("source"),
+    ).where(
+        ~exists().where(
+            Rate.bank_id == bank_id,
+            Rate.tenor_months == KiborFixing.tenor_months,
+            Rate.effective_date == KiborFixing.effective_date,
+        )
+    )
+    merged = union_all(
+        _in_window(overrides, Rate, tenor_months, start, end),
+        _in_window(fixings, KiborFixing, tenor_months, start, end),
+    ).subquery()
+    q = select(merged)
+    if after is not None:
+        q = q.where(tuple_(merged.c.effective_date, merged.c.id) < tuple_(*decode_cursor(after)))
+    q = q.order_by(merged.c.effective_date.desc(), merged.c.id.desc())
+
+    if limit is None:
+        limit = int(getattr(settings, "page_size_default", 200))
+    # One extra row tells whether another page follows.
+    rows = s.execute(q.limit(limit + 1)).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["effective_date"], rows[-1]["id"])
+    return [RateOut(bank_id=bank_id, **r) for r in rows]
 
 @router.post("", response_model=RateOut)
 def add_rate(bank_id: int, body: RateCreate, s: Session = Depends(db), u=Depends(require_admin)):
@@ -30,6 +98,10 @@ def add_rate(bank_id: int, body: RateCreate, s: Session = Depends(db), u=Depends
         annual_rate_percent=body.annual_rate_percent,
     )
     s.add(r)
+    s.flush()
+    refresh_locked_rates(s, bank_id=bank_id, days=[r.effective_date])
+    invalidate_coverage(s, bank_id=bank_id, gaps_only=True)
+    bump_bank(s, bank_id)
     s.commit()
     s.refresh(r)
 
@@ -50,6 +122,8 @@ def add_rate(bank_id: int, body: RateCreate, s: Session = Depends(db), u=Depends
 
 @router.delete("/{rate_id}")
 def delete_rate(bank_id: int, rate_id: int, s: Session = Depends(db), u=Depends(require_admin)):
+    if rate_id < 0:
+        raise HTTPException(status_code=400, detail="kibor_fixing_not_deletable")
     r = s.execute(select(Rate).where(Rate.id == rate_id, Rate.bank_id == bank_id)).scalar_one_or_none()
     if not r:
         raise HTTPException(status_code=404, detail="rate_not_found")
@@ -61,6 +135,10 @@ def delete_rate(bank_id: int, rate_id: int, s: Session = Depends(db), u=Depends(
         "annual_rate_percent": str(r.annual_rate_percent),
     }
     s.delete(r)
+    s.flush()
+    refresh_locked_rates(s, bank_id=bank_id, days=[r.effective_date])
+    invalidate_coverage(s, bank_id=bank_id)
+    bump_bank(s, bank_id)
     s.commit()
 
     log_event(
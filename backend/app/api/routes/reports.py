@@ -45,9 +45,9 @@ def report(
     lid = loan_id if loan_id is not None else _pick_default_loan_id(s, bank_id)
 
     if not is_ready(s, bank_id, lid):
-        st = get_status(bank_id, lid)
+        st = get_status(bank_id, lid, s)
         if st.get("status") != "running":
-            st = ensure_started(bank_id, lid)
+            st = ensure_started(bank_id, lid, s)
         return JSONResponse(status_code=202, content=BackfillStatusOut(**st).model_dump())
 
     buf = BytesIO()
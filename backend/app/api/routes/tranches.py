@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from app.api.deps import db, current_user, require_admin
+from app.models.loan import Loan
+from app.models.loan_tranche import LoanTranche
+from app.schemas.tranche import TrancheOut, TrancheRebuildOut
+from app.services.audit import log_event
+from app.services.principal_totals import lock_principal_total
+from app.services.tranche_book import rebuild_tranches
+
+router = APIRouter(prefix="/banks/{bank_id}/loans/{loan_id}/tranches", tags=["loans"])
+
+
+def _require_loan(s: Session, bank_id: int, loan_id: int) -> Loan:
+    ln = s.execute(select(Loan).where(Loan.id == loan_id, Loan.bank_id == bank_id)).scalar_one_or_none()
+    if ln is None:
+        raise HTTPException(status_code=404, detail="loan_not_found")
+    return ln
+
+
+@router.get("", response_model=list[TrancheOut])
+def list_tranches(
+    bank_id: int,
+    loan_id: int,
+    include_closed: bool = False,
+    s: Session = Depends(db),
+    u=Depends(current_user),
+):
+    _require_loan(s, bank_id, loan_id)
+    q = select(LoanTranche).where(LoanTranche.loan_id == loan_id)
+    if not include_closed:
+        q = q.where(LoanTranche.closed_date.is_(None))
+    return s.execute(q.order_by(LoanTranche.start_date.asc(), LoanTranche.source_tx_id.asc())).scalars().all()
+
+
+@router.post("/rebuild", response_model=TrancheRebuildOut)
+def rebuild(bank_id: int, loan_id: int, s: Session = Depends(db), u=Depends(require_admin)):
+    _require_loan(s, bank_id, loan_id)
+    # Same lock principal writers take, so the replay sees a settled history.
+    lock_principal_total(s, bank_id, loan_id)
+    n = rebuild_tranches(s, bank_id, loan_id)
+    s.commit()
+
+    log_event(
+        s,
+        username=u.get("sub"),
+        action="tranches.rebuild",
+        entity_type="loan",
+        entity_id=loan_id,
+        details={"bank_id": bank_id, "tranches": n},
+    )
+    return {"tranches": n}
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, File, Query, HTTPException, Request, Response, UploadFile
 from datetime import date
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import insert, select, tuple_
 
+from app.api.conditional import conditional_get
 from app.api.deps import db, current_user, require_admin
-from app.schemas.transaction import TxCreate, TxOut
+from app.api.fast_json import json_response
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.schemas.transaction import TxBulkOut, TxCreate, TxOut
 from app.models.transaction import Transaction
 from app.models.bank import Bank
 from app.models.loan import Loan
-from app.models.rate import Rate
 from app.services.audit import log_event
-from app.services.kibor import get_kibor_offer_rates, adjust_to_last_business_day
+from app.services.data_versions import bump_loan, loan_stamp
 from app.services.kibor_backfill import ensure_started
+from app.services.kibor_coverage import invalidate_coverage
+from app.services.kibor_rates import covered_dates, rate_history
+from app.services.locked_rates import refresh_locked_rates
+from app.services.principal_totals import apply_principal_delta, lock_principal_total
+from app.services.tranche_book import drop_untouched_tranche, rebuild_tranches, record_principal
+from app.services.tx_import import parse_transactions
 
 router = APIRouter(prefix="/banks/{bank_id}/loans/{loan_id}/transactions", tags=["transactions"])
 
@@ -27,14 +36,18 @@ def _require_bank_loan(s: Session, bank_id: int, loan_id: int) -> tuple[Bank, Lo
     return b, ln
 
 
-def _attach_kibor_rates(
-    s: Session,
-    bank: Bank,
-    loan: Loan,
-    txs: list[Transaction],
-) -> list[TxOut]:
-    if not txs:
-        return []
+def _kibor_rates_by_tx(s: Session, bank: Bank, loan: Loan, txs: list[Transaction]) -> dict[int, float | None]:
+    rate_by_tx: dict[int, float | None] = {}
+    unlocked: list[Transaction] = []
+    for t in txs:
+        if t.category != "principal" or float(t.amount) <= 0:
+            continue
+        if t.kibor_rate_percent is not None:
+            rate_by_tx[t.id] = float(t.kibor_rate_percent)
+        else:
+            unlocked.append(t)
+    if not unlocked:
+        return rate_by_tx
 
     tenor = int(loan.kibor_tenor_months)
 
@@ -43,135 +56,135 @@ def _attach_kibor_rates(
         ph = float(loan.kibor_placeholder_rate_percent)
         ph_f = ph if ph > 0 else None
 
-    bank_type = (bank.bank_type or "").strip().lower()
-
-    if bank_type == "islamic":
-        max_day = max(t.date for t in txs)
-        rate_rows = (
-            s.execute(
-                select(Rate.effective_date, Rate.annual_rate_percent)
-                .where(
-                    Rate.bank_id == bank.id,
-                    Rate.tenor_months == tenor,
-                    Rate.effective_date <= max_day,
-                )
-                .order_by(Rate.effective_date.asc())
-            )
-            .all()
-        )
-        rates: list[tuple[date, float]] = [(d, float(r)) for (d, r) in rate_rows]
-
-        def latest_rate_on(day: date) -> float | None:
-            latest: float | None = None
-            for d, r in rates:
-                if d <= day:
-                    latest = r
-                else:
-                    break
-            return latest if latest is not None else ph_f
-
-        out: list[TxOut] = []
-        for t in txs:
-            rp: float | None = None
-            if t.category == "principal" and float(t.amount) > 0:
-                rp = latest_rate_on(t.date)
-            out.append(
-                TxOut(
-                    id=t.id,
-                    bank_id=t.bank_id,
-                    loan_id=t.loan_id,
-                    date=t.date,
-                    category=t.category,
-                    amount=float(t.amount),
-                    kibor_rate_percent=rp,
-                    note=t.note,
-                    created_at=t.created_at,
-                )
-            )
-        return out
-
-    max_day = max(t.date for t in txs)
-    rate_rows = (
-        s.execute(
-            select(Rate.effective_date, Rate.annual_rate_percent)
-            .where(
-                Rate.bank_id == bank.id,
-                Rate.tenor_months == tenor,
-                Rate.effective_date <= max_day,
-            )
-            .order_by(Rate.effective_date.asc())
-        )
-        .all()
-    )
-    rates: list[tuple[date, float]] = [(d, float(r)) for (d, r) in rate_rows]
-
-    def latest_rate_on(day: date) -> float | None:
-        latest: float | None = None
-        for d, r in rates:
-            if d <= day:
-                latest = r
-            else:
-                break
-        return latest if latest is not None else ph_f
-
-    out: list[TxOut] = []
-    for t in txs:
-        rp: float | None = None
-        if t.category == "principal" and float(t.amount) > 0:
-            rp = latest_rate_on(t.date)
-        out.append(
-            TxOut(
-                id=t.id,
-                bank_id=t.bank_id,
-                loan_id=t.loan_id,
-                date=t.date,
-                category=t.category,
-                amount=float(t.amount),
-                kibor_rate_percent=rp,
-                note=t.note,
-                created_at=t.created_at,
-            )
-        )
-    return out
+    # Drawdowns without a locked rate show the latest rate on or before their
+    # date, for Islamic and conventional loans alike. Rates come back sorted by
+    # date, so one forward pass over those drawdowns assigns them all.
+    rates = rate_history(s, bank.id, max(t.date for t in unlocked), tenor).get(tenor, [])
+
+    i = 0
+    latest: float | None = None
+    for t in sorted(unlocked, key=lambda t: t.date):
+        while i < len(rates) and rates[i][0] <= t.date:
+            latest = float(rates[i][1])
+            i += 1
+        rate_by_tx[t.id] = latest if latest is not None else ph_f
+    return rate_by_tx
+
+
+def _tx_rows(s: Session, bank: Bank, loan: Loan, txs: list[Transaction]) -> list[dict]:
+    # TxOut-shaped dicts for the JSON fast path.
+    rate_by_tx = _kibor_rates_by_tx(s, bank, loan, txs)
+    return [
+        {
+            "id": t.id,
+            "bank_id": t.bank_id,
+            "loan_id": t.loan_id,
+            "date": t.date,
+            "category": t.category,
+            "amount": float(t.amount),
+            "kibor_rate_percent": rate_by_tx.get(t.id),
+            "kibor_rate_pending": False,
+            "note": t.note,
+            "created_at": t.created_at,
+        }
+        for t in txs
+    ]
 
 
-@router.get("", response_model=list[TxOut])
+def _attach_kibor_rates(
+    s: Session,
+    bank: Bank,
+    loan: Loan,
+    txs: list[Transaction],
+) -> list[TxOut]:
+    return [TxOut(**row) for row in _tx_rows(s, bank, loan, txs)]
+
+
+@router.get(
+    "",
+    response_model=None,
+    responses={
+        200: {
+            "model": list[TxOut],
+            "description": "One page, newest first.",
+            "headers": {"X-Next-Cursor": {"description": "Pass back as `after`; absent on the last page.", "schema": {"type": "string"}}},
+        },
+        304: {"description": "Not modified."},
+    },
+)
 def list_transactions(
     bank_id: int,
     loan_id: int,
+    request: Request,
+    response: Response,
     start: date | None = Query(None),
     end: date | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = Query(None),
     s: Session = Depends(db),
     u=Depends(current_user),
 ):
+    not_modified = conditional_get(request, response, loan_stamp(s, bank_id, loan_id))
+    if not_modified is not None:
+        return not_modified
+
     bank, loan = _require_bank_loan(s, bank_id, loan_id)
     q = select(Transaction).where(Transaction.bank_id == bank_id, Transaction.loan_id == loan_id)
     if start is not None:
         q = q.where(Transaction.date >= start)
     if end is not None:
         q = q.where(Transaction.date <= end)
+    if after is not None:
+        q = q.where(tuple_(Transaction.date, Transaction.id) < tuple_(*decode_cursor(after)))
     q = q.order_by(Transaction.date.desc(), Transaction.id.desc())
-    txs = s.execute(q).scalars().all()
-    return _attach_kibor_rates(s, bank, loan, txs)
+
+    if limit is None:
+        limit = int(getattr(settings, "page_size_default", 200))
+    # One extra row tells whether another page follows.
+    txs = s.execute(q.limit(limit + 1)).scalars().all()
+    if len(txs) > limit:
+        txs = txs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(txs[-1].date, txs[-1].id)
+    return json_response(request, response, _tx_rows(s, bank, loan, txs))
+
+
+def _fill_placeholder(s: Session, bank: Bank, loan: Loan, anchor: date) -> bool:
+    # Returns False when the anchor's rate is not stored yet.
+    tenor = int(loan.kibor_tenor_months)
+    if not covered_dates(s, bank.id, tenor, [anchor]):
+        return False
+
+    ph = float(loan.kibor_placeholder_rate_percent) if loan.kibor_placeholder_rate_percent is not None else 0.0
+    if ph <= 0:
+        offer = dict(rate_history(s, bank.id, anchor, tenor).get(tenor, [])).get(anchor)
+        loan.kibor_placeholder_rate_percent = float(offer)
+        s.add(loan)
+        bump_loan(s, loan.id)
+        s.commit()
+    return True
+
+
+def _schedule_anchor_rate(s: Session, bank: Bank, loan: Loan, anchor: date) -> bool:
+    # The anchor rate is never fetched on the request path: if the fixing is
+    # already stored the placeholder is filled from it, otherwise the backfill
+    # worker fetches it and fills the placeholder when it lands.
+    rate_pending = not _fill_placeholder(s, bank, loan, anchor)
+    if rate_pending or (bank.bank_type or "").strip().lower() != "islamic":
+        ensure_started(bank.id, loan.id, s)
+    return rate_pending
 
 
 @router.post("", response_model=TxOut)
 def add_tx(bank_id: int, loan_id: int, body: TxCreate, s: Session = Depends(db), u=Depends(require_admin)):
     bank, loan = _require_bank_loan(s, bank_id, loan_id)
 
-    if body.category == "principal" and body.amount > 0 and loan.max_loan_amount is not None:
-        current_principal = (
-            s.execute(
-                select(func.coalesce(func.sum(Transaction.amount), 0)).where(
-                    Transaction.bank_id == bank_id,
-                    Transaction.loan_id == loan_id,
-                    Transaction.category == "principal",
-                )
-            )
-            .scalar_one()
-        )
-        if float(current_principal) + float(body.amount) > float(loan.max_loan_amount):
-            raise HTTPException(status_code=400, detail="max_loan_exceeded")
+    if body.category == "principal":
+        # The locked row serializes drawdowns on this loan until commit.
+        current_principal = lock_principal_total(s, bank_id, loan_id)
+        if body.amount > 0 and loan.max_loan_amount is not None:
+            if float(current_principal) + float(body.amount) > float(loan.max_loan_amount):
+                s.rollback()
+                raise HTTPException(status_code=400, detail="max_loan_exceeded")
 
     t = Transaction(
         bank_id=bank_id,
@@ -182,69 +195,21 @@ def add_tx(bank_id: int, loan_id: int, body: TxCreate, s: Session = Depends(db),
         note=body.note,
     )
     s.add(t)
+    bump_loan(s, loan_id)
+    if t.category == "principal":
+        apply_principal_delta(s, loan_id, Decimal(str(body.amount)))
+        invalidate_coverage(s, loan_id=loan_id)
+        s.flush()
+        # Transactions before loan_tranches, the order fixing writers lock in.
+        if body.amount > 0:
+            refresh_locked_rates(s, loan_id=loan_id, days=[t.date], only_missing=True)
+        record_principal(s, t)
     s.commit()
     s.refresh(t)
 
+    rate_pending = False
     if t.category == "principal" and float(t.amount) > 0:
-        bank_type = (bank.bank_type or "").strip().lower()
-
-        if bank_type == "islamic":
-            anchor = t.date
-            fetch_day = adjust_to_last_business_day(anchor)
-            kib = get_kibor_offer_rates(fetch_day)
-            offer = kib.by_tenor_months().get(int(loan.kibor_tenor_months))
-
-            if offer is not None:
-                stmt = (
-                    pg_insert(Rate)
-                    .values(
-                        {
-                            "bank_id": bank_id,
-                            "tenor_months": int(loan.kibor_tenor_months),
-                            "effective_date": anchor,
-                            "annual_rate_percent": offer,
-                        }
-                    )
-                    .on_conflict_do_nothing(index_elements=["bank_id", "tenor_months", "effective_date"])
-                )
-                s.execute(stmt)
-
-                ph = float(loan.kibor_placeholder_rate_percent) if loan.kibor_placeholder_rate_percent is not None else 0.0
-                if ph <= 0:
-                    loan.kibor_placeholder_rate_percent = float(offer)
-                    s.add(loan)
-
-                s.commit()
-
-        else:
-            anchor = t.date
-            fetch_day = adjust_to_last_business_day(anchor)
-            kib = get_kibor_offer_rates(fetch_day)
-            offer = kib.by_tenor_months().get(int(loan.kibor_tenor_months))
-
-            if offer is not None:
-                stmt = (
-                    pg_insert(Rate)
-                    .values(
-                        {
-                            "bank_id": bank_id,
-                            "tenor_months": int(loan.kibor_tenor_months),
-                            "effective_date": anchor,
-                            "annual_rate_percent": offer,
-                        }
-                    )
-                    .on_conflict_do_nothing(index_elements=["bank_id", "tenor_months", "effective_date"])
-                )
-                s.execute(stmt)
-
-                ph = float(loan.kibor_placeholder_rate_percent) if loan.kibor_placeholder_rate_percent is not None else 0.0
-                if ph <= 0:
-                    loan.kibor_placeholder_rate_percent = float(offer)
-                    s.add(loan)
-
-                s.commit()
-
-            ensure_started(bank_id, loan_id)
+        rate_pending = _schedule_anchor_rate(s, bank, loan, t.date)
 
     log_event(
         s,
@@ -255,7 +220,121 @@ def add_tx(bank_id: int, loan_id: int, body: TxCreate, s: Session = Depends(db),
         details={"bank_id": bank_id, "loan_id": loan_id, "date": str(t.date), "category": t.category, "amount": str(t.amount), "note": t.note},
     )
 
-    return _attach_kibor_rates(s, bank, loan, [t])[0]
+    out = _attach_kibor_rates(s, bank, loan, [t])[0]
+    out.kibor_rate_pending = rate_pending
+    return out
+
+
+def _insert_transactions(s: Session, values: list[dict]) -> None:
+    if s.get_bind().dialect.name == "postgresql":
+        # COPY streams every row in one round trip on the session's own
+        # connection, so it commits or rolls back with the rest of the request.
+        raw = s.connection().connection.driver_connection
+        with raw.cursor() as cur:
+            with cur.copy("COPY transactions (bank_id, loan_id, date, category, amount, note) FROM STDIN") as copy:
+                for v in values:
+                    copy.write_row((v["bank_id"], v["loan_id"], v["date"], v["category"], v["amount"], v["note"]))
+        return
+    s.execute(insert(Transaction), values)
+
+
+@router.post("/bulk", response_model=TxBulkOut)
+def bulk_add_tx(
+    bank_id: int,
+    loan_id: int,
+    file: UploadFile = File(...),
+    s: Session = Depends(db),
+    u=Depends(require_admin),
+):
+    bank, loan = _require_bank_loan(s, bank_id, loan_id)
+
+    name = (file.filename or "").strip()
+    if not name.lower().endswith((".csv", ".xlsx", ".json")):
+        raise HTTPException(status_code=400, detail="tx_bulk_unsupported_file")
+    try:
+        parsed = parse_transactions(name, file.file.read())
+    except Exception:
+        raise HTTPException(status_code=400, detail="tx_bulk_unreadable")
+
+    errors = list(parsed.errors)
+    if not parsed.rows and not errors:
+        raise HTTPException(status_code=400, detail="tx_bulk_empty")
+
+    # The limit is checked row by row in file order, as if each row were
+    # posted on its own.
+    rows = [r for _, r in parsed.rows]
+    principal_rows = [r for r in rows if r.category == "principal"]
+    if principal_rows:
+        running = float(lock_principal_total(s, bank_id, loan_id))
+        if loan.max_loan_amount is not None:
+            for i, row in parsed.rows:
+                if row.category != "principal":
+                    continue
+                if row.amount > 0 and running + row.amount > float(loan.max_loan_amount):
+                    errors.append({"row": i, "field": "amount", "error": "max_loan_exceeded"})
+                running += row.amount
+
+    if errors:
+        s.rollback()
+        errors.sort(key=lambda e: e["row"])
+        raise HTTPException(status_code=400, detail={"code": "tx_bulk_invalid", "errors": errors[:100]})
+
+    values = [
+        {
+            "bank_id": bank_id,
+            "loan_id": loan_id,
+            "date": r.date,
+            "category": r.category,
+            "amount": Decimal(str(r.amount)),
+            "note": r.note,
+        }
+        for r in rows
+    ]
+    _insert_transactions(s, values)
+    bump_loan(s, loan_id)
+    drawdowns = [r.date for r in principal_rows if r.amount > 0]
+    if principal_rows:
+        apply_principal_delta(s, loan_id, sum((v["amount"] for v in values if v["category"] == "principal"), Decimal(0)))
+        invalidate_coverage(s, loan_id=loan_id)
+        rebuild_tranches(s, bank_id, loan_id)
+        refresh_locked_rates(s, loan_id=loan_id, days=drawdowns, only_missing=True)
+    s.commit()
+
+    # One coalesced backfill covers every drawdown in the file. The
+    # placeholder comes from the earliest drawdown, as row-by-row entry would.
+    rate_pending = False
+    if drawdowns:
+        _fill_placeholder(s, bank, loan, min(drawdowns))
+        rate_pending = ensure_started(bank_id, loan_id, s)["status"] == "running"
+
+    days = sorted(r.date for r in rows)
+    out = TxBulkOut(
+        inserted=len(values),
+        first_date=days[0],
+        last_date=days[-1],
+        principal_total=float(sum(Decimal(str(r.amount)) for r in rows if r.category == "principal")),
+        markup_total=float(sum(Decimal(str(r.amount)) for r in rows if r.category == "markup")),
+        kibor_rate_pending=rate_pending,
+    )
+
+    log_event(
+        s,
+        username=u.get("sub"),
+        action="tx.bulk_create",
+        entity_type="transaction",
+        entity_id=None,
+        details={
+            "bank_id": bank_id,
+            "loan_id": loan_id,
+            "file": name,
+            "rows": out.inserted,
+            "first_date": str(out.first_date),
+            "last_date": str(out.last_date),
+            "principal_total": str(out.principal_total),
+            "markup_total": str(out.markup_total),
+        },
+    )
+    return out
 
 
 @router.delete("/{tx_id}")
@@ -264,7 +343,17 @@ def delete_tx(bank_id: int, loan_id: int, tx_id: int, s: Session = Depends(db),
     t = s.execute(select(Transaction).where(Transaction.id == tx_id, Transaction.bank_id == bank_id, Transaction.loan_id == loan_id)).scalar_one_or_none()
     if t is None:
         raise HTTPException(status_code=404, detail="tx_not_found")
+    rebuild = False
+    if t.category == "principal":
+        lock_principal_total(s, bank_id, loan_id)
+        apply_principal_delta(s, loan_id, -Decimal(str(t.amount)))
+        invalidate_coverage(s, loan_id=loan_id)
+        rebuild = not drop_untouched_tranche(s, t)
     s.delete(t)
+    if rebuild:
+        s.flush()
+        rebuild_tranches(s, bank_id, loan_id)
+    bump_loan(s, loan_id)
     s.commit()
     log_event(
         s,
@@ -0,0 +1,21 @@
+import logging
+import signal
+import threading
+
+from app.services.kibor_backfill import default_worker_id, run_worker
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    worker_id = default_worker_id()
+    logging.info("kibor backfill worker %s started", worker_id)
+    run_worker(stop, worker_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,33 @@ class Settings(BaseSettings):
 
     kibor_sync_enabled: bool = True
     kibor_sync_interval_seconds: int = 3600
+    kibor_base_url: str = "https://www.sbp.org.pk/ecodata/kibor"
+    kibor_parse_workers: int = 2
+    kibor_parse_cache_dir: str = ".kibor_cache"
+    kibor_parse_cache_size: int = 512
+    kibor_fetch_timeout_seconds: int = 15
+    kibor_fetch_retries: int = 2
+    kibor_backoff_base_seconds: float = 0.5
+    kibor_backoff_max_seconds: float = 8
+    kibor_breaker_failure_threshold: int = 5
+    kibor_breaker_reset_seconds: int = 60
+
+    backfill_worker_in_process: bool = True
+    backfill_worker_threads: int = 1
+    backfill_worker_poll_seconds: int = 5
+    backfill_batch_jobs: int = 50
+    backfill_heartbeat_timeout_seconds: int = 120
+    backfill_max_attempts: int = 5
+    backfill_retry_base_seconds: int = 60
+    backfill_retry_budget: int = 20
+    backfill_flush_days: int = 50
+    backfill_flush_seconds: int = 10
+    backfill_events_poll_seconds: int = 15
+
+    page_size_default: int = 200
+
+    http_cache_historical_seconds: int = 60
+    http_compress_min_bytes: int = 8192
 
     class Config:
         env_prefix = ""
@@ -0,0 +1,46 @@
+import argparse
+from pathlib import Path
+
+from app.db.session import SessionLocal
+from app.services.kibor_import import load_rates_from_path, upsert_rates
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.kibor_import",
+        description="Import historical KIBOR sheets (directory, .zip of PDFs, or CSV of date,1m,3m,6m,9m,12m).",
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--bank-id", type=int, action="append", dest="bank_ids", help="write bank-specific overrides for this bank instead of market fixings (repeatable)")
+    parser.add_argument("--overwrite", action="store_true", help="replace existing rates for the same day")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if not args.path.exists():
+        parser.error(f"{args.path} does not exist")
+
+    result = load_rates_from_path(args.path)
+
+    db = SessionLocal()
+    try:
+        written = upsert_rates(
+            db,
+            result.rates,
+            bank_ids=args.bank_ids,
+            overwrite=args.overwrite,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db.close()
+
+    days = sorted({r.effective_date for r in result.rates})
+    if days:
+        print(f"parsed {len(days)} days ({days[0]} to {days[-1]}), wrote {written} rate rows")
+    else:
+        print("parsed 0 days")
+    for name in result.skipped:
+        print(f"skipped: {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,11 @@ from app.api.routes.users import router as users_router
 from app.api.routes.audit import router as audit_router
 from app.api.routes.backfill import router as backfill_router
 from app.api.routes.loans import router as loans_router
-from app.services.kibor_sync import kibor_sync_loop
+from app.api.routes.kibor_import import router as kibor_import_router
+from app.api.routes.tranches import router as tranches_router
+from app.services.kibor import reparse_stale_cache, shutdown_parse_pool
+from app.services.kibor_backfill import start_in_process_workers, stop_in_process_workers
+from app.services.kibor_sync import kibor_sync_loop, release_leadership
 
 app = FastAPI()
 
@@ -24,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/health")
@@ -41,8 +46,32 @@ app.include_router(users_router)
 app.include_router(audit_router)
 app.include_router(backfill_router)
 app.include_router(loans_router)
+app.include_router(kibor_import_router)
+app.include_router(tranches_router)
 
 @app.on_event("startup")
 async def _start_kibor_sync():
     if getattr(settings, "kibor_sync_enabled", True):
-        asyncio.create_task(kibor_sync_loop())
\ No newline at end of file
+        asyncio.create_task(kibor_sync_loop())
+
+@app.on_event("startup")
+async def _refresh_kibor_parse_cache():
+    # Entries written by an older parser are re-parsed in the background.
+    asyncio.get_running_loop().run_in_executor(None, reparse_stale_cache)
+
+@app.on_event("startup")
+async def _start_backfill_workers():
+    if getattr(settings, "backfill_worker_in_process", True):
+        start_in_process_workers()
+
+@app.on_event("shutdown")
+def _stop_backfill_workers():
+    stop_in_process_workers()
+
+@app.on_event("shutdown")
+def _release_kibor_sync_leadership():
+    release_leadership()
+
+@app.on_event("shutdown")
+def _stop_kibor_parse_pool():
+    shutdown_parse_pool()
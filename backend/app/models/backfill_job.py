@@ -0,0 +1,34 @@
+from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, String, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class BackfillJob(Base):
+    __tablename__ = "backfill_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"), index=True)
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"))
+
+    status: Mapped[str] = mapped_column(String(16), default="queued")  # queued | running | done | error
+    total_days: Mapped[int] = mapped_column(Integer, default=0)
+    processed_days: Mapped[int] = mapped_column(Integer, default=0)
+    last_processed_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
+
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    run_after: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    heartbeat_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+
+    started_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+    message: Mapped[str | None] = mapped_column(String(512), nullable=True)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("loan_id", name="uq_backfill_jobs_loan"),
+        Index("ix_backfill_jobs_status_run_after", "status", "run_after"),
+    )
@@ -9,3 +9,8 @@ class Bank(Base):
     bank_type: Mapped[str] = mapped_column(String(16))
     additional_rate: Mapped[float | None] = mapped_column(Numeric(8, 4), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    # Bumped when this bank's rate overrides change; shared fixings have
+    # their own counter in kibor_fixings_version.
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    data_updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
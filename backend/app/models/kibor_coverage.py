@@ -0,0 +1,19 @@
+from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Boolean, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class LoanKiborCoverage(Base):
+    __tablename__ = "loan_kibor_coverage"
+
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"), index=True)
+
+    # Anchors were evaluated up to this day; a new month start after it needs a recompute.
+    covered_through: Mapped[Date] = mapped_column(Date)
+    missing_count: Mapped[int] = mapped_column(Integer, default=0)
+    missing_dates: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    stale: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Bumped by every invalidation; a recompute only lands if it is unchanged.
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
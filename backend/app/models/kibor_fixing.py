@@ -0,0 +1,26 @@
+from sqlalchemy import Integer, Date, DateTime, func, Index, Numeric, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class KiborFixing(Base):
+    __tablename__ = "kibor_fixings"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    effective_date: Mapped[Date] = mapped_column(Date, index=True)
+    tenor_months: Mapped[int] = mapped_column(Integer)
+    rate: Mapped[float] = mapped_column(Numeric(12, 6))
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("effective_date", "tenor_months", name="uq_kibor_fixings_date_tenor"),
+        # rate_history reads one tenor up to a date.
+        Index("ix_kibor_fixings_tenor_date_rate", "tenor_months", "effective_date", postgresql_include=["rate"]),
+    )
+
+
+class KiborFixingsVersion(Base):
+    __tablename__ = "kibor_fixings_version"
+    # A single row (id=1) bumped whenever kibor_fixings changes; every bank's
+    # validators fold it in instead of each bank row being written.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    data_updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
@@ -16,6 +16,10 @@ class Loan(Base):
 
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
+    # Bumped on every write that changes this loan's transactions or ledger.
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    data_updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
     __table_args__ = (
         UniqueConstraint("bank_id", "name", name="uq_loans_bank_name"),
     )
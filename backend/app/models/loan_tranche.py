@@ -0,0 +1,26 @@
+from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Index, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class LoanTranche(Base):
+    __tablename__ = "loan_tranches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"))
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"))
+    # The drawdown that opened the tranche.
+    source_tx_id: Mapped[int] = mapped_column(ForeignKey("transactions.id", ondelete="CASCADE"), unique=True)
+
+    start_date: Mapped[Date] = mapped_column(Date)
+    original_amount: Mapped[float] = mapped_column(Numeric(14, 2))
+    remaining_amount: Mapped[float] = mapped_column(Numeric(14, 2))
+    locked_rate_percent: Mapped[float | None] = mapped_column(Numeric(12, 6), nullable=True)
+    # Day the last of it was repaid; NULL while open.
+    closed_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
+
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Repayments consume open tranches oldest first.
+        Index("ix_loan_tranches_loan_open", "loan_id", "closed_date", "start_date", "id"),
+    )
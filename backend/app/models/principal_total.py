@@ -0,0 +1,14 @@
+from sqlalchemy import DateTime, func, ForeignKey, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class LoanPrincipalTotal(Base):
+    __tablename__ = "loan_principal_totals"
+
+    loan_id: Mapped[int] = mapped_column(ForeignKey("loans.id", ondelete="CASCADE"), primary_key=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"), index=True)
+
+    # Sum of every principal transaction of the loan, future-dated ones included.
+    principal_total: Mapped[float] = mapped_column(Numeric(16, 2), default=0)
+
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,12 +1,24 @@
-from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Numeric
+from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Index, Numeric, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
 class Rate(Base):
     __tablename__ = "rates"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"), index=True)
-    tenor_months: Mapped[int] = mapped_column(Integer, index=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"))
+    tenor_months: Mapped[int] = mapped_column(Integer)
     effective_date: Mapped[Date] = mapped_column(Date, index=True)
     annual_rate_percent: Mapped[float] = mapped_column(Numeric(12, 6))
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("bank_id", "tenor_months", "effective_date", name="uq_rates_bank_tenor_effective_date"),
+        # Override lookups read the rate straight from the index.
+        Index(
+            "ix_rates_bank_tenor_date_rate",
+            "bank_id",
+            "tenor_months",
+            "effective_date",
+            postgresql_include=["annual_rate_percent"],
+        ),
+    )
@@ -1,14 +1,37 @@
-from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Numeric, String
+from sqlalchemy import Integer, Date, DateTime, func, ForeignKey, Index, Numeric, String, text
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"), index=True)
+    bank_id: Mapped[int] = mapped_column(ForeignKey("banks.id", ondelete="CASCADE"))
     loan_id: Mapped[int | None] = mapped_column(ForeignKey("loans.id", ondelete="SET NULL"), index=True, nullable=True)
     date: Mapped[Date] = mapped_column(Date, index=True)
     category: Mapped[str] = mapped_column(String(16), default="principal")
     amount: Mapped[float] = mapped_column(Numeric(14, 2))
+    # Drawdowns only: the rate on the drawdown date once one exists (see services/locked_rates.py).
+    kibor_rate_percent: Mapped[float | None] = mapped_column(Numeric(12, 6), nullable=True)
     note: Mapped[str | None] = mapped_column(String(256), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Ledger, report and paginated list reads filter on (bank_id, loan_id)
+        # and walk (date, id); principal sums are answered from the index alone.
+        Index(
+            "ix_transactions_bank_loan_date_id",
+            "bank_id",
+            "loan_id",
+            "date",
+            "id",
+            postgresql_include=["category", "amount"],
+        ),
+        # Drawdown dates drive KIBOR anchors and the sync plan.
+        Index(
+            "ix_transactions_drawdowns",
+            "bank_id",
+            "loan_id",
+            "date",
+            postgresql_where=text("category = 'principal' AND amount > 0"),
+        ),
+    )
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from datetime import date
+
+class KiborImportOut(BaseModel):
+    days: int
+    rows_written: int
+    first_date: date | None = None
+    last_date: date | None = None
+    skipped: list[str] = []
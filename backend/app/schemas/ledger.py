@@ -1,9 +1,32 @@
 from pydantic import BaseModel
 from datetime import date
 
+from app.schemas.backfill import BackfillStatusOut
+
 class LedgerRow(BaseModel):
     date: date
     principal_balance: float
     daily_markup: float
     accrued_markup: float
     rate_percent: float
+
+class LedgerColumnarOut(BaseModel):
+    # format=columnar: one array per field; day i is base_date + date[i] days.
+    base_date: date
+    date: list[int]
+    principal_balance: list[float]
+    daily_markup: list[float]
+    accrued_markup: list[float]
+    rate_percent: list[float]
+
+class ProvisionalLedgerRow(LedgerRow):
+    provisional: bool = False
+
+class ProvisionalLedgerOut(BaseModel):
+    rows: list[ProvisionalLedgerRow]
+    provisional: bool
+    # KIBOR anchor dates still being backfilled; their rates were estimated.
+    missing_dates: list[date]
+    # Pass back as `since` once backfill completes to fetch only the rows that change.
+    version: str | None = None
+    backfill: BackfillStatusOut | None = None
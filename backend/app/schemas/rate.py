@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, datetime
+from typing import Literal
 
 class RateCreate(BaseModel):
     effective_date: date
@@ -13,6 +14,7 @@ class RateOut(BaseModel):
     effective_date: date
     annual_rate_percent: float
     created_at: datetime
+    source: Literal["override", "fixing"] = "override"
 
     class Config:
         from_attributes = True
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from datetime import date
+
+class TrancheOut(BaseModel):
+    source_tx_id: int
+    start_date: date
+    original_amount: float
+    remaining_amount: float
+    locked_rate_percent: float | None = None
+    closed_date: date | None = None
+
+    class Config:
+        from_attributes = True
+
+class TrancheRebuildOut(BaseModel):
+    tranches: int
@@ -39,8 +39,17 @@ class TxOut(BaseModel):
     category: TxCategory
     amount: float
     kibor_rate_percent: float | None = None
+    kibor_rate_pending: bool = False
     note: str | None
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TxBulkOut(BaseModel):
+    inserted: int
+    first_date: date | None = None
+    last_date: date | None = None
+    principal_total: float = 0.0
+    markup_total: float = 0.0
+    kibor_rate_pending: bool = False
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+# Wakes SSE listeners when a backfill worker in this process makes progress.
+# Workers run in threads, so listeners are woken through their own event loop.
+# Workers in other processes are not seen here; listeners fall back to a slow
+# re-read of the job row for those.
+
+_lock = threading.Lock()
+_listeners: dict[int, set[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+
+def notify_progress(loan_ids: Iterable[int]) -> None:
+    with _lock:
+        targets = [t for loan_id in set(loan_ids) for t in _listeners.get(int(loan_id), ())]
+    for loop, ev in targets:
+        try:
+            loop.call_soon_threadsafe(ev.set)
+        except RuntimeError:
+            # The listener's loop has already shut down.
+            pass
+
+
+@contextmanager
+def subscribe(loan_id: int) -> Iterator[asyncio.Event]:
+    ev = asyncio.Event()
+    key = (asyncio.get_running_loop(), ev)
+    with _lock:
+        _listeners.setdefault(int(loan_id), set()).add(key)
+    try:
+        yield ev
+    finally:
+        with _lock:
+            listeners = _listeners.get(int(loan_id))
+            if listeners is not None:
+                listeners.discard(key)
+                if not listeners:
+                    del _listeners[int(loan_id)]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixingsVersion
+from app.models.loan import Loan
+
+# Loans and banks carry a counter that writers bump in their own transaction,
+# and the shared fixings have one counter of their own. A loan's ledger and
+# transaction list depend on its own rows and on its bank's rates (overrides
+# plus the fixings), so their validators combine all three; the rates list
+# needs the bank's and the fixings'.
+
+Stamp = tuple[str, datetime | None]
+
+
+def bump_loan(s: Session, loan_id: int) -> None:
+    s.execute(
+        update(Loan)
+        .where(Loan.id == loan_id)
+        .values(data_version=Loan.data_version + 1, data_updated_at=func.now())
+    )
+
+
+def bump_bank(s: Session, bank_id: int) -> None:
+    s.execute(
+        update(Bank)
+        .where(Bank.id == bank_id)
+        .values(data_version=Bank.data_version + 1, data_updated_at=func.now())
+    )
+
+
+def bump_fixings(s: Session) -> None:
+    stmt = pg_insert(KiborFixingsVersion).values(id=1, data_version=1, data_updated_at=func.now())
+    s.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"data_version": KiborFixingsVersion.data_version + 1, "data_updated_at": func.now()},
+        )
+    )
+
+
+def _fixings():
+    return (
+        select(KiborFixingsVersion.data_version, KiborFixingsVersion.data_updated_at)
+        .where(KiborFixingsVersion.id == 1)
+        .subquery()
+    )
+
+
+def _stamp(version: str, *at) -> Stamp:
+    stamps = [t for t in at if t is not None]
+    return version, max(stamps) if stamps else None
+
+
+def loan_stamp(s: Session, bank_id: int, loan_id: int) -> Stamp | None:
+    fx = _fixings()
+    row = s.execute(
+        select(Bank.data_version, Bank.data_updated_at, Loan.data_version, Loan.data_updated_at, fx)
+        .join(Loan, Loan.bank_id == Bank.id)
+        .outerjoin(fx, fx.c.data_version.is_not(None))
+        .where(Bank.id == bank_id, Loan.id == loan_id)
+    ).one_or_none()
+    if row is None:
+        return None
+    bank_v, bank_at, loan_v, loan_at, fx_v, fx_at = row
+    return _stamp(f"b{bank_id}.{bank_v}-f{fx_v or 0}-l{loan_id}.{loan_v}", bank_at, loan_at, fx_at)
+
+
+def bank_stamp(s: Session, bank_id: int) -> Stamp | None:
+    fx = _fixings()
+    row = s.execute(
+        select(Bank.data_version, Bank.data_updated_at, fx)
+        .outerjoin(fx, fx.c.data_version.is_not(None))
+        .where(Bank.id == bank_id)
+    ).one_or_none()
+    if row is None:
+        return None
+    bank_v, bank_at, fx_v, fx_at = row
+    return _stamp(f"b{bank_id}.{bank_v}-f{fx_v or 0}", bank_at, fx_at)
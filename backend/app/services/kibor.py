@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import Iterable
 import io
+import multiprocessing
+import random
 import re
+import threading
+import time
 
 import httpx
 import pdfplumber
 
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.kibor_cache import ParseCache, pdf_digest
+
 
 MONTH_ABBR = [
     "Jan",
@@ -58,7 +68,8 @@ def _candidate_urls(d: date) -> list[str]:
     dd = f"{d.day:02d}"
     yy = f"{d.year % 100:02d}"
 
-    base = f"https://www.sbp.org.pk/ecodata/kibor/{yyyy}/{mon}/"
+    root = (getattr(settings, "kibor_base_url", "") or "https://www.sbp.org.pk/ecodata/kibor").rstrip("/")
+    base = f"{root}/{yyyy}/{mon}/"
     names = [
         f"Kibor-{dd}-{mon}-{yy}.pdf",
         f"kibor-{dd}-{mon}-{yy}.pdf",
@@ -68,7 +79,79 @@ def _candidate_urls(d: date) -> list[str]:
     return [base + n for n in names]
 
 
-def fetch_kibor_pdf_bytes(d: date, *, timeout_s: float = 15.0) -> tuple[bytes, date]:
+class KiborUnavailable(RuntimeError):
+    # The publisher is down or too slow (circuit open or retry budget spent).
+    # Unlike kibor_pdf_not_found, retrying later is expected to succeed.
+    pass
+
+
+class RetryBudget:
+    # Transient-failure retries one caller (e.g. a backfill job run) may spend
+    # across all of its fetches. Thread-safe so it can be shared.
+
+    def __init__(self, retries: int):
+        self._remaining = max(0, int(retries))
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+_breaker = CircuitBreaker(
+    failure_threshold=int(getattr(settings, "kibor_breaker_failure_threshold", 5) or 5),
+    reset_seconds=float(getattr(settings, "kibor_breaker_reset_seconds", 60) or 60),
+)
+
+
+def kibor_breaker() -> CircuitBreaker:
+    return _breaker
+
+
+def _backoff_seconds(attempt: int) -> float:
+    base = float(getattr(settings, "kibor_backoff_base_seconds", 0.5) or 0.5)
+    cap = float(getattr(settings, "kibor_backoff_max_seconds", 8) or 8)
+    # Full jitter keeps concurrent workers from retrying in lockstep.
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def _get(client: httpx.Client, url: str, budget: RetryBudget | None) -> httpx.Response | None:
+    retries = max(0, int(getattr(settings, "kibor_fetch_retries", 2) or 0))
+    attempt = 0
+    while True:
+        if not _breaker.allow():
+            raise KiborUnavailable(f"kibor_circuit_open:retry_after={_breaker.retry_after():.0f}s")
+        try:
+            r = client.get(url)
+        except httpx.HTTPError:
+            r = None
+        if r is not None and r.status_code < 500:
+            # A 404 is an answer (no sheet under this name), not an outage.
+            _breaker.record_success()
+            return r
+
+        _breaker.record_failure()
+        if attempt >= retries or (budget is not None and not budget.spend()):
+            raise KiborUnavailable(f"kibor_fetch_failed:{url}")
+        time.sleep(_backoff_seconds(attempt))
+        attempt += 1
+
+
+def fetch_kibor_pdf_bytes(
+    d: date,
+    *,
+    timeout_s: float | None = None,
+    budget: RetryBudget | None = None,
+) -> tuple[bytes, date]:
+    if timeout_s is None:
+        timeout_s = float(getattr(settings, "kibor_fetch_timeout_seconds", 15) or 15)
     probe = adjust_to_last_business_day(d)
 
     with httpx.Client(timeout=timeout_s, follow_redirects=True) as client:
@@ -76,8 +159,8 @@ def fetch_kibor_pdf_bytes(d: date, *, timeout_s: float = 15.0) -> tuple[bytes, d
             probe = adjust_to_last_business_day(probe)
 
             for url in _candidate_urls(probe):
-                r = client.get(url)
-                if r.status_code == 200 and r.content:
+                r = _get(client, url, budget)
+                if r is not None and r.status_code == 200 and r.content:
                     return (r.content, probe)
 
             probe = probe - timedelta(days=1)
@@ -104,24 +187,173 @@ def _extract_offer_rate_for_tenor(text: str, tenor_months: int) -> float | None:
     return None
 
 
-def parse_kibor_offer_rates(pdf_bytes: bytes) -> tuple[float, float, float, float, float]:
+def _offer_rates_from_text(text: str) -> dict[int, float | None]:
+    return {tenor: _extract_offer_rate_for_tenor(text, tenor) for tenor in _TENOR_PATTERNS}
+
+
+def _parse_offer_rates_local(pdf_bytes: bytes) -> tuple[float, float, float, float, float]:
+    # The offer table sits on the first page of every sheet we have seen, so only
+    # extract the remaining pages when a tenor could not be found there.
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        text = "\n".join((p.extract_text() or "") for p in pdf.pages)
+        pages = pdf.pages
+        text = (pages[0].extract_text() or "") if pages else ""
+        found = _offer_rates_from_text(text)
 
-    o1 = _extract_offer_rate_for_tenor(text, 1)
-    o3 = _extract_offer_rate_for_tenor(text, 3)
-    o6 = _extract_offer_rate_for_tenor(text, 6)
-    o9 = _extract_offer_rate_for_tenor(text, 9)
-    o12 = _extract_offer_rate_for_tenor(text, 12)
+        if any(v is None for v in found.values()) and len(pages) > 1:
+            rest = "\n".join((p.extract_text() or "") for p in pages[1:])
+            found = _offer_rates_from_text(text + "\n" + rest)
 
+    o1, o3, o6, o9, o12 = (found[t] for t in (1, 3, 6, 9, 12))
     if o1 is None or o3 is None or o6 is None or o9 is None or o12 is None:
         raise RuntimeError("kibor_parse_failed")
 
     return (o1, o3, o6, o9, o12)
 
 
-def get_kibor_offer_rates(d: date) -> KiborRates:
-    pdf_bytes, resolved_date = fetch_kibor_pdf_bytes(d)
+def _parse_offer_rates_or_none(pdf_bytes: bytes) -> tuple[float, float, float, float, float] | None:
+    try:
+        return _parse_offer_rates_local(pdf_bytes)
+    except Exception:
+        return None
+
+
+_pool_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+
+
+def _parse_workers() -> int:
+    return max(0, int(getattr(settings, "kibor_parse_workers", 2) or 0))
+
+
+def _parse_pool() -> ProcessPoolExecutor | None:
+    global _pool
+
+    workers = _parse_workers()
+    if workers <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (uvicorn, backfill
+            # workers) and forking those is not safe.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_parse_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Bump whenever parsing logic changes so cached results are re-derived.
+PARSER_VERSION = 2
+
+_cache_lock = threading.Lock()
+_cache: ParseCache | None = None
+
+
+def parse_cache() -> ParseCache:
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache(
+                getattr(settings, "kibor_parse_cache_dir", "") or None,
+                max_entries=int(getattr(settings, "kibor_parse_cache_size", 512) or 512),
+            )
+        return _cache
+
+
+def _parse_uncached(pdf_bytes: bytes) -> tuple[float, float, float, float, float]:
+    pool = _parse_pool()
+    if pool is None:
+        return _parse_offer_rates_local(pdf_bytes)
+    return pool.submit(_parse_offer_rates_local, pdf_bytes).result()
+
+
+def _parse_many_uncached(
+    pdfs: list[bytes],
+) -> list[tuple[float, float, float, float, float] | None]:
+    pool = _parse_pool()
+    if pool is None:
+        return [_parse_offer_rates_or_none(b) for b in pdfs]
+
+    # Keep a bounded number of sheets in flight so a multi-year batch does not
+    # queue every PDF's bytes into the pool at once.
+    window = _parse_workers() * 4
+    out: list[tuple[float, float, float, float, float] | None] = []
+    pending: list[Future] = []
+    for b in pdfs:
+        pending.append(pool.submit(_parse_offer_rates_or_none, b))
+        if len(pending) >= window:
+            out.append(pending.pop(0).result())
+    out.extend(f.result() for f in pending)
+    return out
+
+
+def parse_kibor_offer_rates(pdf_bytes: bytes) -> tuple[float, float, float, float, float]:
+    cache = parse_cache()
+    key = pdf_digest(pdf_bytes)
+    hit = cache.get(key, PARSER_VERSION)
+    if hit is not None:
+        return hit
+
+    rates = _parse_uncached(pdf_bytes)
+    cache.put(key, PARSER_VERSION, rates, pdf_bytes)
+    return rates
+
+
+def parse_kibor_offer_rates_many(
+    pdfs: Iterable[bytes],
+) -> list[tuple[float, float, float, float, float] | None]:
+    # Results keep input order; None marks a sheet that failed to parse.
+    cache = parse_cache()
+    pdfs = list(pdfs)
+    keys = [pdf_digest(b) for b in pdfs]
+    out: list[tuple[float, float, float, float, float] | None] = [cache.get(k, PARSER_VERSION) for k in keys]
+
+    # Identical sheets (e.g. several holidays resolving to the same PDF) are parsed once.
+    todo: dict[str, bytes] = {}
+    for k, b, hit in zip(keys, pdfs, out):
+        if hit is None:
+            todo.setdefault(k, b)
+
+    parsed = dict(zip(todo, _parse_many_uncached(list(todo.values()))))
+    for k, rates in parsed.items():
+        if rates is not None:
+            cache.put(k, PARSER_VERSION, rates, todo[k])
+
+    return [hit if hit is not None else parsed.get(k) for k, hit in zip(keys, out)]
+
+
+def reparse_stale_cache(batch_size: int = 64) -> int:
+    cache = parse_cache()
+    keys = list(cache.stale_keys(PARSER_VERSION))
+
+    done = 0
+    for i in range(0, len(keys), batch_size):
+        chunk: list[tuple[str, bytes]] = []
+        for k in keys[i : i + batch_size]:
+            b = cache.pdf_bytes(k)
+            if b is not None:
+                chunk.append((k, b))
+
+        for (k, b), rates in zip(chunk, _parse_many_uncached([b for _, b in chunk])):
+            if rates is not None:
+                cache.put(k, PARSER_VERSION, rates, b)
+                done += 1
+    return done
+
+
+def get_kibor_offer_rates(d: date, *, budget: RetryBudget | None = None) -> KiborRates:
+    pdf_bytes, resolved_date = fetch_kibor_pdf_bytes(d, budget=budget)
     o1, o3, o6, o9, o12 = parse_kibor_offer_rates(pdf_bytes)
     return KiborRates(
         effective_date=resolved_date,
@@ -1,58 +1,98 @@
 from __future__ import annotations
 
+import logging
+import os
+import socket
 import threading
-from dataclasses import dataclass, asdict
+import time
 from datetime import date, datetime, timedelta
 from typing import Dict, Any
 
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, or_, select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.session import SessionLocal
+from app.models.backfill_job import BackfillJob
 from app.models.bank import Bank
 from app.models.loan import Loan
-from app.models.rate import Rate
 from app.models.transaction import Transaction
-from app.services.kibor import get_kibor_offer_rates, adjust_to_last_business_day
+from app.services.backfill_events import notify_progress
+from app.services.kibor import (
+    KiborUnavailable,
+    RetryBudget,
+    adjust_to_last_business_day,
+    get_kibor_offer_rates,
+    kibor_breaker,
+)
+from app.services.kibor_coverage import invalidate_coverage, load_missing, reserve_coverage, store_missing
+from app.services.kibor_rates import covered_dates, fixing_values, fixings_changed, insert_fixings, rate_history
 from app.utils.timezone import today_karachi
 
-@dataclass
-class _Status:
-    status: str = "idle"  # idle | running | done | error
-    total_days: int = 0
-    processed_days: int = 0
-    started_at: str | None = None
-    message: str | None = None
+# Jobs live in the backfill_jobs table (one row per loan) so progress survives
+# restarts and every API worker sees the same state. Workers claim rows with
+# SELECT ... FOR UPDATE SKIP LOCKED and hold them with a heartbeat; a row whose
+# heartbeat goes stale is picked up again by another worker.
 
+_ACTIVE = ("queued", "running")
 
-_lock = threading.Lock()
-_status: Dict[str, _Status] = {}
+_wake = threading.Event()
 
 
-def _key(bank_id: int, loan_id: int) -> str:
-    return f"{bank_id}:{loan_id}"
+def _utcnow() -> datetime:
+    return datetime.utcnow()
 
 
-def _iso_now() -> str:
-    return datetime.utcnow().isoformat() + "Z"
+def _iso(dt: datetime | None) -> str | None:
+    return dt.isoformat() + "Z" if dt is not None else None
 
 
-def get_status(bank_id: int, loan_id: int) -> Dict[str, Any]:
-    k = _key(bank_id, loan_id)
-    with _lock:
-        st = _status.get(k) or _Status()
-        _status[k] = st
-        return asdict(st)
+def _heartbeat_timeout() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "backfill_heartbeat_timeout_seconds", 120) or 120))
 
 
-def _set_status(bank_id: int, loan_id: int, **updates):
-    k = _key(bank_id, loan_id)
-    with _lock:
-        st = _status.get(k) or _Status()
-        for kk, vv in updates.items():
-            setattr(st, kk, vv)
-        _status[k] = st
+def _retry_delay(attempts: int) -> timedelta:
+    base = int(getattr(settings, "backfill_retry_base_seconds", 60) or 60)
+    return timedelta(seconds=min(base * (2 ** max(0, attempts - 1)), 3600))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _status_out(job: BackfillJob | None) -> Dict[str, Any]:
+    if job is None:
+        return {
+            "status": "idle",
+            "total_days": 0,
+            "processed_days": 0,
+            "started_at": None,
+            "updated_at": None,
+            "message": None,
+        }
+    # A queued job (waiting for a worker or a retry) is reported as running.
+    return {
+        "status": "running" if job.status == "queued" else job.status,
+        "total_days": int(job.total_days or 0),
+        "processed_days": int(job.processed_days or 0),
+        "started_at": _iso(job.started_at) if job.status in _ACTIVE else None,
+        "updated_at": _iso(job.updated_at),
+        "message": job.message,
+    }
+
+
+def _job_for(s: Session, bank_id: int, loan_id: int) -> BackfillJob | None:
+    return s.execute(
+        select(BackfillJob).where(BackfillJob.bank_id == bank_id, BackfillJob.loan_id == loan_id)
+    ).scalar_one_or_none()
+
+
+def get_status(bank_id: int, loan_id: int, s: Session | None = None) -> Dict[str, Any]:
+    if s is None:
+        with SessionLocal() as own:
+            return get_status(bank_id, loan_id, own)
+    return _status_out(_job_for(s, bank_id, loan_id))
 
 
 def _month_start(d: date) -> date:
@@ -107,96 +147,450 @@ def _compute_missing_days(s: Session, bank_id: int, loan_id: int) -> list[date]:
 
     tenor = int(loan.kibor_tenor_months)
 
-    existing = (
+    have = covered_dates(s, bank_id, tenor, anchor_dates)
+
+    return sorted(anchor_dates - have)
+
+
+def missing_days(s: Session, bank_id: int, loan_id: int) -> list[date]:
+    today = today_karachi()
+    cached, version = load_missing(s, bank_id, loan_id, _month_start(today))
+    if cached is not None:
+        return cached
+
+    if version is None and s.execute(select(Loan.id).where(Loan.id == loan_id, Loan.bank_id == bank_id)).first() is None:
+        return []
+    version = reserve_coverage(s, bank_id, loan_id, today)
+
+    missing = _compute_missing_days(s, bank_id, loan_id)
+    # Dropped if an invalidation came in meanwhile; the row stays stale and
+    # the next read computes again.
+    store_missing(s, bank_id, loan_id, today, missing, version)
+    return missing
+
+
+def _enqueue(s: Session, bank_id: int, loan_id: int, total_days: int) -> None:
+    now = _utcnow()
+    max_attempts = int(getattr(settings, "backfill_max_attempts", 5) or 5)
+    reset = {
+        "status": "queued",
+        "total_days": total_days,
+        "processed_days": 0,
+        "last_processed_date": None,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_after": now,
+        "locked_by": None,
+        "heartbeat_at": None,
+        "started_at": now,
+        "finished_at": None,
+        "updated_at": now,
+        "message": None,
+    }
+    stmt = pg_insert(BackfillJob).values({"bank_id": bank_id, "loan_id": loan_id, **reset})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["loan_id"],
+        set_=reset,
+        where=BackfillJob.status.not_in(_ACTIVE),
+    )
+    s.execute(stmt)
+    s.commit()
+
+
+def _mark_done(s: Session, bank_id: int, loan_id: int) -> None:
+    job = _job_for(s, bank_id, loan_id)
+    if job is None or job.status in _ACTIVE:
+        return
+    job.status = "done"
+    job.message = None
+    job.updated_at = _utcnow()
+    s.commit()
+
+
+def ensure_started(bank_id: int, loan_id: int, s: Session | None = None) -> Dict[str, Any]:
+    if s is None:
+        with SessionLocal() as own:
+            return ensure_started(bank_id, loan_id, own)
+
+    job = _job_for(s, bank_id, loan_id)
+    if job is not None and job.status in _ACTIVE:
+        return _status_out(job)
+
+    missing = missing_days(s, bank_id, loan_id)
+    if not missing:
+        _mark_done(s, bank_id, loan_id)
+    else:
+        _enqueue(s, bank_id, loan_id, len(missing))
+        _wake.set()
+
+    s.expire_all()
+    return _status_out(_job_for(s, bank_id, loan_id))
+
+
+def claim_jobs(s: Session, worker_id: str, limit: int = 1) -> list[BackfillJob]:
+    now = _utcnow()
+    stale = now - _heartbeat_timeout()
+    jobs = (
         s.execute(
-            select(Rate.effective_date).where(
-                Rate.bank_id == bank_id,
-                Rate.tenor_months == tenor,
-                Rate.effective_date.in_(sorted(anchor_dates)),
+            select(BackfillJob)
+            .where(
+                or_(
+                    and_(BackfillJob.status == "queued", BackfillJob.run_after <= now),
+                    and_(BackfillJob.status == "running", BackfillJob.heartbeat_at < stale),
+                )
             )
+            .order_by(BackfillJob.run_after.asc(), BackfillJob.id.asc())
+            .limit(max(1, int(limit)))
+            .with_for_update(skip_locked=True)
         )
         .scalars()
         .all()
     )
-    have = set(existing)
+    if not jobs:
+        s.rollback()
+        return []
 
-    return sorted(anchor_dates - have)
+    for job in jobs:
+        job.status = "running"
+        job.locked_by = worker_id
+        job.heartbeat_at = now
+        job.updated_at = now
+        job.attempts = int(job.attempts or 0) + 1
+    s.commit()
+    return list(jobs)
 
 
-def _run_job(bank_id: int, loan_id: int):
-    s = SessionLocal()
-    try:
-        loan = s.execute(select(Loan).where(Loan.id == loan_id, Loan.bank_id == bank_id)).scalar_one()
-        tenor = int(loan.kibor_tenor_months)
+def claim_job(s: Session, worker_id: str) -> BackfillJob | None:
+    jobs = claim_jobs(s, worker_id, 1)
+    return jobs[0] if jobs else None
 
-        missing = _compute_missing_days(s, bank_id, loan_id)
-        if not missing:
-            _set_status(bank_id, loan_id, status="done", total_days=0, processed_days=0, started_at=None, message=None)
-            return
 
-        processed = 0
-        for d in missing:
+def _heartbeat(s: Session, job: BackfillJob, worker_id: str, **updates) -> bool:
+    now = _utcnow()
+    res = s.execute(
+        update(BackfillJob)
+        .where(BackfillJob.id == job.id, BackfillJob.locked_by == worker_id, BackfillJob.status == "running")
+        .values(heartbeat_at=now, updated_at=now, **updates)
+    )
+    s.commit()
+    # False means another worker took the job over after our heartbeat went stale.
+    return res.rowcount == 1
+
+
+def _heartbeat_many(s: Session, worker_id: str, progress: dict[int, dict[str, Any]]) -> set[int]:
+    if not progress:
+        return set()
+    now = _utcnow()
+    t = BackfillJob.__table__
+    s.execute(
+        t.update()
+        .where(t.c.id == bindparam("job_id"), t.c.locked_by == worker_id, t.c.status == "running")
+        .values(
+            heartbeat_at=now,
+            updated_at=now,
+            total_days=bindparam("total"),
+            processed_days=bindparam("processed"),
+            last_processed_date=bindparam("last_day"),
+        ),
+        [{"job_id": job_id, **p} for job_id, p in progress.items()],
+    )
+    alive = set(
+        s.execute(
+            select(BackfillJob.id).where(
+                BackfillJob.id.in_(list(progress)),
+                BackfillJob.locked_by == worker_id,
+                BackfillJob.status == "running",
+            )
+        )
+        .scalars()
+        .all()
+    )
+    s.commit()
+    return alive
+
+
+def _finish(
+    s: Session,
+    job: BackfillJob,
+    worker_id: str,
+    failed_days: list[date],
+    unavailable: bool = False,
+) -> None:
+    now = _utcnow()
+    values: dict[str, Any] = {"locked_by": None, "heartbeat_at": None, "updated_at": now}
+    if not failed_days:
+        values.update(status="done", finished_at=now, message=None)
+        # The fixings this job wrote close its gaps; make the next is_ready
+        # recompute instead of trusting a list stored before they landed.
+        invalidate_coverage(s, loan_id=int(job.loan_id))
+    elif unavailable:
+        # The publisher being down is not the job's fault: requeue without
+        # spending an attempt, no earlier than the circuit lets calls through.
+        wait = max(kibor_breaker().retry_after(), float(getattr(settings, "backfill_retry_base_seconds", 60) or 60))
+        values.update(
+            status="queued",
+            attempts=max(0, int(job.attempts or 0) - 1),
+            run_after=now + timedelta(seconds=wait),
+            message=f"kibor unavailable; retrying {len(failed_days)} day(s) from {failed_days[0].isoformat()}",
+        )
+    elif int(job.attempts or 0) < int(job.max_attempts or 1):
+        values.update(
+            status="queued",
+            run_after=now + _retry_delay(int(job.attempts or 0)),
+            message=f"retrying {len(failed_days)} day(s) from {failed_days[0].isoformat()}",
+        )
+    else:
+        values.update(
+            status="error",
+            finished_at=now,
+            message=f"kibor_fetch_failed for {len(failed_days)} day(s) from {failed_days[0].isoformat()}",
+        )
+    s.execute(
+        update(BackfillJob).where(BackfillJob.id == job.id, BackfillJob.locked_by == worker_id).values(**values)
+    )
+    s.commit()
+    notify_progress([job.loan_id])
+
+
+def _fill_placeholders(s: Session, loan_ids: set[int]) -> None:
+    # Loans without a placeholder rate take the rate of their earliest
+    # drawdown that has one, which the first add_tx used to set synchronously.
+    if not loan_ids:
+        return
+
+    loans = (
+        s.execute(
+            select(Loan).where(
+                Loan.id.in_(sorted(loan_ids)),
+                or_(Loan.kibor_placeholder_rate_percent.is_(None), Loan.kibor_placeholder_rate_percent <= 0),
+            )
+        )
+        .scalars()
+        .all()
+    )
+    for loan in loans:
+        tenor = int(loan.kibor_tenor_months)
+        drawdowns = (
+            s.execute(
+                select(Transaction.date)
+                .where(
+                    Transaction.bank_id == loan.bank_id,
+                    Transaction.loan_id == loan.id,
+                    Transaction.category == "principal",
+                    Transaction.amount > 0,
+                )
+                .distinct()
+            )
+            .scalars()
+            .all()
+        )
+        have = covered_dates(s, loan.bank_id, tenor, drawdowns)
+        if not have:
+            continue
+        first = min(have)
+        rate = dict(rate_history(s, loan.bank_id, first, tenor).get(tenor, [])).get(first)
+        if rate is not None:
+            loan.kibor_placeholder_rate_percent = float(rate)
+
+
+def plan_fetches(s: Session, jobs: list[BackfillJob]) -> dict[date, dict[date, list[int]]]:
+    # fetch day -> anchor day -> job ids. Anchors that fall on the same business
+    # day (a weekend month start and the Friday before, or the same drawdown date
+    # on several loans) share one sheet, and the sheet carries every tenor.
+    plan: dict[date, dict[date, list[int]]] = {}
+    for job in jobs:
+        for d in _compute_missing_days(s, int(job.bank_id), int(job.loan_id)):
+            plan.setdefault(adjust_to_last_business_day(d), {}).setdefault(d, []).append(job.id)
+    return plan
+
+
+def _run_jobs(s: Session, jobs: list[BackfillJob], worker_id: str) -> None:
+    active = {job.id: job for job in jobs}
+
+    # Days finished by an earlier attempt are already covered, so a resumed job
+    # only sees what is left.
+    plan = plan_fetches(s, jobs)
+    progress: dict[int, dict[str, Any]] = {
+        job.id: {
+            "total": int(job.processed_days or 0),
+            "processed": int(job.processed_days or 0),
+            "last_day": job.last_processed_date,
+        }
+        for job in jobs
+    }
+    for anchors in plan.values():
+        for ids in anchors.values():
+            for job_id in ids:
+                progress[job_id]["total"] += 1
+
+    alive = _heartbeat_many(s, worker_id, progress)
+    failed: dict[int, list[date]] = {}
+    # The subset of failed days that were only deferred by the breaker.
+    deferred: dict[int, set[date]] = {}
+
+    # Fetched fixings are buffered and written as one multi-row upsert per
+    # flush; progress only advances once the rows are committed.
+    flush_days = max(1, int(getattr(settings, "backfill_flush_days", 50) or 50))
+    flush_seconds = float(getattr(settings, "backfill_flush_seconds", 10) or 10)
+    buffered: list[dict] = []
+    buffered_anchors: list[tuple[date, list[int]]] = []
+    last_flush = time.monotonic()
+
+    def flush() -> set[int]:
+        nonlocal buffered, buffered_anchors, last_flush
+        if not buffered_anchors:
+            last_flush = time.monotonic()
+            return _heartbeat_many(s, worker_id, {i: progress[i] for i in alive})
+        try:
+            # Same lock order as add_tx: loans before coverage and transactions.
+            written = insert_fixings(s, buffered)
+            _fill_placeholders(s, {int(active[i].loan_id) for _, ids in buffered_anchors for i in ids})
+            if written:
+                fixings_changed(s, [v["effective_date"] for v in buffered])
+            s.commit()
+        except Exception:
+            s.rollback()
+            for d, ids in buffered_anchors:
+                for job_id in ids:
+                    failed.setdefault(job_id, []).append(d)
+            now_alive = alive
+        else:
+            for d, ids in buffered_anchors:
+                for job_id in ids:
+                    progress[job_id]["processed"] += 1
+                    if progress[job_id]["last_day"] is None or d > progress[job_id]["last_day"]:
+                        progress[job_id]["last_day"] = d
+            now_alive = _heartbeat_many(s, worker_id, {i: progress[i] for i in alive})
+            notify_progress(active[i].loan_id for _, ids in buffered_anchors for i in ids)
+        buffered, buffered_anchors = [], []
+        last_flush = time.monotonic()
+        return now_alive
+
+    budget = RetryBudget(int(getattr(settings, "backfill_retry_budget", 20) or 0))
+    unavailable = False
+
+    for fetch_day in sorted(plan):
+        # Checked before every fetch, failed ones included: a single fetch can
+        # outlast the heartbeat timeout, and an outage produces nothing to
+        # flush, so the lease would otherwise go stale mid-batch.
+        if len(buffered_anchors) >= flush_days or time.monotonic() - last_flush >= flush_seconds:
+            alive = flush()
+
+        anchors = {d: [i for i in ids if i in alive] for d, ids in plan[fetch_day].items()}
+        anchors = {d: ids for d, ids in anchors.items() if ids}
+        if not anchors:
+            continue
+
+        if not unavailable:
             try:
-                fetch_day = adjust_to_last_business_day(d)
-                kib = get_kibor_offer_rates(fetch_day)
-                offer = kib.by_tenor_months().get(tenor)
-                if offer is not None:
-                    stmt = (
-                        pg_insert(Rate)
-                        .values(
-                            {
-                                "bank_id": bank_id,
-                                "tenor_months": tenor,
-                                "effective_date": d,  # IMPORTANT: store the ANCHOR date (tx date / month-start)
-                                "annual_rate_percent": offer,
-                            }
-                        )
-                        .on_conflict_do_nothing(index_elements=["bank_id", "tenor_months", "effective_date"])
-                    )
-                    s.execute(stmt)
-                    s.commit()
+                kib = get_kibor_offer_rates(fetch_day, budget=budget)
+            except KiborUnavailable:
+                # Stop probing for the rest of the batch; every remaining day
+                # is requeued below rather than waiting out more timeouts.
+                logging.warning("kibor publisher unavailable; deferring backfill from %s", fetch_day)
+                unavailable = True
             except Exception:
-                s.rollback()
-
-            processed += 1
-            _set_status(bank_id, loan_id, processed_days=processed)
-    except Exception as e:
-        _set_status(bank_id, loan_id, status="error", message=str(e))
-    finally:
-        s.close()
-        st = get_status(bank_id, loan_id)
-        if st.get("status") != "error":
-            _set_status(bank_id, loan_id, status="done", message=None, started_at=None)
-
-
-def ensure_started(bank_id: int, loan_id: int) -> Dict[str, Any]:
-    st = get_status(bank_id, loan_id)
-    if st.get("status") == "running":
-        return st
-
-    s = SessionLocal()
-    try:
-        missing = _compute_missing_days(s, bank_id, loan_id)
-    finally:
-        s.close()
+                for d, ids in anchors.items():
+                    for job_id in ids:
+                        failed.setdefault(job_id, []).append(d)
+                continue
+
+        if unavailable:
+            for d, ids in anchors.items():
+                for job_id in ids:
+                    failed.setdefault(job_id, []).append(d)
+                    deferred.setdefault(job_id, set()).add(d)
+            continue
+
+        for d in sorted(anchors):
+            # IMPORTANT: store the ANCHOR date (tx date / month-start)
+            buffered.extend(fixing_values(kib, d))
+            buffered_anchors.append((d, anchors[d]))
+
+    alive = flush()
+
+    for job_id in alive:
+        days = sorted(failed.get(job_id, []))
+        # Only a job the breaker alone held back gets its attempt refunded;
+        # any ordinary failure still counts towards max_attempts.
+        refund = bool(days) and set(days) <= deferred.get(job_id, set())
+        _finish(s, active[job_id], worker_id, days, unavailable=refund)
+
+
+def _run_job(s: Session, job: BackfillJob, worker_id: str) -> None:
+    _run_jobs(s, [job], worker_id)
+
+
+def run_next_job(worker_id: str) -> bool:
+    limit = int(getattr(settings, "backfill_batch_jobs", 50) or 50)
+    with SessionLocal() as s:
+        jobs = claim_jobs(s, worker_id, limit)
+        if not jobs:
+            return False
+        try:
+            _run_jobs(s, jobs, worker_id)
+        except Exception as e:
+            logging.exception("kibor backfill batch failed")
+            s.rollback()
+            now = _utcnow()
+            for job in jobs:
+                s.execute(
+                    update(BackfillJob)
+                    .where(BackfillJob.id == job.id, BackfillJob.locked_by == worker_id)
+                    .values(
+                        status="queued" if int(job.attempts or 0) < int(job.max_attempts or 1) else "error",
+                        run_after=now + _retry_delay(int(job.attempts or 0)),
+                        locked_by=None,
+                        heartbeat_at=None,
+                        updated_at=now,
+                        message=str(e)[:512],
+                    )
+                )
+            s.commit()
+            notify_progress(job.loan_id for job in jobs)
+        return True
 
-    if not missing:
-        _set_status(bank_id, loan_id, status="done", total_days=0, processed_days=0, started_at=None, message=None)
-        return get_status(bank_id, loan_id)
-
-    _set_status(
-        bank_id,
-        loan_id,
-        status="running",
-        total_days=len(missing),
-        processed_days=0,
-        started_at=_iso_now(),
-        message=None,
-    )
-    t = threading.Thread(target=_run_job, args=(bank_id, loan_id), daemon=True)
-    t.start()
-    return get_status(bank_id, loan_id)
+
+def drain(worker_id: str | None = None) -> int:
+    worker_id = worker_id or default_worker_id()
+    n = 0
+    while run_next_job(worker_id):
+        n += 1
+    return n
+
+
+def run_worker(stop: threading.Event, worker_id: str | None = None) -> None:
+    worker_id = worker_id or default_worker_id()
+    poll = max(1, int(getattr(settings, "backfill_worker_poll_seconds", 5) or 5))
+    while not stop.is_set():
+        try:
+            if run_next_job(worker_id):
+                continue
+        except Exception:
+            logging.exception("kibor backfill worker loop failed")
+        _wake.wait(timeout=poll)
+        _wake.clear()
+
+
+_worker_stop = threading.Event()
+_worker_threads: list[threading.Thread] = []
+
+
+def start_in_process_workers() -> None:
+    if _worker_threads:
+        return
+    _worker_stop.clear()
+    for _ in range(max(1, int(getattr(settings, "backfill_worker_threads", 1) or 1))):
+        t = threading.Thread(target=run_worker, args=(_worker_stop,), daemon=True)
+        t.start()
+        _worker_threads.append(t)
+
+
+def stop_in_process_workers() -> None:
+    _worker_stop.set()
+    _wake.set()
+    _worker_threads.clear()
 
 
 def is_ready(s: Session, bank_id: int, loan_id: int) -> bool:
-    return len(_compute_missing_days(s, bank_id, loan_id)) == 0
\ No newline at end of file
+    return len(missing_days(s, bank_id, loan_id)) == 0
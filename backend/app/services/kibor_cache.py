@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator
+
+OfferRates = tuple[float, float, float, float, float]
+
+
+def pdf_digest(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class ParseCache:
+    # Parsed offer rates keyed by the sha256 of the sheet. Entries are kept in
+    # an in-memory LRU and, when a directory is configured, persisted next to
+    # the PDF itself so they can be re-parsed after a parser change.
+
+    def __init__(self, directory: str | os.PathLike | None, max_entries: int = 512):
+        self.directory = Path(directory) if directory else None
+        self.max_entries = max(1, int(max_entries))
+        self._mem: OrderedDict[str, tuple[int, OfferRates]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        assert self.directory is not None
+        d = self.directory / key[:2]
+        return d / f"{key}.json", d / f"{key}.pdf"
+
+    def _remember(self, key: str, version: int, rates: OfferRates) -> None:
+        with self._lock:
+            self._mem[key] = (version, rates)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def get(self, key: str, version: int) -> OfferRates | None:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key)
+        if hit is not None:
+            return hit[1] if hit[0] == version else None
+
+        if self.directory is None:
+            return None
+        meta_path, _ = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if int(meta.get("parser_version", -1)) != version:
+            return None
+
+        rates = tuple(float(v) for v in meta["rates"])
+        self._remember(key, version, rates)
+        return rates
+
+    def put(self, key: str, version: int, rates: OfferRates, pdf_bytes: bytes | None = None) -> None:
+        rates = tuple(float(v) for v in rates)
+        self._remember(key, version, rates)
+        if self.directory is None:
+            return
+
+        meta_path, pdf_path = self._paths(key)
+        try:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            if pdf_bytes is not None and not pdf_path.exists():
+                _atomic_write(pdf_path, pdf_bytes)
+            _atomic_write(meta_path, json.dumps({"parser_version": version, "rates": list(rates)}).encode())
+        except OSError:
+            # The disk layer is best-effort; the in-memory entry still serves hits.
+            pass
+
+    def stale_keys(self, version: int) -> Iterator[str]:
+        if self.directory is None or not self.directory.exists():
+            return
+        for meta_path in self.directory.glob("*/*.json"):
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            if int(meta.get("parser_version", -1)) != version and meta_path.with_suffix(".pdf").exists():
+                yield meta_path.stem
+
+    def pdf_bytes(self, key: str) -> bytes | None:
+        if self.directory is None:
+            return None
+        _, pdf_path = self._paths(key)
+        try:
+            return pdf_path.read_bytes()
+        except OSError:
+            return None
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._mem.clear()
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.kibor_coverage import LoanKiborCoverage
+
+# One row per loan recording which KIBOR anchor dates were still missing the
+# last time they were computed. Writers that can change the answer mark rows
+# stale and bump their version in their own transaction; the next is_ready
+# recomputes only stale rows, and the result is stored only if no invalidation
+# landed while it was being computed.
+#
+# Reads run inside GET handlers, so the row is written on a connection of its
+# own and never commits the caller's session.
+
+
+@contextmanager
+def _own_transaction(s: Session) -> Iterator[Connection]:
+    bind = s.get_bind()
+    if isinstance(bind, Connection):
+        # The session was handed a connection whose transaction its owner
+        # controls; join it rather than open a second one.
+        yield s.connection()
+        return
+    with bind.begin() as conn:
+        yield conn
+
+
+def load_missing(
+    s: Session, bank_id: int, loan_id: int, month_start: date
+) -> tuple[list[date] | None, int | None]:
+    # (missing, version): missing is None when the row needs a recompute,
+    # version is None when there is no row yet.
+    row = s.execute(
+        select(LoanKiborCoverage).where(LoanKiborCoverage.loan_id == loan_id, LoanKiborCoverage.bank_id == bank_id)
+    ).scalar_one_or_none()
+    if row is None:
+        return None, None
+    version = int(row.version or 0)
+    if row.stale or row.covered_through < month_start:
+        return None, version
+    return [date.fromisoformat(d) for d in (row.missing_dates or [])], version
+
+
+def reserve_coverage(s: Session, bank_id: int, loan_id: int, today: date) -> int:
+    # Marks the row stale (inserting a placeholder for a loan's first compute)
+    # so invalidations that land while the recompute runs bump its version.
+    stmt = pg_insert(LoanKiborCoverage).values(
+        loan_id=loan_id,
+        bank_id=bank_id,
+        covered_through=today,
+        missing_count=0,
+        missing_dates=[],
+        stale=True,
+        version=0,
+    )
+    with _own_transaction(s) as conn:
+        conn.execute(stmt.on_conflict_do_update(index_elements=["loan_id"], set_={"stale": True}))
+        return int(
+            conn.execute(select(LoanKiborCoverage.version).where(LoanKiborCoverage.loan_id == loan_id)).scalar_one()
+        )
+
+
+def store_missing(s: Session, bank_id: int, loan_id: int, today: date, missing: list[date], version: int) -> bool:
+    stmt = (
+        update(LoanKiborCoverage)
+        .where(LoanKiborCoverage.loan_id == loan_id, LoanKiborCoverage.version == version)
+        .values(
+            covered_through=today,
+            missing_count=len(missing),
+            missing_dates=[d.isoformat() for d in missing],
+            stale=False,
+            updated_at=func.now(),
+        )
+    )
+    with _own_transaction(s) as conn:
+        return conn.execute(stmt).rowcount == 1
+
+
+def invalidate_coverage(
+    s: Session,
+    *,
+    bank_id: int | None = None,
+    loan_id: int | None = None,
+    gaps_only: bool = False,
+) -> None:
+    stmt = update(LoanKiborCoverage)
+    if bank_id is not None:
+        stmt = stmt.where(LoanKiborCoverage.bank_id == bank_id)
+    if loan_id is not None:
+        stmt = stmt.where(LoanKiborCoverage.loan_id == loan_id)
+    if gaps_only:
+        # Fully covered rows are neither touched nor locked. Stale rows are
+        # included so a recompute already in flight for them is discarded.
+        stmt = stmt.where(or_(LoanKiborCoverage.missing_count > 0, LoanKiborCoverage.stale.is_(True)))
+    s.execute(stmt.values(stale=True, version=LoanKiborCoverage.version + 1))
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import csv
+import io
+import re
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.rate import Rate
+from app.services.kibor import MONTH_ABBR, KiborRates, parse_kibor_offer_rates_many
+from app.services.data_versions import bump_bank
+from app.services.kibor_coverage import invalidate_coverage
+from app.services.kibor_rates import fixing_values, upsert_fixings
+from app.services.locked_rates import refresh_locked_rates
+
+
+_FILENAME_DATE = re.compile(r"(\d{1,2})[-_ ]([A-Za-z]{3})[-_ ](\d{2}|\d{4})")
+_MONTHS = {m.lower(): i + 1 for i, m in enumerate(MONTH_ABBR)}
+_CSV_DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%y", "%d-%b-%Y", "%d/%m/%Y")
+
+
+@dataclass
+class ImportResult:
+    rates: list[KiborRates] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+def _date_from_filename(name: str) -> date | None:
+    m = _FILENAME_DATE.search(Path(name).name)
+    if not m:
+        return None
+    month = _MONTHS.get(m.group(2).lower())
+    if month is None:
+        return None
+    year = int(m.group(3))
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, int(m.group(1)))
+    except ValueError:
+        return None
+
+
+def _parse_csv_date(v: str) -> date:
+    v = v.strip()
+    for fmt in _CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"bad_date:{v}")
+
+
+def parse_rates_csv(text: str, *, source: str = "csv") -> ImportResult:
+    out = ImportResult()
+    for i, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        cells = [c.strip() for c in row]
+        if not any(cells):
+            continue
+        if i == 1 and cells[0].lower() in ("date", "effective_date"):
+            continue
+        try:
+            if len(cells) < 6:
+                raise ValueError("columns")
+            d = _parse_csv_date(cells[0])
+            o1, o3, o6, o9, o12 = (float(c) for c in cells[1:6])
+        except ValueError:
+            out.skipped.append(f"{source}:{i}")
+            continue
+        out.rates.append(
+            KiborRates(effective_date=d, offer_1m=o1, offer_3m=o3, offer_6m=o6, offer_9m=o9, offer_12m=o12)
+        )
+    return out
+
+
+def _iter_zip(data: bytes) -> Iterator[tuple[str, bytes]]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            yield info.filename, zf.read(info)
+
+
+def _iter_directory(root: Path) -> Iterator[tuple[str, bytes]]:
+    for p in sorted(root.rglob("*")):
+        if p.is_file():
+            yield str(p.relative_to(root)), p.read_bytes()
+
+
+def _iter_sources(name: str, data: bytes) -> Iterator[tuple[str, bytes]]:
+    if name.lower().endswith(".zip"):
+        yield from _iter_zip(data)
+    else:
+        yield name, data
+
+
+def load_rates(sources: Iterable[tuple[str, bytes]]) -> ImportResult:
+    out = ImportResult()
+    pdf_names: list[str] = []
+    pdf_days: list[date] = []
+    pdf_bytes: list[bytes] = []
+
+    for name, data in sources:
+        lower = name.lower()
+        if lower.endswith(".csv"):
+            res = parse_rates_csv(data.decode("utf-8-sig"), source=name)
+            out.rates.extend(res.rates)
+            out.skipped.extend(res.skipped)
+        elif lower.endswith(".pdf"):
+            d = _date_from_filename(name)
+            if d is None:
+                out.skipped.append(name)
+                continue
+            pdf_names.append(name)
+            pdf_days.append(d)
+            pdf_bytes.append(data)
+        elif lower.endswith(".zip"):
+            res = load_rates(_iter_zip(data))
+            out.rates.extend(res.rates)
+            out.skipped.extend(res.skipped)
+        else:
+            out.skipped.append(name)
+
+    parsed = parse_kibor_offer_rates_many(pdf_bytes)
+    for name, d, offers in zip(pdf_names, pdf_days, parsed):
+        if offers is None:
+            out.skipped.append(name)
+            continue
+        o1, o3, o6, o9, o12 = offers
+        out.rates.append(
+            KiborRates(effective_date=d, offer_1m=o1, offer_3m=o3, offer_6m=o6, offer_9m=o9, offer_12m=o12)
+        )
+
+    return out
+
+
+def load_rates_from_path(path: Path) -> ImportResult:
+    if path.is_dir():
+        return load_rates(_iter_directory(path))
+    return load_rates(_iter_sources(path.name, path.read_bytes()))
+
+
+def load_rates_from_upload(filename: str, data: bytes) -> ImportResult:
+    return load_rates(_iter_sources(filename, data))
+
+
+def upsert_rates(
+    s: Session,
+    rates: list[KiborRates],
+    *,
+    bank_ids: list[int] | None = None,
+    overwrite: bool = False,
+    batch_size: int = 1000,
+) -> int:
+    if not rates:
+        return 0
+
+    # Later duplicates of the same date win (e.g. a CSV correcting a PDF).
+    by_day: dict[date, KiborRates] = {r.effective_date: r for r in rates}
+
+    if bank_ids is None:
+        # No bank selection: these are market fixings shared by every bank.
+        fixings = [v for d in sorted(by_day) for v in fixing_values(by_day[d], d)]
+        written = upsert_fixings(s, fixings, overwrite=overwrite, batch_size=batch_size)
+        s.commit()
+        return written
+
+    values: list[dict] = []
+    for d in sorted(by_day):
+        for tenor_months, offer in by_day[d].by_tenor_months().items():
+            for bank_id in bank_ids:
+                values.append(
+                    {
+                        "bank_id": int(bank_id),
+                        "tenor_months": int(tenor_months),
+                        "effective_date": d,
+                        "annual_rate_percent": offer,
+                    }
+                )
+
+    for bank_id in bank_ids:
+        invalidate_coverage(s, bank_id=int(bank_id), gaps_only=not overwrite)
+        bump_bank(s, int(bank_id))
+
+    written = 0
+    for i in range(0, len(values), batch_size):
+        stmt = pg_insert(Rate).values(values[i : i + batch_size])
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["bank_id", "tenor_months", "effective_date"],
+                set_={"annual_rate_percent": stmt.excluded.annual_rate_percent},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["bank_id", "tenor_months", "effective_date"])
+        res = s.execute(stmt)
+        written += max(0, res.rowcount or 0)
+    # An override on a drawdown's date replaces the fixing as its locked rate.
+    for bank_id in bank_ids:
+        refresh_locked_rates(s, bank_id=int(bank_id), days=by_day.keys())
+    s.commit()
+    return written
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.kibor_fixing import KiborFixing
+from app.models.rate import Rate
+from app.services.data_versions import bump_fixings
+from app.services.kibor import KiborRates
+from app.services.kibor_coverage import invalidate_coverage
+from app.services.locked_rates import refresh_locked_rates
+
+# KIBOR is a market rate: fetched values live once per (date, tenor) in
+# kibor_fixings, while rows in rates are bank-specific manual overrides that
+# win over the fixing for the same day.
+
+RatePoint = tuple[date, Decimal]
+
+
+def rate_history(
+    s: Session,
+    bank_id: int,
+    end: date,
+    tenor_months: int | None = None,
+) -> dict[int, list[RatePoint]]:
+    fq = select(KiborFixing.tenor_months, KiborFixing.effective_date, KiborFixing.rate).where(
+        KiborFixing.effective_date <= end
+    )
+    oq = select(Rate.tenor_months, Rate.effective_date, Rate.annual_rate_percent).where(
+        Rate.bank_id == bank_id,
+        Rate.effective_date <= end,
+    )
+    if tenor_months is not None:
+        fq = fq.where(KiborFixing.tenor_months == int(tenor_months))
+        oq = oq.where(Rate.tenor_months == int(tenor_months))
+
+    merged: dict[int, dict[date, Decimal]] = {}
+    for t, d, r in s.execute(fq).all():
+        merged.setdefault(int(t), {})[d] = Decimal(str(r))
+    for t, d, r in s.execute(oq).all():
+        merged.setdefault(int(t), {})[d] = Decimal(str(r))
+
+    return {t: sorted(points.items()) for t, points in merged.items()}
+
+
+def covered_dates(s: Session, bank_id: int, tenor_months: int, days: Iterable[date]) -> set[date]:
+    wanted = sorted(set(days))
+    if not wanted:
+        return set()
+
+    have = set(
+        s.execute(
+            select(KiborFixing.effective_date).where(
+                KiborFixing.tenor_months == int(tenor_months),
+                KiborFixing.effective_date.in_(wanted),
+            )
+        )
+        .scalars()
+        .all()
+    )
+    have.update(
+        s.execute(
+            select(Rate.effective_date).where(
+                Rate.bank_id == bank_id,
+                Rate.tenor_months == int(tenor_months),
+                Rate.effective_date.in_(wanted),
+            )
+        )
+        .scalars()
+        .all()
+    )
+    return have
+
+
+def fixing_values(kib: KiborRates, effective_date: date) -> list[dict]:
+    return [
+        {"effective_date": effective_date, "tenor_months": int(tenor_months), "rate": offer}
+        for tenor_months, offer in kib.by_tenor_months().items()
+    ]
+
+
+def insert_fixings(s: Session, values: list[dict], *, overwrite: bool = False, batch_size: int = 1000) -> int:
+    # Returns the rows actually written: existing fixings are skipped, or on
+    # overwrite only counted when the rate changed.
+    written = 0
+    for i in range(0, len(values), batch_size):
+        stmt = pg_insert(KiborFixing).values(values[i : i + batch_size])
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["effective_date", "tenor_months"],
+                set_={"rate": stmt.excluded.rate},
+                where=KiborFixing.rate != stmt.excluded.rate,
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["effective_date", "tenor_months"])
+        res = s.execute(stmt)
+        written += max(0, res.rowcount or 0)
+    return written
+
+
+def fixings_changed(s: Session, days: Iterable[date], *, overwrite: bool = False) -> None:
+    # Takes row locks in the order add_tx does (coverage, then transactions,
+    # then loan_tranches), after the fixings themselves are in.
+    # New fixings can only close gaps, so loans already fully covered stay valid.
+    invalidate_coverage(s, gaps_only=not overwrite)
+    # Drawdowns on these days now have (or, on overwrite, may have a new) locked rate.
+    refresh_locked_rates(s, days=days, only_missing=not overwrite)
+    # Last, so the one shared counter row is held for as short as possible.
+    bump_fixings(s)
+
+
+def upsert_fixings(s: Session, values: list[dict], *, overwrite: bool = False, batch_size: int = 1000) -> int:
+    if not values:
+        return 0
+    written = insert_fixings(s, values, overwrite=overwrite, batch_size=batch_size)
+    if written > 0:
+        fixings_changed(s, [v["effective_date"] for v in values], overwrite=overwrite)
+    return written
@@ -2,18 +2,20 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import threading
 from datetime import date, datetime, timedelta
 from app.models.transaction import Transaction
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, engine
 from app.models.bank import Bank
-from app.models.rate import Rate
-from app.services.kibor import get_kibor_offer_rates, adjust_to_last_business_day
+from app.models.kibor_fixing import KiborFixing
+from app.services.kibor import KiborUnavailable, get_kibor_offer_rates, adjust_to_last_business_day
+from app.services.kibor_rates import fixing_values, upsert_fixings
 from app.utils.timezone import today_karachi
 
 
@@ -31,111 +33,123 @@ _last_probe_latest: date | None = None
 _last_probe_borrow_min: date | None = None
 
 
-def backfill_missing_kibor_rates(s: Session) -> None:
-    target_day = adjust_to_last_business_day(today_karachi())
-
-    banks = s.execute(select(Bank)).scalars().all()
-    if not banks:
-        return
-
-    conventional_ids: list[int] = [b.id for b in banks if not _is_islamic(b.bank_type)]
-    islamic_ids: list[int] = [b.id for b in banks if _is_islamic(b.bank_type)]
-
-    borrow_dates: dict[int, date] = {}
-    for bank_id in conventional_ids + islamic_ids:
-        bd = (
-            s.execute(
-                select(func.min(Transaction.date)).where(
-                    Transaction.bank_id == bank_id,
-                    Transaction.category == "principal",
-                    Transaction.amount > 0,
-                )
-            )
-            .scalar_one()
-        )
-        if bd is not None:
-            borrow_dates[bank_id] = bd
-
-    if not borrow_dates:
-        return
-
-    start_by_bank: dict[int, date] = {}
-    for bank_id, bd in borrow_dates.items():
-        start_by_bank[bank_id] = adjust_to_last_business_day(bd)
-
-    existing_by_bank: dict[int, set[date]] = {}
-    for bank_id, st in start_by_bank.items():
-        rows = (
-            s.execute(
-                select(Rate.effective_date).where(
-                    Rate.bank_id == bank_id,
-                    Rate.tenor_months == 1,
-                    Rate.effective_date >= st,
-                    Rate.effective_date <= target_day,
-                )
+# Every business day from each bank's first drawdown (shifted back to a business
+# day) up to the target is an anchor for conventional banks; islamic banks only
+# need that first day. Days already in kibor_fixings are dropped in the same
+# statement, so the result is the fetch plan itself.
+_PLAN_SQL = text(
+    """
+    WITH starts AS (
+        SELECT
+            t.bank_id,
+            lower(trim(coalesce(b.bank_type, ''))) = 'islamic' AS islamic,
+            min(t.date) AS first_borrow
+        FROM transactions t
+        JOIN banks b ON b.id = t.bank_id
+        WHERE t.category = 'principal' AND t.amount > 0
+        GROUP BY t.bank_id, b.bank_type
+    ),
+    anchored AS (
+        SELECT
+            bank_id,
+            islamic,
+            (first_borrow - CASE extract(isodow FROM first_borrow)
+                WHEN 6 THEN 1 WHEN 7 THEN 2 ELSE 0 END)::date AS start_day
+        FROM starts
+    ),
+    days AS (
+        SELECT a.bank_id, g.day::date AS day
+        FROM anchored a
+        CROSS JOIN LATERAL generate_series(
+            a.start_day,
+            CASE WHEN a.islamic THEN a.start_day ELSE CAST(:target_day AS date) END,
+            interval '1 day'
+        ) AS g(day)
+        WHERE extract(isodow FROM g.day) < 6
+    )
+    SELECT d.day, array_agg(DISTINCT d.bank_id) AS bank_ids
+    FROM days d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM kibor_fixings f
+        WHERE f.tenor_months = 1 AND f.effective_date = d.day
+    )
+    GROUP BY d.day
+    ORDER BY d.day
+    """
+)
+
+
+def _plan_days_portable(s: Session, target_day: date) -> dict[date, set[int]]:
+    rows = s.execute(
+        select(Transaction.bank_id, Bank.bank_type, func.min(Transaction.date))
+        .join(Bank, Bank.id == Transaction.bank_id)
+        .where(Transaction.category == "principal", Transaction.amount > 0)
+        .group_by(Transaction.bank_id, Bank.bank_type)
+    ).all()
+    if not rows:
+        return {}
+
+    start_by_bank = {
+        int(bank_id): (_is_islamic(bank_type), adjust_to_last_business_day(bd)) for bank_id, bank_type, bd in rows
+    }
+
+    existing = set(
+        s.execute(
+            select(KiborFixing.effective_date).where(
+                KiborFixing.tenor_months == 1,
+                KiborFixing.effective_date >= min(st for _, st in start_by_bank.values()),
             )
-            .scalars()
-            .all()
         )
-        existing_by_bank[bank_id] = set(rows)
+        .scalars()
+        .all()
+    )
 
     day_to_banks: dict[date, set[int]] = {}
-    for bank_id, st in start_by_bank.items():
-        if bank_id in islamic_ids:
-            if _is_business_day(st) and st not in existing_by_bank.get(bank_id, set()):
-                day_to_banks.setdefault(st, set()).add(bank_id)
-            continue
-
+    for bank_id, (islamic, st) in start_by_bank.items():
         day = st
-        existing = existing_by_bank.get(bank_id, set())
-        while day <= target_day:
+        last = st if islamic else target_day
+        while day <= last:
             if _is_business_day(day) and day not in existing:
                 day_to_banks.setdefault(day, set()).add(bank_id)
             day = day + timedelta(days=1)
+    return day_to_banks
+
+
+def plan_missing_days(s: Session, target_day: date) -> dict[date, set[int]]:
+    if s.get_bind().dialect.name == "postgresql":
+        return {d: set(ids) for d, ids in s.execute(_PLAN_SQL, {"target_day": target_day}).all()}
+    # generate_series is Postgres-only; elsewhere the same plan is built from
+    # one grouped query and one fixings query.
+    return _plan_days_portable(s, target_day)
+
+
+def backfill_missing_kibor_rates(s: Session) -> None:
+    target_day = adjust_to_last_business_day(today_karachi())
 
+    day_to_banks = plan_missing_days(s, target_day)
     if not day_to_banks:
         return
 
     for day in sorted(day_to_banks.keys()):
-        bank_ids = sorted(day_to_banks[day])
-        if not bank_ids:
-            continue
-
-        kib = get_kibor_offer_rates(day)
+        try:
+            kib = get_kibor_offer_rates(day)
+        except KiborUnavailable:
+            # Fixings written so far are kept; the next cycle resumes from here.
+            logging.warning("kibor publisher unavailable; sync stopped at %s", day)
+            return
 
         # Store rates under the requested business day (not the resolved PDF date),
         # so we don't leave gaps that cause repeated "missing day" backfills.
-        eff = day
-
-        rates_by_tenor = kib.by_tenor_months()
-
-        values: list[dict] = []
-        for bank_id in bank_ids:
-            for tenor_months, offer in rates_by_tenor.items():
-                values.append(
-                    {
-                        "bank_id": bank_id,
-                        "tenor_months": int(tenor_months),
-                        "effective_date": eff,
-                        "annual_rate_percent": offer,
-                    }
-                )
-
-        if values:
-            stmt = (
-                pg_insert(Rate)
-                .values(values)
-                .on_conflict_do_nothing(index_elements=["bank_id", "tenor_months", "effective_date"])
-            )
-            s.execute(stmt)
-            s.commit()
+        # One write per day, however many banks were waiting on it.
+        upsert_fixings(s, fixing_values(kib, day))
+        s.commit()
 
 
 def maybe_refresh_kibor_rates(s: Session) -> None:
     global _last_probe_day, _last_probe_ts, _last_probe_latest, _last_probe_borrow_min
 
     target_day = adjust_to_last_business_day(today_karachi())
-    latest = s.execute(select(func.max(Rate.effective_date))).scalar_one()
+    latest = s.execute(select(func.max(KiborFixing.effective_date))).scalar_one()
 
     borrow_min = (
         s.execute(
@@ -165,11 +179,83 @@ def maybe_refresh_kibor_rates(s: Session) -> None:
     backfill_missing_kibor_rates(s)
 
 
+# Only one process across the deployment runs each sync cycle. The leader holds
+# a session-level Postgres advisory lock on a dedicated connection; if that
+# process dies the connection drops and another worker takes over on its next
+# cycle. Other databases (sqlite in tests and local runs) always lead.
+_LEADER_LOCK_KEY = 0x4B49424F52  # "KIBOR"
+
+
+class _Leadership:
+    def __init__(self):
+        self._conn: Connection | None = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if engine.dialect.name != "postgresql":
+            return True
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.execute(text("SELECT 1"))
+                    self._conn.commit()
+                    return True
+                except Exception:
+                    self._drop()
+
+            conn = engine.connect()
+            try:
+                got = bool(conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LEADER_LOCK_KEY}).scalar())
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            if not got:
+                conn.close()
+                return False
+            self._conn = conn
+            return True
+
+    def _drop(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.invalidate()
+            except Exception:
+                pass
+
+    def release(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LEADER_LOCK_KEY})
+                self._conn.commit()
+                self._conn.close()
+            except Exception:
+                self._drop()
+            self._conn = None
+
+
+_leader = _Leadership()
+
+
+def release_leadership() -> None:
+    _leader.release()
+
+
 def sync_kibor_rates_once() -> None:
     with SessionLocal() as s:
         backfill_missing_kibor_rates(s)
 
 
+def _sync_cycle() -> bool:
+    if not _leader.acquire():
+        return False
+    sync_kibor_rates_once()
+    return True
+
+
 async def kibor_sync_loop() -> None:
     if not getattr(settings, "kibor_sync_enabled", True):
         return
@@ -177,10 +263,12 @@ async def kibor_sync_loop() -> None:
     interval = int(getattr(settings, "kibor_sync_interval_seconds", 3600) or 3600)
     await asyncio.sleep(3)
 
+    loop = asyncio.get_running_loop()
     while True:
         try:
-            sync_kibor_rates_once()
+            # HTTP, PDF parsing and DB work all block, so they run off the event loop.
+            await loop.run_in_executor(None, _sync_cycle)
         except Exception as e:
             logging.exception("kibor_sync failed", exc_info=e)
 
-        await asyncio.sleep(max(60, interval))
\ No newline at end of file
+        await asyncio.sleep(max(60, interval))
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
+import logging
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.bank import Bank
 from app.models.loan import Loan
-from app.models.rate import Rate
+from app.models.loan_tranche import LoanTranche
 from app.models.transaction import Transaction
+from app.services.kibor_rates import RatePoint, rate_history
 
 Q2 = Decimal("0.01")
 
@@ -23,38 +25,26 @@ def _to_dec(v) -> Decimal:
     return Decimal(str(v))
 
 
-def _prefetch_rates(s: Session, bank_id: int, end: date) -> dict[int, list[Rate]]:
-    rows = (
-        s.execute(
-            select(Rate)
-            .where(Rate.bank_id == bank_id, Rate.effective_date <= end)
-            .order_by(Rate.tenor_months.asc(), Rate.effective_date.asc())
-        )
-        .scalars()
-        .all()
-    )
-    out: dict[int, list[Rate]] = {}
-    for r in rows:
-        out.setdefault(int(r.tenor_months), []).append(r)
-    return out
+def _prefetch_rates(s: Session, bank_id: int, end: date) -> dict[int, list[RatePoint]]:
+    return rate_history(s, bank_id, end)
 
 
 def _latest_rate_percent_for_day(
-    prefetched: dict[int, list[Rate]],
+    prefetched: dict[int, list[RatePoint]],
     tenor_months: int,
     day: date,
     placeholder: Decimal,
 ) -> Decimal:
     rs = prefetched.get(int(tenor_months), [])
-    latest: Rate | None = None
-    for r in rs:
-        if r.effective_date <= day:
+    latest: Decimal | None = None
+    for d, r in rs:
+        if d <= day:
             latest = r
         else:
             break
     if latest is None:
         return placeholder
-    return _to_dec(latest.annual_rate_percent)
+    return latest
 
 
 def _month_start(d: date) -> date:
@@ -103,11 +93,72 @@ def _apply_principal_tx(
     tranches[:] = [t for t in tranches if t.amount > 0]
 
 
+def _book_tranches(s: Session, loan_id: int, end: date, txs: list[Transaction]) -> dict[int, _Tranche] | None:
+    # Tranche openings from the persisted book, keyed by drawdown id. The book
+    # is only trusted when it covers exactly the drawdowns being replayed with
+    # the same dates, amounts and locked rates; otherwise None, and the caller
+    # opens tranches from the transactions as before.
+    rows = s.execute(
+        select(
+            LoanTranche.source_tx_id,
+            LoanTranche.start_date,
+            LoanTranche.original_amount,
+            LoanTranche.locked_rate_percent,
+        ).where(LoanTranche.loan_id == loan_id, LoanTranche.start_date <= end)
+    ).all()
+    book = {
+        tx_id: (d, _to_dec(amount), _to_dec(rate) if rate is not None else None)
+        for tx_id, d, amount, rate in rows
+    }
+    expected = {
+        t.id: (t.date, _to_dec(t.amount), _to_dec(t.kibor_rate_percent) if t.kibor_rate_percent is not None else None)
+        for t in txs
+        if t.category == "principal" and t.amount > 0
+    }
+    if book != expected:
+        return None
+    return {tx_id: _Tranche(start_date=d, amount=amount, base_rate_percent=rate) for tx_id, (d, amount, rate) in book.items()}
+
+
 def _total_principal(tranches: list[_Tranche]) -> Decimal:
     return sum((t.amount for t in tranches), Decimal("0"))
 
 
+LEDGER_FIELDS = ("date", "principal_balance", "daily_markup", "accrued_markup", "rate_percent")
+
+
+@dataclass
+class LedgerColumns:
+    # The engine's native output: one list per field, index i is day i.
+    date: list[date] = field(default_factory=list)
+    principal_balance: list[float] = field(default_factory=list)
+    daily_markup: list[float] = field(default_factory=list)
+    accrued_markup: list[float] = field(default_factory=list)
+    rate_percent: list[float] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "date": d,
+                "principal_balance": p,
+                "daily_markup": dm,
+                "accrued_markup": am,
+                "rate_percent": r,
+            }
+            for d, p, dm, am, r in zip(
+                self.date, self.principal_balance, self.daily_markup, self.accrued_markup, self.rate_percent
+            )
+        ]
+
+
 def compute_ledger(s: Session, bank_id: int, loan_id: int, start: date, end: date):
+    return compute_ledger_columns(s, bank_id, loan_id, start, end).rows()
+
+
+def compute_ledger_columns(s: Session, bank_id: int, loan_id: int, start: date, end: date) -> LedgerColumns:
     bank = s.execute(select(Bank).where(Bank.id == bank_id)).scalar_one()
     loan = s.execute(select(Loan).where(Loan.id == loan_id, Loan.bank_id == bank_id)).scalar_one()
 
@@ -125,11 +176,20 @@ def compute_ledger(s: Session, bank_id: int, loan_id: int, start: date, end: dat
     for t in txs:
         tx_by_day.setdefault(t.date, []).append(t)
 
+    book = _book_tranches(s, loan_id, end, txs)
+    if book is None:
+        logging.warning("tranche book for loan %s disagrees with its transactions; replaying them", loan_id)
+
     calc_start = start
     if txs and txs[0].date < calc_start:
         calc_start = txs[0].date
 
-    prefetched_rates = _prefetch_rates(s, bank_id, end)
+    # Islamic rates never reprice, so with every drawdown's rate locked the
+    # rate history is not needed at all.
+    needs_history = bank.bank_type != "islamic" or any(
+        t.category == "principal" and t.amount > 0 and t.kibor_rate_percent is None for t in txs
+    )
+    prefetched_rates = _prefetch_rates(s, bank_id, end) if needs_history else {}
 
     placeholder = _to_dec(loan.kibor_placeholder_rate_percent)
     tenor = int(loan.kibor_tenor_months)
@@ -148,25 +208,32 @@ def compute_ledger(s: Session, bank_id: int, loan_id: int, start: date, end: dat
         return v
 
     def tranche_rate_base_for_day(day: date, tr: _Tranche) -> Decimal:
-        if bank.bank_type == "islamic":
-            return _latest_rate_percent_for_day(prefetched_rates, tenor, tr.start_date, placeholder)
-
-        if day < _next_month_start(tr.start_date):
+        # Islamic tranches keep their drawdown rate; conventional ones keep it
+        # for the first month and then reprice at each month start.
+        if bank.bank_type == "islamic" or day < _next_month_start(tr.start_date):
             if tr.base_rate_percent is not None:
                 return tr.base_rate_percent
             return _latest_rate_percent_for_day(prefetched_rates, tenor, tr.start_date, placeholder)
 
         return _rate_for_month_start(_month_start(day))
 
-    rows: list[dict] = []
+    cols = LedgerColumns()
     day = calc_start
     while day <= end:
         for t in tx_by_day.get(day, []):
             amt = _to_dec(t.amount)
             if t.category == "principal":
                 base_rate = None
-                if bank.bank_type != "islamic" and amt > 0:
-                    base_rate = _latest_rate_percent_for_day(prefetched_rates, tenor, t.date, placeholder)
+                if amt > 0 and book is not None:
+                    tr = book[t.id]
+                    tranches.append(_Tranche(start_date=tr.start_date, amount=tr.amount, base_rate_percent=tr.base_rate_percent))
+                    continue
+                if amt > 0:
+                    # The locked rate is stored on the drawdown once its date has a rate.
+                    if t.kibor_rate_percent is not None:
+                        base_rate = _to_dec(t.kibor_rate_percent)
+                    else:
+                        base_rate = _latest_rate_percent_for_day(prefetched_rates, tenor, t.date, placeholder)
                 _apply_principal_tx(tranches, t.date, amt, base_rate_percent=base_rate)
             elif t.category == "markup":
                 accrued += amt
@@ -198,16 +265,12 @@ def compute_ledger(s: Session, bank_id: int, loan_id: int, start: date, end: dat
             else:
                 weighted_rate = Decimal("0")
 
-            rows.append(
-                {
-                    "date": day,
-                    "principal_balance": float(d2(principal_total)),
-                    "daily_markup": float(daily_markup),
-                    "accrued_markup": float(accrued),
-                    "rate_percent": float(weighted_rate),
-                }
-            )
+            cols.date.append(day)
+            cols.principal_balance.append(float(d2(principal_total)))
+            cols.daily_markup.append(float(daily_markup))
+            cols.accrued_markup.append(float(accrued))
+            cols.rate_percent.append(float(weighted_rate))
 
         day = day + timedelta(days=1)
 
-    return rows
+    return cols
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import date
+
+from app.services.ledger import LEDGER_FIELDS, LedgerColumns
+
+# Alternative encodings of the ledger for large ranges. Both are built from the
+# engine's column lists, never from per-row dicts or models.
+#
+# columnar: {"base_date": "2016-01-01", "date": [0, 1, 2, ...],
+#            "principal_balance": [...], ...}
+#   dates are day offsets from base_date, so a 10-year ledger carries each
+#   key once instead of 3,650 times.
+# arrow:    an Arrow IPC stream with one record batch (date32 + float64
+#           columns) for pandas/polars/DuckDB; needs the optional pyarrow.
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def columnar(cols: LedgerColumns, base: date) -> dict:
+    origin = base.toordinal()
+    out: dict = {"base_date": base, "date": [d.toordinal() - origin for d in cols.date]}
+    for name in LEDGER_FIELDS[1:]:
+        out[name] = getattr(cols, name)
+    return out
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_ipc(cols: LedgerColumns) -> bytes:
+    import pyarrow as pa
+
+    batch = pa.record_batch(
+        [pa.array(cols.date, type=pa.date32())]
+        + [pa.array(getattr(cols, name), type=pa.float64()) for name in LEDGER_FIELDS[1:]],
+        names=list(LEDGER_FIELDS),
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.loan_tranche import LoanTranche
+from app.models.rate import Rate
+from app.models.transaction import Transaction
+
+# A drawdown's base KIBOR rate is fixed once a rate exists for its own date
+# (a bank override wins over the market fixing). transactions.kibor_rate_percent
+# stores that rate so the ledger and transaction lists stop resolving it against
+# the rate history; NULL means no rate for the exact date yet, and readers fall
+# back to the latest earlier rate or the loan placeholder as before. The tranche
+# book carries a copy per tranche and is refreshed from the drawdowns here.
+
+
+def refresh_locked_rates(
+    s: Session,
+    *,
+    bank_id: int | None = None,
+    loan_id: int | None = None,
+    days: Iterable[date] | None = None,
+    only_missing: bool = False,
+) -> None:
+    tenor = (
+        select(Loan.kibor_tenor_months).where(Loan.id == Transaction.loan_id).correlate(Transaction).scalar_subquery()
+    )
+    override = (
+        select(Rate.annual_rate_percent)
+        .where(
+            Rate.bank_id == Transaction.bank_id,
+            Rate.tenor_months == tenor,
+            Rate.effective_date == Transaction.date,
+        )
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+    fixing = (
+        select(KiborFixing.rate)
+        .where(KiborFixing.tenor_months == tenor, KiborFixing.effective_date == Transaction.date)
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+
+    stmt = update(Transaction).where(
+        Transaction.category == "principal",
+        Transaction.amount > 0,
+        Transaction.loan_id.is_not(None),
+    )
+    book = update(LoanTranche)
+    if bank_id is not None:
+        stmt = stmt.where(Transaction.bank_id == bank_id)
+        book = book.where(LoanTranche.bank_id == bank_id)
+    if loan_id is not None:
+        stmt = stmt.where(Transaction.loan_id == loan_id)
+        book = book.where(LoanTranche.loan_id == loan_id)
+    if days is not None:
+        wanted = sorted(set(days))
+        if not wanted:
+            return
+        stmt = stmt.where(Transaction.date.in_(wanted))
+        book = book.where(LoanTranche.start_date.in_(wanted))
+    if only_missing:
+        stmt = stmt.where(Transaction.kibor_rate_percent.is_(None))
+        book = book.where(LoanTranche.locked_rate_percent.is_(None))
+
+    # A deleted override falls back to the fixing, or to NULL if there is none.
+    s.execute(
+        stmt.values(kibor_rate_percent=func.coalesce(override, fixing)).execution_options(synchronize_session=False)
+    )
+    locked = (
+        select(Transaction.kibor_rate_percent)
+        .where(Transaction.id == LoanTranche.source_tx_id)
+        .correlate(LoanTranche)
+        .scalar_subquery()
+    )
+    s.execute(book.values(locked_rate_percent=locked).execution_options(synchronize_session=False))
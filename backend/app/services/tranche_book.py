@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.loan_tranche import LoanTranche
+from app.models.transaction import Transaction
+
+# loan_tranches mirrors the FIFO tranche state compute_ledger derives by
+# replaying principal transactions: one row per drawdown, repayments consume
+# open rows oldest first (start_date, then transaction id). Writes at or after
+# the loan's latest principal date are applied in place; anything back-dated,
+# and deletes of tranches that were already (partly) repaid, rebuild the
+# loan's book from its transactions instead.
+
+
+def _dec(v) -> Decimal:
+    return Decimal(str(v))
+
+
+def _consume(open_rows: list[LoanTranche], amount: Decimal, day: date) -> None:
+    repay = amount
+    for row in open_rows:
+        if repay <= 0:
+            break
+        remaining = _dec(row.remaining_amount)
+        take = min(remaining, repay)
+        row.remaining_amount = remaining - take
+        repay -= take
+        if row.remaining_amount == 0:
+            row.closed_date = day
+
+
+def rebuild_tranches(s: Session, bank_id: int, loan_id: int) -> int:
+    s.execute(delete(LoanTranche).where(LoanTranche.loan_id == loan_id))
+
+    txs = s.execute(
+        select(Transaction.id, Transaction.date, Transaction.amount, Transaction.kibor_rate_percent)
+        .where(
+            Transaction.bank_id == bank_id,
+            Transaction.loan_id == loan_id,
+            Transaction.category == "principal",
+        )
+        .order_by(Transaction.date.asc(), Transaction.id.asc())
+    ).all()
+
+    rows: list[LoanTranche] = []
+    open_rows: list[LoanTranche] = []
+    for tx_id, d, amount, rate in txs:
+        amt = _dec(amount)
+        if amt > 0:
+            row = LoanTranche(
+                bank_id=bank_id,
+                loan_id=loan_id,
+                source_tx_id=tx_id,
+                start_date=d,
+                original_amount=amt,
+                remaining_amount=amt,
+                locked_rate_percent=rate,
+            )
+            rows.append(row)
+            open_rows.append(row)
+        elif amt < 0:
+            _consume(open_rows, -amt, d)
+            open_rows = [r for r in open_rows if r.closed_date is None]
+
+    s.add_all(rows)
+    s.flush()
+    return len(rows)
+
+
+def record_principal(s: Session, t: Transaction) -> None:
+    # Called with t flushed and the loan's principal total row locked, so no
+    # other writer is moving the book underneath.
+    latest = s.execute(
+        select(func.max(Transaction.date)).where(
+            Transaction.bank_id == t.bank_id,
+            Transaction.loan_id == t.loan_id,
+            Transaction.category == "principal",
+            Transaction.id != t.id,
+        )
+    ).scalar_one()
+    if latest is not None and t.date < latest:
+        rebuild_tranches(s, t.bank_id, t.loan_id)
+        return
+
+    amt = _dec(t.amount)
+    if amt > 0:
+        # Read back: refresh_locked_rates may have just set it in SQL.
+        locked = s.execute(select(Transaction.kibor_rate_percent).where(Transaction.id == t.id)).scalar_one()
+        s.add(
+            LoanTranche(
+                bank_id=t.bank_id,
+                loan_id=t.loan_id,
+                source_tx_id=t.id,
+                start_date=t.date,
+                original_amount=amt,
+                remaining_amount=amt,
+                locked_rate_percent=locked,
+            )
+        )
+    elif amt < 0:
+        open_rows = (
+            s.execute(
+                select(LoanTranche)
+                .where(LoanTranche.loan_id == t.loan_id, LoanTranche.closed_date.is_(None))
+                .order_by(LoanTranche.start_date.asc(), LoanTranche.source_tx_id.asc())
+                .with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        _consume(list(open_rows), -amt, t.date)
+    s.flush()
+
+
+def drop_untouched_tranche(s: Session, t: Transaction) -> bool:
+    # A drawdown no repayment ever reached can go without disturbing the rest
+    # of the book; returns False when the caller has to rebuild instead.
+    row = s.execute(select(LoanTranche).where(LoanTranche.source_tx_id == t.id)).scalar_one_or_none()
+    if row is None or _dec(row.remaining_amount) != _dec(row.original_amount):
+        return False
+    s.delete(row)
+    return True
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterator
+
+from openpyxl import load_workbook
+from pydantic import ValidationError
+
+from app.schemas.transaction import TxCreate
+
+# Rows for POST .../transactions/bulk. CSV and XLSX take a header row with
+# date, amount and optionally category and note; JSON is an array of the same
+# objects TxCreate accepts. Amounts are signed like the single-row endpoint.
+
+_COLUMNS = ("date", "category", "amount", "note")
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%y", "%d-%b-%Y", "%d/%m/%Y")
+
+
+@dataclass
+class ParsedTransactions:
+    # (source row number, row): numbering matches errors, header excluded.
+    rows: list[tuple[int, TxCreate]] = field(default_factory=list)
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _coerce_date(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date) or not isinstance(v, str):
+        return v
+    v = v.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    return v
+
+
+def _record(raw: dict[str, Any]) -> dict[str, Any]:
+    rec = {k: raw.get(k) for k in _COLUMNS if raw.get(k) not in (None, "")}
+    if "date" in rec:
+        rec["date"] = _coerce_date(rec["date"])
+    if isinstance(rec.get("category"), str):
+        rec["category"] = rec["category"].strip().lower()
+    if isinstance(rec.get("amount"), str):
+        rec["amount"] = rec["amount"].replace(",", "").strip()
+    return rec
+
+
+def _iter_csv(data: bytes) -> Iterator[dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    for row in reader:
+        yield {(k or "").strip().lower(): v for k, v in row.items()}
+
+
+def _iter_xlsx(data: bytes) -> Iterator[dict[str, Any]]:
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(c or "").strip().lower() for c in next(rows, ())]
+        for values in rows:
+            if values is None or all(v is None for v in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+def _iter_json(data: bytes) -> Iterator[dict[str, Any]]:
+    items = json.loads(data.decode("utf-8-sig"))
+    if not isinstance(items, list):
+        raise ValueError("json_not_array")
+    for item in items:
+        yield item if isinstance(item, dict) else {}
+
+
+def parse_transactions(filename: str, data: bytes) -> ParsedTransactions:
+    lower = filename.lower()
+    if lower.endswith(".csv"):
+        source = _iter_csv(data)
+    elif lower.endswith(".xlsx"):
+        source = _iter_xlsx(data)
+    elif lower.endswith(".json"):
+        source = _iter_json(data)
+    else:
+        raise ValueError("unsupported_file")
+
+    out = ParsedTransactions()
+    for i, raw in enumerate(source, start=1):
+        try:
+            out.rows.append((i, TxCreate(**_record(raw))))
+        except ValidationError as e:
+            err = e.errors()[0]
+            field_name = ".".join(str(p) for p in err.get("loc", ())) or "row"
+            out.errors.append({"row": i, "field": field_name, "error": err.get("msg", "invalid")})
+    return out
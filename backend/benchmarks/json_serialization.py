@@ -0,0 +1,98 @@
+"""Ledger response encoding: Pydantic response_model path vs the orjson fast path.
+
+Builds compute_ledger-shaped rows for 1, 5 and 10 years of daily history and
+serves them from two in-process FastAPI routes:
+
+  model  [LedgerRow(**r) ...] returned under response_model=list[LedgerRow],
+         i.e. the path the ledger endpoint used before the fast path
+  fast   app.api.fast_json.json_response on the raw rows
+
+Each is timed end to end through the ASGI test client, with and without
+compression, and the median milliseconds and bytes on the wire are reported.
+
+    cd backend
+    python benchmarks/json_serialization.py --years 1,5,10 --runs 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+
+def _parse_args():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--years", default="1,5,10")
+    p.add_argument("--runs", type=int, default=20)
+    return p.parse_args()
+
+
+def _rows(days: int) -> list[dict]:
+    start = date(2016, 1, 1)
+    out = []
+    accrued = 0.0
+    for i in range(days):
+        daily = round(1_000_000 * (0.11 + (i % 97) / 10_000) / 365, 2)
+        accrued = round(accrued + daily, 2)
+        out.append(
+            {
+                "date": start + timedelta(days=i),
+                "principal_balance": 1_000_000.0 + (i // 30) * 1_000,
+                "daily_markup": daily,
+                "accrued_markup": accrued,
+                "rate_percent": 11.0 + (i % 97) / 100,
+            }
+        )
+    return out
+
+
+def main():
+    args = _parse_args()
+
+    from app.api import fast_json
+    from app.schemas.ledger import LedgerRow
+
+    data: dict[int, list[dict]] = {}
+    app = FastAPI()
+
+    @app.get("/model/{years}", response_model=list[LedgerRow])
+    def model_path(years: int):
+        return [LedgerRow(**r) for r in data[years]]
+
+    @app.get("/fast/{years}", response_model=list[LedgerRow])
+    def fast_path(years: int, request: Request, response: Response):
+        return fast_json.json_response(request, response, data[years])
+
+    client = TestClient(app)
+    encodings = [("identity", "identity"), ("gzip", "gzip"), ("br", "br")]
+
+    print(f"{'years':>5} {'rows':>6} {'path':<6} {'encoding':<9} {'ms':>8} {'bytes':>9}")
+    for years in [int(y) for y in args.years.split(",") if y.strip()]:
+        data[years] = _rows(365 * years)
+        for path in ("model", "fast"):
+            for label, accept in encodings:
+                headers = {"Accept-Encoding": accept}
+                client.get(f"/{path}/{years}", headers=headers)  # warm-up
+                times = []
+                size = 0
+                for _ in range(args.runs):
+                    t0 = time.perf_counter()
+                    res = client.get(f"/{path}/{years}", headers=headers)
+                    times.append((time.perf_counter() - t0) * 1000)
+                    size = int(res.headers.get("content-length") or len(res.content))
+                ms = statistics.median(times)
+                print(f"{years:>5} {len(data[years]):>6} {path:<6} {label:<9} {ms:>8.2f} {size:>9}")
+
+
+if __name__ == "__main__":
+    main()
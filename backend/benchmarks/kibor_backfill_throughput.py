@@ -0,0 +1,167 @@
+"""Backfill throughput against a local stand-in KIBOR publisher.
+
+Runs kibor_backfill._run_job (one loan's anchor dates) and
+kibor_sync.backfill_missing_kibor_rates (every business day since the first
+drawdown) over 1, 5 and 10 years of history and reports dates/second and the
+number of HTTP requests the publisher received.
+
+    cd backend
+    python benchmarks/kibor_backfill_throughput.py --years 1,5 --latency-ms 20
+
+Uses a throwaway SQLite database unless --database-url points at a migrated
+Postgres instance (which is wiped of banks, loans, transactions and rates).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "tests"))
+
+
+def _parse_args():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--years", default="1,5,10")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--holiday-rate", type=float, default=0.03, help="share of weekdays that are holidays")
+    p.add_argument("--missing-rate", type=float, default=0.01, help="share of weekdays whose sheet 404s")
+    p.add_argument("--parse-workers", type=int, default=2)
+    p.add_argument("--database-url", default=None)
+    p.add_argument("--skip-sync", action="store_true", help="only benchmark the per-loan backfill job")
+    return p.parse_args()
+
+
+def _share(d: date, salt: str) -> float:
+    return (zlib.crc32(f"{salt}:{d.isoformat()}".encode()) % 10_000) / 10_000
+
+
+def main():
+    args = _parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="kibor-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+pysqlite:///{tmpdir}/bench.db"
+    os.environ["KIBOR_PARSE_CACHE_DIR"] = ""
+    os.environ["KIBOR_PARSE_WORKERS"] = str(args.parse_workers)
+    os.environ["KIBOR_SYNC_ENABLED"] = "0"
+
+    from sqlalchemy import delete
+
+    from app.core.config import settings
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.models.backfill_job import BackfillJob
+    from app.models.bank import Bank
+    from app.models.bank_settings import BankSettings
+    from app.models.kibor_coverage import LoanKiborCoverage
+    from app.models.kibor_fixing import KiborFixing
+    from app.models.loan import Loan
+    from app.models.loan_tranche import LoanTranche
+    from app.models.principal_total import LoanPrincipalTotal
+    from app.models.rate import Rate
+    from app.models.transaction import Transaction
+    from app.services import kibor, kibor_backfill, kibor_sync
+    from app.utils.timezone import today_karachi
+    from kibor_publisher import KiborPublisher
+
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+    publisher = KiborPublisher(
+        latency_s=args.latency_ms / 1000.0,
+        holidays=set(),
+        missing=lambda d: _share(d, "missing") < args.missing_rate or _share(d, "holiday") < args.holiday_rate,
+        variant=lambda d: zlib.crc32(d.isoformat().encode()) % 4,
+    )
+
+    def reset(s):
+        # Children before parents, so the deletes pass the foreign keys.
+        for model in (
+            BackfillJob,
+            LoanKiborCoverage,
+            LoanPrincipalTotal,
+            LoanTranche,
+            BankSettings,
+            KiborFixing,
+            Rate,
+            Transaction,
+            Loan,
+            Bank,
+        ):
+            s.execute(delete(model))
+        s.commit()
+
+    def seed(s, years: int) -> tuple[int, int]:
+        today = today_karachi()
+        bank = Bank(name="Bench Bank", bank_type="conventional", additional_rate=None)
+        s.add(bank)
+        s.flush()
+        loan = Loan(
+            bank_id=bank.id,
+            name="Bench Loan",
+            kibor_tenor_months=1,
+            additional_rate=1.0,
+            kibor_placeholder_rate_percent=10.0,
+            max_loan_amount=None,
+        )
+        s.add(loan)
+        s.flush()
+        start = today - timedelta(days=365 * years)
+        d = start
+        while d <= today:
+            s.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=1000.0))
+            d += timedelta(days=45)
+        s.commit()
+        return bank.id, loan.id
+
+    results: list[tuple[str, int, int, float, int]] = []
+
+    with publisher:
+        settings.kibor_base_url = publisher.base_url
+
+        for years in [int(y) for y in args.years.split(",") if y.strip()]:
+            with SessionLocal() as s:
+                reset(s)
+                bank_id, loan_id = seed(s, years)
+                n_dates = len(kibor_backfill._compute_missing_days(s, bank_id, loan_id))
+
+            publisher.reset_counts()
+            t0 = time.perf_counter()
+            kibor_backfill.ensure_started(bank_id, loan_id)
+            kibor_backfill.drain("bench")
+            elapsed = time.perf_counter() - t0
+            results.append(("kibor_backfill._run_job", years, n_dates, elapsed, publisher.request_count))
+
+            if args.skip_sync:
+                continue
+
+            with SessionLocal() as s:
+                reset(s)
+                seed(s, years)
+
+            publisher.reset_counts()
+            t0 = time.perf_counter()
+            with SessionLocal() as s:
+                kibor_sync.backfill_missing_kibor_rates(s)
+                n_dates = s.query(KiborFixing).filter(KiborFixing.tenor_months == 1).count()
+            elapsed = time.perf_counter() - t0
+            results.append(("kibor_sync.backfill_missing_kibor_rates", years, n_dates, elapsed, publisher.request_count))
+
+    kibor.shutdown_parse_pool()
+
+    print(f"{'scenario':<42} {'years':>5} {'dates':>7} {'seconds':>9} {'dates/s':>9} {'http':>7}")
+    for name, years, n, elapsed, reqs in results:
+        rate = n / elapsed if elapsed > 0 else float("inf")
+        print(f"{name:<42} {years:>5} {n:>7} {elapsed:>9.2f} {rate:>9.1f} {reqs:>7}")
+
+
+if __name__ == "__main__":
+    main()
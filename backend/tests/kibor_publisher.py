@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+# Local stand-in for the KIBOR publisher. Serves synthetic PDF sheets under the
+# same /{yyyy}/{Mon}/{name} layout that kibor._candidate_urls probes, so fetch,
+# parse and backfill code can be exercised (and timed) without the network.
+#
+#   with KiborPublisher(latency_s=0.02, holidays={date(2025, 3, 31)}) as pub:
+#       settings.kibor_base_url = pub.base_url
+#       ...
+#       print(pub.request_count)
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+MONTH_ABBR = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FILENAME_VARIANTS = [
+    "Kibor-{dd}-{mon}-{yy}.pdf",
+    "kibor-{dd}-{mon}-{yy}.pdf",
+    "KIBOR-{dd}-{mon}-{yy}.pdf",
+    "kibor-{dd}-{mon}-{yy}.PDF",
+]
+TENOR_LABELS = {1: "1 - Month", 3: "3 - Month", 6: "6 - Month", 9: "9 - Months", 12: "1 - Year"}
+
+_PATH = re.compile(r"^/(\d{4})/([A-Za-z]{3})/([^/]+)$")
+
+
+def default_offers(d: date) -> dict[int, float]:
+    # Deterministic, date-dependent rates so every sheet has distinct bytes.
+    base = 10.0 + (d.toordinal() % 97) / 100.0
+    return {t: round(base + i * 0.05, 2) for i, t in enumerate((1, 3, 6, 9, 12))}
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(lines: list[str]) -> bytes:
+    body = " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+    return f"BT /F1 11 Tf 16 TL 50 760 Td {body} ET".encode("latin-1")
+
+
+def build_kibor_pdf(d: date, offers: dict[int, float] | None = None, *, split_pages: bool = False) -> bytes:
+    offers = offers or default_offers(d)
+    header = [
+        "State Bank of Pakistan",
+        f"KIBOR for {d.day:02d}-{MONTH_ABBR[d.month - 1]}-{d.year}",
+        "Tenor Bid Offer",
+    ]
+    rows = [f"{TENOR_LABELS[t]} {offers[t] - 0.25:.2f} {offers[t]:.2f}" for t in (1, 3, 6, 9, 12)]
+    pages = [header + rows[:3], ["(continued)"] + rows[3:]] if split_pages else [header + rows]
+
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids: list[int] = []
+    for lines in pages:
+        stream = _page_stream(lines)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_no = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_no
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets: list[int] = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@dataclass
+class KiborPublisher:
+    latency_s: float = 0.0
+    holidays: set[date] = field(default_factory=set)
+    # Extra publishing days that 404 (e.g. sheets the publisher never uploaded).
+    missing: Callable[[date], bool] = lambda d: False
+    # Index into FILENAME_VARIANTS used for a given day's sheet.
+    variant: Callable[[date], int] = lambda d: 0
+    offers: Callable[[date], dict[int, float]] = default_offers
+    split_pages: bool = False
+
+    def __post_init__(self):
+        self.request_count = 0
+        self.served_count = 0
+        self._lock = threading.Lock()
+        self._pdfs: dict[date, bytes] = {}
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None, "publisher not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def is_published(self, d: date) -> bool:
+        return d.weekday() < 5 and d not in self.holidays and not self.missing(d)
+
+    def filename(self, d: date) -> str:
+        tpl = FILENAME_VARIANTS[self.variant(d) % len(FILENAME_VARIANTS)]
+        return tpl.format(dd=f"{d.day:02d}", mon=MONTH_ABBR[d.month - 1], yy=f"{d.year % 100:02d}")
+
+    def pdf_for(self, d: date) -> bytes:
+        with self._lock:
+            pdf = self._pdfs.get(d)
+        if pdf is None:
+            pdf = build_kibor_pdf(d, self.offers(d), split_pages=self.split_pages)
+            with self._lock:
+                self._pdfs[d] = pdf
+        return pdf
+
+    def _resolve(self, path: str) -> bytes | None:
+        m = _PATH.match(path)
+        if not m:
+            return None
+        year, mon, name = int(m.group(1)), m.group(2), m.group(3)
+        if mon not in MONTH_ABBR:
+            return None
+        dm = re.search(r"-(\d{2})-", name)
+        if not dm:
+            return None
+        try:
+            d = date(year, MONTH_ABBR.index(mon) + 1, int(dm.group(1)))
+        except ValueError:
+            return None
+        if not self.is_published(d) or name != self.filename(d):
+            return None
+        return self.pdf_for(d)
+
+    def start(self) -> "KiborPublisher":
+        publisher = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with publisher._lock:
+                    publisher.request_count += 1
+                if publisher.latency_s > 0:
+                    time.sleep(publisher.latency_s)
+                body = publisher._resolve(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with publisher._lock:
+                    publisher.served_count += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.request_count = 0
+            self.served_count = 0
+
+    def __enter__(self) -> "KiborPublisher":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def business_days(start: date, end: date) -> list[date]:
+    out: list[date] = []
+    d = start
+    while d <= end:
+        if d.weekday() < 5:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
@@ -0,0 +1,69 @@
+import random
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.rate import Rate
+from app.models.transaction import Transaction
+from app.api.routes.transactions import _attach_kibor_rates
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+@pytest.mark.parametrize("bank_type", ["islamic", "conventional"])
+def test_merge_matches_latest_rate_on_or_before_each_drawdown(session, bank_type):
+    rng = random.Random(42)
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type=bank_type, additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=3, additional_rate=0, kibor_placeholder_rate_percent=9.5)
+    session.add(loan)
+    session.flush()
+
+    base = date(2025, 1, 10)
+    rates: dict[date, float] = {}
+    for i in range(0, 120, 3):
+        d = base + timedelta(days=i)
+        rates[d] = round(10 + rng.random(), 4)
+        session.add(KiborFixing(effective_date=d, tenor_months=3, rate=rates[d]))
+    # A bank override wins over the fixing for the same day.
+    rates[base + timedelta(days=30)] = 15.0
+    session.add(Rate(bank_id=bank.id, tenor_months=3, effective_date=base + timedelta(days=30), annual_rate_percent=15.0))
+
+    for _ in range(60):
+        d = base + timedelta(days=rng.randint(-5, 130))
+        session.add(
+            Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category=rng.choice(["principal", "markup"]), amount=rng.choice([100, -50]))
+        )
+    session.commit()
+
+    txs = session.query(Transaction).order_by(Transaction.date.desc(), Transaction.id.desc()).all()
+    out = _attach_kibor_rates(session, bank, loan, txs)
+
+    def naive(day: date) -> float:
+        known = [d for d in rates if d <= day]
+        return rates[max(known)] if known else 9.5
+
+    assert [o.id for o in out] == [t.id for t in txs]
+    for t, o in zip(txs, out):
+        if t.category == "principal" and float(t.amount) > 0:
+            assert o.kibor_rate_percent == pytest.approx(naive(t.date))
+        else:
+            assert o.kibor_rate_percent is None
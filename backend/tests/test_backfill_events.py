@@ -0,0 +1,50 @@
+import asyncio
+
+import app.api.routes.backfill as backfill_routes
+from app.services.backfill_events import notify_progress
+
+
+def _st(status: str, processed: int = 0) -> dict:
+    return {"status": status, "total_days": 3, "processed_days": processed, "started_at": None, "updated_at": None, "message": None}
+
+
+def _collect(monkeypatch, snapshots, *, notify_loan: int = 7, poll_seconds: int = 60) -> list[str]:
+    monkeypatch.setattr(backfill_routes.settings, "backfill_events_poll_seconds", poll_seconds)
+    it = iter(snapshots)
+    monkeypatch.setattr(backfill_routes, "_snapshot", lambda bank_id, loan_id: next(it))
+
+    async def run():
+        out: list[str] = []
+        async for chunk in backfill_routes._events(1, 7):
+            out.append(chunk)
+            # Simulates a worker thread flushing progress.
+            asyncio.get_running_loop().call_later(0.01, notify_progress, [notify_loan])
+        return out
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+
+def test_stream_pushes_progress_and_closes_when_ready(monkeypatch):
+    chunks = _collect(
+        monkeypatch,
+        [(_st("running", 0), False), (_st("running", 2), False), (_st("done", 3), True)],
+    )
+    assert [c.split("\n", 1)[0] for c in chunks] == ["event: progress", "event: progress", "event: done"]
+    assert '"processed_days": 2' in chunks[1]
+
+
+def test_stream_ends_with_error_event(monkeypatch):
+    chunks = _collect(monkeypatch, [(_st("running", 0), False), (_st("error", 1), False)])
+    assert chunks[-1].startswith("event: error")
+
+
+def test_notifications_for_other_loans_do_not_wake_stream(monkeypatch):
+    chunks = _collect(
+        monkeypatch,
+        [(_st("running", 0), False), (_st("done", 3), True)],
+        notify_loan=8,
+        poll_seconds=1,
+    )
+    # Only the fallback poll moved the stream on.
+    assert chunks[1] == ": keepalive\n\n"
+    assert chunks[-1].startswith("event: done")
@@ -0,0 +1,230 @@
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.backfill_job import BackfillJob
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+import app.services.kibor_backfill as kb
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+class _FakeKibor:
+    def __init__(self, offer: float):
+        self._offer = offer
+
+    def by_tenor_months(self) -> dict[int, float]:
+        return {1: self._offer, 3: self._offer, 6: self._offer, 9: self._offer, 12: self._offer}
+
+
+def _mk_islamic_loan(session, days: list[date]) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(
+        bank_id=bank.id,
+        name="Loan-A",
+        kibor_tenor_months=1,
+        additional_rate=0,
+        kibor_placeholder_rate_percent=0,
+        max_loan_amount=None,
+    )
+    session.add(loan)
+    session.flush()
+    for d in days:
+        session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=100))
+    session.commit()
+    return loan
+
+
+def test_ensure_started_enqueues_once_and_reports_progress(session):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5), date(2026, 1, 6)])
+
+    st = kb.ensure_started(loan.bank_id, loan.id, session)
+    assert st["status"] == "running"
+    assert st["total_days"] == 2
+
+    job = session.execute(select(BackfillJob)).scalar_one()
+    assert job.status == "queued"
+
+    # A second request while queued does not reset the row.
+    kb.ensure_started(loan.bank_id, loan.id, session)
+    assert len(session.execute(select(BackfillJob)).scalars().all()) == 1
+
+
+def test_claimed_job_runs_to_done_and_writes_fixings(session, monkeypatch):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5), date(2026, 1, 6)])
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", lambda d, **kw: _FakeKibor(11.0))
+    kb.ensure_started(loan.bank_id, loan.id, session)
+
+    job = kb.claim_job(session, "w1")
+    assert job is not None and job.status == "running" and job.attempts == 1
+    assert kb.claim_job(session, "w2") is None
+
+    kb._run_job(session, job, "w1")
+
+    session.expire_all()
+    st = kb.get_status(loan.bank_id, loan.id, session)
+    assert st["status"] == "done"
+    assert st["processed_days"] == 2
+    assert len(session.execute(select(KiborFixing)).scalars().all()) == 10
+    assert kb.is_ready(session, loan.bank_id, loan.id)
+
+
+def test_failed_days_are_retried_then_marked_error(session, monkeypatch):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    monkeypatch.setattr(kb.settings, "backfill_max_attempts", 2)
+
+    def _boom(d, **kw):
+        raise RuntimeError("publisher down")
+
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _boom)
+    kb.ensure_started(loan.bank_id, loan.id, session)
+
+    job = kb.claim_job(session, "w1")
+    kb._run_job(session, job, "w1")
+    session.expire_all()
+    job = session.execute(select(BackfillJob)).scalar_one()
+    assert job.status == "queued"
+    assert job.run_after > datetime.utcnow()
+    assert "retrying 1 day" in job.message
+
+    # Not claimable until the backoff elapses.
+    assert kb.claim_job(session, "w1") is None
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    session.commit()
+
+    job = kb.claim_job(session, "w1")
+    kb._run_job(session, job, "w1")
+    session.expire_all()
+    job = session.execute(select(BackfillJob)).scalar_one()
+    assert job.status == "error"
+    assert kb.get_status(loan.bank_id, loan.id, session)["status"] == "error"
+
+
+def test_stale_heartbeat_lets_another_worker_take_over(session):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    kb.ensure_started(loan.bank_id, loan.id, session)
+
+    job = kb.claim_job(session, "w1")
+    job.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    session.commit()
+
+    taken = kb.claim_job(session, "w2")
+    assert taken is not None and taken.locked_by == "w2" and taken.attempts == 2
+
+    # The original worker notices it lost the lease.
+    assert kb._heartbeat(session, job, "w1", processed_days=1) is False
+
+
+def test_batch_fetches_each_business_day_once_across_loans(session, monkeypatch):
+    # Sat 2026-01-03 and Fri 2026-01-02 resolve to the same sheet.
+    a = _mk_islamic_loan(session, [date(2026, 1, 2), date(2026, 1, 5)])
+    b = _mk_islamic_loan(session, [date(2026, 1, 3), date(2026, 1, 5)])
+
+    fetched: list[date] = []
+
+    def _fetch(d, **kw):
+        fetched.append(d)
+        return _FakeKibor(11.0)
+
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _fetch)
+    kb.ensure_started(a.bank_id, a.id, session)
+    kb.ensure_started(b.bank_id, b.id, session)
+
+    jobs = kb.claim_jobs(session, "w1", limit=10)
+    assert len(jobs) == 2
+    assert kb.plan_fetches(session, jobs).keys() == {date(2026, 1, 2), date(2026, 1, 5)}
+
+    kb._run_jobs(session, jobs, "w1")
+
+    assert sorted(fetched) == [date(2026, 1, 2), date(2026, 1, 5)]
+    session.expire_all()
+    for loan in (a, b):
+        st = kb.get_status(loan.bank_id, loan.id, session)
+        assert st["status"] == "done" and st["processed_days"] == 2
+    fixing_days = set(session.execute(select(KiborFixing.effective_date)).scalars().all())
+    assert fixing_days == {date(2026, 1, 2), date(2026, 1, 3), date(2026, 1, 5)}
+
+
+def test_fixings_are_flushed_in_batches(session, monkeypatch):
+    days = [date(2026, 1, d) for d in (5, 6, 7, 8, 9)]
+    loan = _mk_islamic_loan(session, days)
+    monkeypatch.setattr(kb.settings, "backfill_flush_days", 2)
+    monkeypatch.setattr(kb.settings, "backfill_flush_seconds", 3600)
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", lambda d, **kw: _FakeKibor(11.0))
+
+    batches: list[int] = []
+    real_insert = kb.insert_fixings
+
+    def _insert(s, values, **kw):
+        batches.append(len(values))
+        return real_insert(s, values, **kw)
+
+    monkeypatch.setattr(kb, "insert_fixings", _insert)
+    kb.ensure_started(loan.bank_id, loan.id, session)
+    kb._run_job(session, kb.claim_job(session, "w1"), "w1")
+
+    # Two full batches of two days (five tenors each) and the remainder.
+    assert batches == [10, 10, 5]
+    session.expire_all()
+    st = kb.get_status(loan.bank_id, loan.id, session)
+    assert st["status"] == "done" and st["processed_days"] == 5
+
+
+def test_lease_is_renewed_before_each_fetch_while_days_fail(session, monkeypatch):
+    days = [date(2026, 1, d) for d in (5, 6, 7)]
+    loan = _mk_islamic_loan(session, days)
+    monkeypatch.setattr(kb.settings, "backfill_flush_seconds", 1e-9)
+
+    events: list[str] = []
+    real_heartbeat = kb._heartbeat_many
+
+    def _heartbeat(s, worker_id, progress):
+        events.append("heartbeat")
+        return real_heartbeat(s, worker_id, progress)
+
+    def _boom(d, **kw):
+        events.append("fetch")
+        raise RuntimeError("sheet not found")
+
+    monkeypatch.setattr(kb, "_heartbeat_many", _heartbeat)
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _boom)
+    kb.ensure_started(loan.bank_id, loan.id, session)
+    kb._run_job(session, kb.claim_job(session, "w1"), "w1")
+
+    fetches = [i for i, e in enumerate(events) if e == "fetch"]
+    assert len(fetches) == 3
+    assert all(events[i - 1] == "heartbeat" for i in fetches)
+
+
+def test_placeholder_comes_from_the_earliest_drawdown_with_a_fixing(session, monkeypatch):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5), date(2026, 1, 20)])
+    session.get(Bank, loan.bank_id).bank_type = "conventional"
+    session.commit()
+    monkeypatch.setattr(kb, "today_karachi", lambda: date(2026, 2, 10))
+    # Month starts are fetched too, and each sheet carries a different rate.
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", lambda d, **kw: _FakeKibor(10 + d.day / 100))
+
+    kb.ensure_started(loan.bank_id, loan.id, session)
+    kb._run_job(session, kb.claim_job(session, "w1"), "w1")
+
+    session.expire_all()
+    assert float(session.get(Loan, loan.id).kibor_placeholder_rate_percent) == 10.05
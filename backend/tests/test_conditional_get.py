@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.loan import Loan
+from app.schemas.rate import RateCreate
+from app.schemas.transaction import TxCreate
+import app.api.routes.ledger as ledger_routes
+import app.api.routes.rates as rate_routes
+import app.api.routes.transactions as tx_routes
+from app.services.kibor_rates import upsert_fixings
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(ledger_routes, "today_karachi", lambda: date(2026, 2, 1))
+    monkeypatch.setattr(ledger_routes, "is_ready", lambda s, bank_id, loan_id: True)
+    monkeypatch.setattr(tx_routes, "ensure_started", lambda bank_id, loan_id, s=None: {"status": "done"})
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_loan(session) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="conventional", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=10)
+    session.add(loan)
+    session.commit()
+    return loan
+
+
+def _request(etag: str | None = None, since: str | None = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    if since:
+        headers.append((b"if-modified-since", since.encode()))
+    return Request({"type": "http", "headers": headers})
+
+
+def _ledger(session, loan, end: date, etag: str | None = None):
+    resp = Response()
+    out = ledger_routes.ledger(
+        loan.bank_id,
+        loan.id,
+        _request(etag),
+        resp,
+        start=date(2026, 1, 1),
+        end=end,
+        provisional=False,
+        since=None,
+        fmt="json",
+        s=session,
+        u={"sub": "tester"},
+    )
+    return out, resp
+
+
+def test_matching_etag_skips_ledger_computation(session, monkeypatch):
+    loan = _mk_loan(session)
+    out, _ = _ledger(session, loan, date(2026, 1, 31))
+    etag = out.headers["etag"]
+    assert out.headers["x-accel-expires"] == "60"
+    assert "last-modified" in out.headers
+
+    def _boom(*a, **kw):
+        raise AssertionError("ledger recomputed")
+
+    monkeypatch.setattr(ledger_routes, "compute_ledger", _boom)
+    out, _ = _ledger(session, loan, date(2026, 1, 31), etag=etag)
+    assert out.status_code == 304 and out.headers["etag"] == etag
+
+
+def test_writes_change_the_validator(session):
+    loan = _mk_loan(session)
+    out, _ = _ledger(session, loan, date(2026, 1, 31))
+    first = out.headers["etag"]
+
+    tx_routes.add_tx(
+        loan.bank_id, loan.id, TxCreate(date=date(2026, 1, 5), category="markup", amount=-5), s=session, u={"sub": "t"}
+    )
+    out, _ = _ledger(session, loan, date(2026, 1, 31))
+    second = out.headers["etag"]
+    assert second != first
+
+    upsert_fixings(session, [{"effective_date": date(2026, 1, 5), "tenor_months": 1, "rate": 12}])
+    session.commit()
+    out, resp = _ledger(session, loan, date(2026, 1, 31), etag=second)
+    assert out.status_code == 200 and out.headers["etag"] != second
+
+
+def test_open_ranges_are_not_shared_and_roll_over_daily(session, monkeypatch):
+    loan = _mk_loan(session)
+    out, _ = _ledger(session, loan, date(2026, 2, 1))
+    assert "x-accel-expires" not in out.headers
+
+    monkeypatch.setattr(ledger_routes, "today_karachi", lambda: date(2026, 2, 2))
+    out, _ = _ledger(session, loan, date(2026, 2, 1), etag=out.headers["etag"])
+    assert out.status_code == 200
+
+
+def _rates(session, loan, request, resp):
+    return rate_routes.list_rates(
+        loan.bank_id, request, resp, tenor_months=None, start=None, end=None, limit=None, after=None, s=session, u={"sub": "t"}
+    )
+
+
+def test_rates_list_revalidates_on_bank_version(session):
+    loan = _mk_loan(session)
+    resp = Response()
+    _rates(session, loan, _request(), resp)
+    etag = resp.headers["etag"]
+
+    out = _rates(session, loan, _request(etag), Response())
+    assert out.status_code == 304
+
+    body = RateCreate(tenor_months=1, effective_date=date(2026, 1, 2), annual_rate_percent=11)
+    rate_routes.add_rate(loan.bank_id, body, s=session, u={"sub": "t"})
+    out = _rates(session, loan, _request(etag), Response())
+    assert isinstance(out, list) and len(out) == 1
+
+
+def test_fixing_writes_bump_one_shared_counter_not_the_banks(session):
+    loan = _mk_loan(session)
+    fixing = {"effective_date": date(2026, 1, 5), "tenor_months": 1, "rate": 12}
+    upsert_fixings(session, [fixing])
+    session.commit()
+    out, _ = _ledger(session, loan, date(2026, 1, 31))
+    etag = out.headers["etag"]
+    bank_version = session.get(Bank, loan.bank_id).data_version
+
+    # Re-importing a stored day writes nothing, so cached responses stay valid.
+    assert upsert_fixings(session, [fixing]) == 0
+    session.commit()
+    out, _ = _ledger(session, loan, date(2026, 1, 31), etag=etag)
+    assert out.status_code == 304
+
+    upsert_fixings(session, [{**fixing, "effective_date": date(2026, 1, 6)}])
+    session.commit()
+    out, _ = _ledger(session, loan, date(2026, 1, 31), etag=etag)
+    assert out.status_code == 200
+    session.expire_all()
+    assert session.get(Bank, loan.bank_id).data_version == bank_version
+
+
+def test_if_modified_since_applies_only_without_if_none_match(session):
+    loan = _mk_loan(session)
+    resp = Response()
+    _rates(session, loan, _request(), resp)
+    since = resp.headers["last-modified"]
+
+    assert _rates(session, loan, _request(since=since), Response()).status_code == 304
+    # A stale ETag wins over a current date.
+    assert isinstance(_rates(session, loan, _request('W/"stale"', since=since), Response()), list)
+    assert isinstance(_rates(session, loan, _request(since="not a date"), Response()), list)
+
+    bank = session.get(Bank, loan.bank_id)
+    bank.data_updated_at = bank.data_updated_at + timedelta(hours=1)
+    session.commit()
+    assert isinstance(_rates(session, loan, _request(since=since), Response()), list)
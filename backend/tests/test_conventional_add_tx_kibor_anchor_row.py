@@ -3,16 +3,18 @@ from decimal import Decimal, getcontext
 from uuid import uuid4
 
 import pytest
-from sqlalchemy import create_engine, select, insert
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker
 
 from app.db.base import Base
 from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
 from app.models.loan import Loan
 from app.models.rate import Rate
 from app.api.routes.transactions import add_tx
 from app.schemas.transaction import TxCreate
 import app.api.routes.transactions as tx_routes
+import app.services.kibor_backfill as kb
 
 getcontext().prec = 50
 
@@ -66,22 +68,17 @@ class _FakeKibor:
         return dict(self._m)
 
 
-class _SQLiteInsertIgnore:
-    def __init__(self, table):
-        self._stmt = insert(table)
-
-    def values(self, vals: dict):
-        self._stmt = self._stmt.values(**vals).prefix_with("OR IGNORE")
-        return self
-
-    def on_conflict_do_nothing(self, index_elements=None):
-        return self
-
-    def __clause_element__(self):
-        return self._stmt
+def _add_borrow(session, bank, loan, d: date):
+    return add_tx(
+        bank.id,
+        loan.id,
+        TxCreate(date=d, category="principal", amount=100.0, note="borrow"),
+        s=session,
+        u={"sub": "tester"},
+    )
 
 
-def test_add_tx_conventional_inserts_rate_row_on_principal_debit(session, monkeypatch):
+def test_add_tx_conventional_uses_stored_fixing_without_fetching(session, monkeypatch):
     bank, loan = _mk_bank_loan(
         session,
         bank_type="conventional",
@@ -89,38 +86,69 @@ def test_add_tx_conventional_inserts_rate_row_on_principal_debit(session, monkey
         additional_rate=Decimal("0"),
         placeholder=Decimal("0"),
     )
-
-    monkeypatch.setattr(tx_routes, "get_kibor_offer_rates", lambda d: _FakeKibor({1: 10.84}))
-    monkeypatch.setattr(tx_routes, "pg_insert", lambda table: _SQLiteInsertIgnore(table))
+    session.add(KiborFixing(effective_date=date(2025, 12, 11), tenor_months=1, rate=10.84))
+    session.commit()
 
     called = {"n": 0}
 
-    def _fake_ensure_started(bank_id: int, loan_id: int):
+    def _fake_ensure_started(bank_id: int, loan_id: int, s=None):
         called["n"] += 1
         return {"status": "running"}
 
     monkeypatch.setattr(tx_routes, "ensure_started", _fake_ensure_started)
 
-    out = add_tx(
-        bank.id,
-        loan.id,
-        TxCreate(date=date(2025, 12, 11), category="principal", amount=100.0, note="borrow"),
-        s=session,
-        u={"sub": "tester"},
-    )
+    out = _add_borrow(session, bank, loan, date(2025, 12, 11))
 
     assert out.kibor_rate_percent == pytest.approx(10.84, rel=0, abs=1e-9)
+    assert out.kibor_rate_pending is False
+
+    loan2 = session.execute(select(Loan).where(Loan.id == loan.id)).scalar_one()
+    assert float(loan2.kibor_placeholder_rate_percent) == pytest.approx(10.84, rel=0, abs=1e-9)
+
+    # Conventional loans still queue their month-start anchors.
+    assert called["n"] == 1
+
+
+def test_add_tx_conventional_defers_missing_anchor_to_backfill(session, monkeypatch):
+    bank, loan = _mk_bank_loan(
+        session,
+        bank_type="conventional",
+        tenor_months=1,
+        additional_rate=Decimal("0"),
+        placeholder=Decimal("0"),
+    )
+    monkeypatch.setattr(kb, "today_karachi", lambda: date(2025, 12, 15))
 
-    r = session.execute(
-        select(Rate).where(
-            Rate.bank_id == bank.id,
-            Rate.tenor_months == 1,
-            Rate.effective_date == date(2025, 12, 11),
+    fetched: list[date] = []
+
+    def _fetch(d, **kw):
+        fetched.append(d)
+        return _FakeKibor({1: 10.84, 3: 10.9, 6: 11.0, 9: 11.1, 12: 11.2})
+
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _fetch)
+
+    out = _add_borrow(session, bank, loan, date(2025, 12, 11))
+
+    # Nothing is fetched on the request path.
+    assert fetched == []
+    assert out.kibor_rate_pending is True
+    assert out.kibor_rate_percent is None
+
+    job = kb.claim_job(session, "w1")
+    assert job is not None and job.loan_id == loan.id
+    kb._run_job(session, job, "w1")
+
+    f = session.execute(
+        select(KiborFixing).where(
+            KiborFixing.tenor_months == 1,
+            KiborFixing.effective_date == date(2025, 12, 11),
         )
     ).scalar_one()
-    assert float(r.annual_rate_percent) == pytest.approx(10.84, rel=0, abs=1e-9)
+    assert float(f.rate) == pytest.approx(10.84, rel=0, abs=1e-9)
+
+    # The market fixing is shared, so no per-bank duplicate is written.
+    assert session.execute(select(Rate).where(Rate.bank_id == bank.id)).first() is None
 
+    session.expire_all()
     loan2 = session.execute(select(Loan).where(Loan.id == loan.id)).scalar_one()
     assert float(loan2.kibor_placeholder_rate_percent) == pytest.approx(10.84, rel=0, abs=1e-9)
-
-    assert called["n"] == 1
@@ -0,0 +1,65 @@
+import gzip
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import brotli
+from fastapi import Request, Response
+
+import app.api.fast_json as fj
+from app.schemas.ledger import LedgerRow
+
+
+def _request(accept_encoding: str | None = None) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "headers": headers})
+
+
+def _rows(n: int) -> list[dict]:
+    start = date(2020, 1, 1)
+    return [
+        {
+            "date": start + timedelta(days=i),
+            "principal_balance": 1_000_000.0,
+            "daily_markup": 312.33,
+            "accrued_markup": round(312.33 * (i + 1), 2),
+            "rate_percent": 11.4,
+        }
+        for i in range(n)
+    ]
+
+
+def test_body_matches_the_response_model_output():
+    rows = _rows(3)
+    out = fj.json_response(_request(), Response(), rows)
+    expected = [LedgerRow(**r).model_dump(mode="json") for r in rows]
+    assert json.loads(out.body) == expected
+    assert out.media_type == "application/json"
+
+
+def test_large_bodies_prefer_brotli():
+    out = fj.json_response(_request("gzip, br"), Response(), _rows(2000))
+    assert out.headers["content-encoding"] == "br"
+    assert len(json.loads(brotli.decompress(out.body))) == 2000
+
+
+def test_large_bodies_are_gzipped_when_accepted():
+    rows = _rows(2000)
+    out = fj.json_response(_request("br;q=0, gzip;q=0.8"), Response(), rows)
+    assert out.headers["content-encoding"] == "gzip"
+    assert out.headers["vary"] == "Accept-Encoding"
+    assert len(json.loads(gzip.decompress(out.body))) == 2000
+
+
+def test_small_or_refused_bodies_are_sent_plain():
+    assert "content-encoding" not in fj.json_response(_request("gzip"), Response(), _rows(2)).headers
+    assert "content-encoding" not in fj.json_response(_request("gzip;q=0"), Response(), _rows(2000)).headers
+    assert "content-encoding" not in fj.json_response(_request(), Response(), _rows(2000)).headers
+
+
+def test_injected_headers_and_decimals_are_carried_over():
+    resp = Response()
+    resp.headers["ETag"] = 'W/"b1.0-l1.0"'
+    out = fj.json_response(_request(), resp, [{"amount": Decimal("12.50")}])
+    assert out.headers["etag"] == 'W/"b1.0-l1.0"'
+    assert json.loads(out.body) == [{"amount": 12.5}]
@@ -0,0 +1,170 @@
+from datetime import date, datetime
+from uuid import uuid4
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.backfill_job import BackfillJob
+from app.models.bank import Bank
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.services import kibor
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+import app.services.kibor_backfill as kb
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+class _FlakyClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url):
+        self.calls += 1
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return httpx.Response(r)
+
+
+@pytest.fixture()
+def breaker(monkeypatch):
+    clock = _Clock()
+    b = CircuitBreaker(failure_threshold=3, reset_seconds=30, clock=clock)
+    monkeypatch.setattr(kibor, "_breaker", b)
+    monkeypatch.setattr(kibor.time, "sleep", lambda s: None)
+    return b, clock
+
+
+def test_breaker_opens_then_half_opens_for_one_probe(breaker):
+    b, clock = breaker
+    for _ in range(3):
+        assert b.allow()
+        b.record_failure()
+    assert b.state == OPEN and not b.allow()
+
+    clock.t = 31
+    assert b.state == HALF_OPEN
+    assert b.allow() and not b.allow()
+
+    b.record_failure()
+    assert b.state == OPEN
+
+    clock.t = 62
+    assert b.allow()
+    b.record_success()
+    assert b.state == CLOSED
+
+
+def test_transient_errors_are_retried_and_404_is_not_a_failure(breaker, monkeypatch):
+    b, _ = breaker
+    monkeypatch.setattr(kibor.settings, "kibor_fetch_retries", 2)
+    client = _FlakyClient([httpx.ConnectTimeout("slow"), 503, 404])
+
+    r = kibor._get(client, "http://x/a.pdf", kibor.RetryBudget(5))
+
+    assert r.status_code == 404 and client.calls == 3
+    assert b.state == CLOSED
+
+
+def test_exhausted_budget_raises_unavailable(breaker, monkeypatch):
+    monkeypatch.setattr(kibor.settings, "kibor_fetch_retries", 5)
+    budget = kibor.RetryBudget(1)
+    client = _FlakyClient([500, 500, 500])
+
+    with pytest.raises(kibor.KiborUnavailable):
+        kibor._get(client, "http://x/a.pdf", budget)
+    assert client.calls == 2 and budget.remaining == 0
+
+
+def test_open_circuit_fails_fast(breaker):
+    b, _ = breaker
+    for _ in range(3):
+        b.record_failure()
+    client = _FlakyClient([200])
+
+    with pytest.raises(kibor.KiborUnavailable):
+        kibor._get(client, "http://x/a.pdf", None)
+    assert client.calls == 0
+
+
+def test_unavailable_publisher_requeues_days_without_spending_attempts(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)()
+
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    s.add(bank)
+    s.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=0)
+    s.add(loan)
+    s.flush()
+    for d in (date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7)):
+        s.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=100))
+    s.commit()
+
+    calls: list[date] = []
+
+    def _down(d, **kw):
+        calls.append(d)
+        raise kibor.KiborUnavailable("kibor_circuit_open")
+
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _down)
+    kb.ensure_started(bank.id, loan.id, s)
+    kb._run_job(s, kb.claim_job(s, "w1"), "w1")
+
+    # The first failure stops probing for the rest of the batch.
+    assert calls == [date(2026, 1, 5)]
+    s.expire_all()
+    job = s.execute(select(BackfillJob)).scalar_one()
+    assert job.status == "queued" and job.attempts == 0
+    assert job.run_after > datetime.utcnow()
+    assert "kibor unavailable; retrying 3 day(s)" in job.message
+    s.close()
+
+
+def test_only_breaker_deferrals_are_refunded(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)()
+
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    s.add(bank)
+    s.flush()
+    loans = []
+    # One loan fails with a parse error before the breaker trips, the other
+    # only has days after it.
+    for name, days in (("Loan-A", [date(2026, 1, 5), date(2026, 1, 7)]), ("Loan-B", [date(2026, 1, 7)])):
+        loan = Loan(bank_id=bank.id, name=name, kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=0)
+        s.add(loan)
+        s.flush()
+        for d in days:
+            s.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=100))
+        loans.append(loan)
+    s.commit()
+
+    def _fetch(d, **kw):
+        if d == date(2026, 1, 5):
+            raise ValueError("unparseable sheet")
+        raise kibor.KiborUnavailable("kibor_circuit_open")
+
+    monkeypatch.setattr(kb, "get_kibor_offer_rates", _fetch)
+    for loan in loans:
+        kb.ensure_started(bank.id, loan.id, s)
+    kb._run_jobs(s, kb.claim_jobs(s, "w1", limit=10), "w1")
+
+    s.expire_all()
+    jobs = {j.loan_id: j for j in s.execute(select(BackfillJob)).scalars()}
+    assert jobs[loans[0].id].attempts == 1 and jobs[loans[0].id].message.startswith("retrying")
+    assert jobs[loans[1].id].attempts == 0 and jobs[loans[1].id].message.startswith("kibor unavailable")
+    s.close()
@@ -0,0 +1,170 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.backfill_job import BackfillJob
+from app.models.bank import Bank
+from app.models.kibor_coverage import LoanKiborCoverage
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+import app.services.kibor_backfill as kb
+from app.services.kibor_coverage import invalidate_coverage
+from app.services.kibor_rates import upsert_fixings
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+@pytest.fixture()
+def compute_calls(monkeypatch):
+    calls = []
+    real = kb._compute_missing_days
+
+    def counting(s, bank_id, loan_id):
+        calls.append(loan_id)
+        return real(s, bank_id, loan_id)
+
+    monkeypatch.setattr(kb, "_compute_missing_days", counting)
+    monkeypatch.setattr(kb, "today_karachi", lambda: date(2026, 1, 20))
+    return calls
+
+
+def _mk_islamic_loan(session, days: list[date]) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(
+        bank_id=bank.id,
+        name="Loan-A",
+        kibor_tenor_months=1,
+        additional_rate=0,
+        kibor_placeholder_rate_percent=0,
+        max_loan_amount=None,
+    )
+    session.add(loan)
+    session.flush()
+    for d in days:
+        session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=100))
+    session.commit()
+    return loan
+
+
+def _fixing(d: date) -> dict:
+    return {"effective_date": d, "tenor_months": 1, "rate": 11.0}
+
+
+def test_is_ready_reuses_stored_coverage(session, compute_calls):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+
+    assert kb.is_ready(session, loan.bank_id, loan.id) is False
+    assert kb.is_ready(session, loan.bank_id, loan.id) is False
+    assert compute_calls == [loan.id]
+
+    row = session.execute(select(LoanKiborCoverage)).scalar_one()
+    assert row.missing_count == 1 and row.stale is False
+
+
+def test_new_fixing_marks_gapped_loans_stale(session, compute_calls):
+    gapped = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    upsert_fixings(session, [_fixing(date(2026, 1, 6))])
+    covered = _mk_islamic_loan(session, [date(2026, 1, 6)])
+    session.commit()
+
+    assert kb.is_ready(session, gapped.bank_id, gapped.id) is False
+    assert kb.is_ready(session, covered.bank_id, covered.id) is True
+
+    upsert_fixings(session, [_fixing(date(2026, 1, 5))])
+    session.commit()
+
+    # Only the loan that had gaps is recomputed.
+    assert kb.is_ready(session, gapped.bank_id, gapped.id) is True
+    assert kb.is_ready(session, covered.bank_id, covered.id) is True
+    assert compute_calls == [gapped.id, covered.id, gapped.id]
+
+
+def test_principal_change_invalidates_loan(session, compute_calls):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    upsert_fixings(session, [_fixing(date(2026, 1, 5))])
+    session.commit()
+    assert kb.is_ready(session, loan.bank_id, loan.id) is True
+
+    session.add(Transaction(bank_id=loan.bank_id, loan_id=loan.id, date=date(2026, 1, 7), category="principal", amount=50))
+    invalidate_coverage(session, loan_id=loan.id)
+    session.commit()
+
+    assert kb.is_ready(session, loan.bank_id, loan.id) is False
+    assert len(compute_calls) == 2
+
+
+def test_recompute_is_dropped_when_a_fixing_lands_meanwhile(session, monkeypatch):
+    monkeypatch.setattr(kb, "today_karachi", lambda: date(2026, 1, 20))
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    real = kb._compute_missing_days
+    raced = []
+
+    def racing(s, bank_id, loan_id):
+        missing = real(s, bank_id, loan_id)
+        if not raced:
+            # The worker writes the fixing after the gap list was computed.
+            raced.append(loan_id)
+            upsert_fixings(s, [_fixing(date(2026, 1, 5))])
+            s.commit()
+        return missing
+
+    monkeypatch.setattr(kb, "_compute_missing_days", racing)
+
+    assert kb.is_ready(session, loan.bank_id, loan.id) is False
+    session.expire_all()
+    assert session.execute(select(LoanKiborCoverage.stale)).scalar_one() is True
+    assert kb.is_ready(session, loan.bank_id, loan.id) is True
+
+
+def test_finished_job_invalidates_its_coverage(session, compute_calls):
+    loan = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    assert kb.is_ready(session, loan.bank_id, loan.id) is False
+
+    job = BackfillJob(bank_id=loan.bank_id, loan_id=loan.id, status="running", locked_by="w1", attempts=1)
+    session.add(job)
+    session.commit()
+    kb._finish(session, job, "w1", [])
+
+    session.expire_all()
+    assert session.execute(select(LoanKiborCoverage.stale)).scalar_one() is True
+
+
+def test_fixing_writes_leave_covered_rows_and_no_op_writes_alone(session, compute_calls):
+    gapped = _mk_islamic_loan(session, [date(2026, 1, 5)])
+    covered = _mk_islamic_loan(session, [date(2026, 1, 6)])
+    upsert_fixings(session, [_fixing(date(2026, 1, 6))])
+    session.commit()
+    kb.is_ready(session, gapped.bank_id, gapped.id)
+    kb.is_ready(session, covered.bank_id, covered.id)
+
+    def versions():
+        session.expire_all()
+        return dict(session.execute(select(LoanKiborCoverage.loan_id, LoanKiborCoverage.version)).all())
+
+    before = versions()
+    # Already stored: nothing written, nothing invalidated.
+    assert upsert_fixings(session, [_fixing(date(2026, 1, 6))]) == 0
+    session.commit()
+    assert versions() == before
+
+    upsert_fixings(session, [_fixing(date(2026, 1, 9))])
+    session.commit()
+    after = versions()
+    assert after[covered.id] == before[covered.id]
+    assert after[gapped.id] == before[gapped.id] + 1
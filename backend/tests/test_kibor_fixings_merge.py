@@ -0,0 +1,136 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.rate import Rate
+from app.services.kibor_rates import covered_dates, rate_history
+import app.api.routes.rates as rate_routes
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_bank(session) -> Bank:
+    b = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="conventional", additional_rate=None)
+    session.add(b)
+    session.commit()
+    return b
+
+
+def _fix(session, d: date, tenor: int, rate: str):
+    session.add(KiborFixing(effective_date=d, tenor_months=tenor, rate=Decimal(rate)))
+    session.commit()
+
+
+def _override(session, bank_id: int, d: date, tenor: int, rate: str):
+    session.add(Rate(bank_id=bank_id, tenor_months=tenor, effective_date=d, annual_rate_percent=Decimal(rate)))
+    session.commit()
+
+
+def test_overrides_win_over_fixings_only_for_their_bank(session):
+    b1 = _mk_bank(session)
+    b2 = _mk_bank(session)
+
+    _fix(session, date(2026, 1, 1), 1, "10.5")
+    _fix(session, date(2026, 1, 2), 1, "10.6")
+    _fix(session, date(2026, 1, 2), 3, "10.9")
+    _override(session, b1.id, date(2026, 1, 2), 1, "9.9")
+    _override(session, b1.id, date(2026, 1, 5), 1, "9.8")
+
+    h1 = rate_history(session, b1.id, date(2026, 1, 31), 1)
+    h2 = rate_history(session, b2.id, date(2026, 1, 31), 1)
+
+    assert h1 == {1: [(date(2026, 1, 1), Decimal("10.5")), (date(2026, 1, 2), Decimal("9.9")), (date(2026, 1, 5), Decimal("9.8"))]}
+    assert h2 == {1: [(date(2026, 1, 1), Decimal("10.5")), (date(2026, 1, 2), Decimal("10.6"))]}
+    assert set(rate_history(session, b2.id, date(2026, 1, 1))) == {1}
+
+
+def test_covered_dates_counts_fixings_and_own_overrides(session):
+    b1 = _mk_bank(session)
+    b2 = _mk_bank(session)
+    _fix(session, date(2026, 2, 2), 1, "11.0")
+    _override(session, b1.id, date(2026, 2, 3), 1, "11.1")
+
+    days = [date(2026, 2, 2), date(2026, 2, 3), date(2026, 2, 4)]
+    assert covered_dates(session, b1.id, 1, days) == {date(2026, 2, 2), date(2026, 2, 3)}
+    assert covered_dates(session, b2.id, 1, days) == {date(2026, 2, 2)}
+    assert covered_dates(session, b2.id, 3, days) == set()
+
+
+def _rates(session, bank_id: int, **kw):
+    resp = Response()
+    out = rate_routes.list_rates(
+        bank_id,
+        Request({"type": "http", "method": "GET", "headers": []}),
+        resp,
+        tenor_months=kw.get("tenor_months"),
+        start=kw.get("start"),
+        end=kw.get("end"),
+        limit=kw.get("limit"),
+        after=kw.get("after"),
+        s=session,
+        u={"sub": "t"},
+    )
+    return out, resp.headers.get("X-Next-Cursor")
+
+
+def test_listed_fixings_cannot_be_deleted_as_overrides(session):
+    b1 = _mk_bank(session)
+    _fix(session, date(2026, 3, 2), 1, "11.0")
+    _override(session, b1.id, date(2026, 3, 3), 1, "11.1")
+
+    out, _ = _rates(session, b1.id)
+    fixing = next(r for r in out if r.source == "fixing")
+    override = next(r for r in out if r.source == "override")
+    # Both tables start at id 1; the listing keeps them apart.
+    assert fixing.id < 0 < override.id
+
+    with pytest.raises(HTTPException) as e:
+        rate_routes.delete_rate(b1.id, fixing.id, s=session, u={"sub": "t"})
+    assert e.value.detail == "kibor_fixing_not_deletable"
+    assert session.query(Rate).count() == 1
+
+
+def test_rates_list_filters_in_sql_and_pages_by_date_then_id(session):
+    b1 = _mk_bank(session)
+    for day in (1, 2, 3):
+        _fix(session, date(2026, 4, day), 1, "11.0")
+        _fix(session, date(2026, 4, day), 3, "12.0")
+    # Hides the 1M fixing on the same day.
+    _override(session, b1.id, date(2026, 4, 2), 1, "11.5")
+
+    everything, cursor = _rates(session, b1.id, tenor_months=1)
+    assert cursor is None
+    assert [(r.effective_date.day, r.source) for r in everything] == [(3, "fixing"), (2, "override"), (1, "fixing")]
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = _rates(session, b1.id, limit=2, after=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+        assert len(page) == 2
+    assert len(seen) == 6
+    assert [(r.effective_date, r.id) for r in seen] == sorted(((r.effective_date, r.id) for r in seen), reverse=True)
+
+    window, _ = _rates(session, b1.id, tenor_months=3, start=date(2026, 4, 2), end=date(2026, 4, 2))
+    assert [(r.tenor_months, r.effective_date) for r in window] == [(3, date(2026, 4, 2))]
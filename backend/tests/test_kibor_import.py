@@ -0,0 +1,116 @@
+import io
+import zipfile
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.rate import Rate
+import app.services.kibor_import as ki
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(ki, "pg_insert", sqlite_insert)
+
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_bank(session, bank_type: str = "conventional") -> Bank:
+    b = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type=bank_type, additional_rate=None)
+    session.add(b)
+    session.commit()
+    return b
+
+
+CSV = """date,1m,3m,6m,9m,12m
+2025-01-02,12.10,12.20,12.30,12.40,12.50
+03-Jan-25,12.11,12.21,12.31,12.41,12.51
+not-a-date,1,2,3,4,5
+"""
+
+
+def test_csv_rows_and_bad_lines_are_reported():
+    res = ki.parse_rates_csv(CSV, source="hist.csv")
+
+    assert [r.effective_date for r in res.rates] == [date(2025, 1, 2), date(2025, 1, 3)]
+    assert res.rates[1].offer_12m == pytest.approx(12.51)
+    assert res.skipped == ["hist.csv:4"]
+
+
+def test_filename_dates_follow_publisher_layout():
+    assert ki._date_from_filename("2024/Mar/Kibor-05-Mar-24.pdf") == date(2024, 3, 5)
+    assert ki._date_from_filename("kibor-31-Dec-23.PDF") == date(2023, 12, 31)
+    assert ki._date_from_filename("readme.pdf") is None
+
+
+def test_zip_pdfs_are_parsed_in_one_batch(monkeypatch):
+    seen: list[list[bytes]] = []
+
+    def _fake_many(pdfs):
+        pdfs = list(pdfs)
+        seen.append(pdfs)
+        return [(10.0, 10.1, 10.2, 10.3, 10.4) if b != b"bad" else None for b in pdfs]
+
+    monkeypatch.setattr(ki, "parse_kibor_offer_rates_many", _fake_many)
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("2025/Jan/Kibor-02-Jan-25.pdf", b"one")
+        zf.writestr("2025/Jan/Kibor-03-Jan-25.pdf", b"bad")
+        zf.writestr("2025/Jan/Kibor-06-Jan-25.pdf", b"two")
+        zf.writestr("notes.txt", b"ignored")
+
+    res = ki.load_rates_from_upload("sheets.zip", buf.getvalue())
+
+    assert len(seen) == 1 and len(seen[0]) == 3
+    assert [r.effective_date for r in res.rates] == [date(2025, 1, 2), date(2025, 1, 6)]
+    assert sorted(res.skipped) == ["2025/Jan/Kibor-03-Jan-25.pdf", "notes.txt"]
+
+
+def test_upsert_without_banks_writes_market_fixings_once(session):
+    _mk_bank(session)
+    _mk_bank(session)
+    res = ki.parse_rates_csv(CSV)
+
+    assert ki.upsert_rates(session, res.rates) == 2 * 5
+    assert session.execute(select(Rate)).first() is None
+    assert len(session.execute(select(KiborFixing)).scalars().all()) == 10
+    assert ki.upsert_rates(session, res.rates) == 0
+
+
+def test_upsert_writes_overrides_for_selected_banks(session):
+    b1 = _mk_bank(session)
+    b2 = _mk_bank(session)
+    b3 = _mk_bank(session)
+    res = ki.parse_rates_csv(CSV)
+
+    written = ki.upsert_rates(session, res.rates, bank_ids=[b1.id, b2.id], batch_size=7)
+    assert written == 2 * 5 * 2
+
+    rows = session.execute(select(Rate.bank_id).distinct()).scalars().all()
+    assert sorted(rows) == sorted([b1.id, b2.id])
+    assert b3.id not in rows
+
+    # Re-running is idempotent unless asked to overwrite.
+    assert ki.upsert_rates(session, res.rates, bank_ids=[b1.id]) == 0
+
+    changed = ki.parse_rates_csv("2025-01-02,9,9,9,9,9\n")
+    ki.upsert_rates(session, changed.rates, bank_ids=[b1.id], overwrite=True)
+    r = session.execute(
+        select(Rate).where(Rate.bank_id == b1.id, Rate.tenor_months == 3, Rate.effective_date == date(2025, 1, 2))
+    ).scalar_one()
+    assert float(r.annual_rate_percent) == pytest.approx(9.0)
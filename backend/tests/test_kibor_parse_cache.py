@@ -0,0 +1,67 @@
+import pytest
+
+import app.services.kibor as kibor
+from app.services.kibor_cache import ParseCache, pdf_digest
+
+RATES = (10.84, 10.85, 10.86, 10.87, 10.88)
+
+
+@pytest.fixture()
+def parse_calls(monkeypatch, tmp_path):
+    calls: list[bytes] = []
+
+    def _fake_parse(pdf_bytes: bytes):
+        calls.append(pdf_bytes)
+        if pdf_bytes.startswith(b"bad"):
+            raise RuntimeError("kibor_parse_failed")
+        return RATES
+
+    monkeypatch.setattr(kibor.settings, "kibor_parse_workers", 0)
+    monkeypatch.setattr(kibor, "_parse_offer_rates_local", _fake_parse)
+    monkeypatch.setattr(kibor, "_cache", ParseCache(tmp_path, max_entries=2))
+    return calls
+
+
+def test_identical_bytes_are_parsed_once(parse_calls):
+    assert kibor.parse_kibor_offer_rates(b"sheet-1") == RATES
+    assert kibor.parse_kibor_offer_rates(b"sheet-1") == RATES
+    assert parse_calls == [b"sheet-1"]
+
+
+def test_batch_dedupes_and_skips_cached(parse_calls):
+    kibor.parse_kibor_offer_rates(b"sheet-1")
+
+    out = kibor.parse_kibor_offer_rates_many([b"sheet-1", b"sheet-2", b"sheet-2", b"bad"])
+
+    assert out == [RATES, RATES, RATES, None]
+    assert parse_calls == [b"sheet-1", b"sheet-2", b"bad"]
+
+
+def test_entries_survive_restart_via_disk(parse_calls, tmp_path):
+    kibor.parse_kibor_offer_rates(b"sheet-1")
+
+    fresh = ParseCache(tmp_path)
+    assert fresh.get(pdf_digest(b"sheet-1"), kibor.PARSER_VERSION) == RATES
+    assert fresh.get(pdf_digest(b"sheet-1"), kibor.PARSER_VERSION + 1) is None
+
+
+def test_lru_eviction_falls_back_to_disk(parse_calls):
+    for b in (b"a", b"b", b"c"):
+        kibor.parse_kibor_offer_rates(b)
+    assert len(kibor._cache._mem) == 2
+
+    assert kibor.parse_kibor_offer_rates(b"a") == RATES
+    assert parse_calls == [b"a", b"b", b"c"]
+
+
+def test_parser_version_bump_reparses_everything_cached(parse_calls, monkeypatch):
+    kibor.parse_kibor_offer_rates_many([b"a", b"b"])
+    assert kibor.reparse_stale_cache() == 0
+
+    monkeypatch.setattr(kibor, "PARSER_VERSION", kibor.PARSER_VERSION + 1)
+    kibor._cache.clear_memory()
+
+    assert kibor.reparse_stale_cache() == 2
+    assert sorted(parse_calls) == [b"a", b"a", b"b", b"b"]
+    assert kibor.parse_kibor_offer_rates(b"a") == RATES
+    assert len(parse_calls) == 4
@@ -0,0 +1,76 @@
+import pytest
+
+import app.services.kibor as kibor
+from app.services.kibor_cache import ParseCache
+
+
+FIRST_PAGE = """
+Karachi Interbank Offered Rate (KIBOR)
+Tenor Bid Offer
+1 - Month 10.59 10.84
+3 - Month 10.60 10.85
+6 - Month 10.61 10.86
+9 - Months 10.62 10.87
+1 - Year 10.63 10.88
+"""
+
+
+class _FakePage:
+    def __init__(self, text: str, calls: list[int], idx: int):
+        self._text = text
+        self._calls = calls
+        self._idx = idx
+
+    def extract_text(self):
+        self._calls.append(self._idx)
+        return self._text
+
+
+class _FakePdf:
+    def __init__(self, texts: list[str], calls: list[int]):
+        self.pages = [_FakePage(t, calls, i) for i, t in enumerate(texts)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture()
+def inline_parsing(monkeypatch):
+    monkeypatch.setattr(kibor.settings, "kibor_parse_workers", 0)
+    monkeypatch.setattr(kibor, "_cache", ParseCache(None))
+
+
+def _fake_open(monkeypatch, texts: list[str]) -> list[int]:
+    calls: list[int] = []
+    monkeypatch.setattr(kibor.pdfplumber, "open", lambda _buf: _FakePdf(texts, calls))
+    return calls
+
+
+def test_parse_reads_only_first_page_when_all_tenors_present(inline_parsing, monkeypatch):
+    calls = _fake_open(monkeypatch, [FIRST_PAGE, "page two", "page three"])
+
+    assert kibor.parse_kibor_offer_rates(b"%PDF") == (10.84, 10.85, 10.86, 10.87, 10.88)
+    assert calls == [0]
+
+
+def test_parse_falls_back_to_all_pages_when_tenor_missing(inline_parsing, monkeypatch):
+    first = "\n".join(line for line in FIRST_PAGE.splitlines() if "Year" not in line)
+    calls = _fake_open(monkeypatch, [first, "notes", "1 - Year 10.63 10.88"])
+
+    assert kibor.parse_kibor_offer_rates(b"%PDF") == (10.84, 10.85, 10.86, 10.87, 10.88)
+    assert calls == [0, 1, 2]
+
+
+def test_parse_many_keeps_order_and_marks_failures(inline_parsing, monkeypatch):
+    _fake_open(monkeypatch, [FIRST_PAGE])
+    ok = kibor.parse_kibor_offer_rates_many([b"a", b"b"])
+    assert ok == [(10.84, 10.85, 10.86, 10.87, 10.88)] * 2
+
+    _fake_open(monkeypatch, ["nothing useful"])
+    assert kibor.parse_kibor_offer_rates_many([b"c"]) == [None]
+
+    with pytest.raises(RuntimeError, match="kibor_parse_failed"):
+        kibor.parse_kibor_offer_rates(b"d")
@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+import app.services.kibor as kibor
+from app.services.kibor_cache import ParseCache
+from kibor_publisher import KiborPublisher, build_kibor_pdf, default_offers
+
+
+@pytest.fixture()
+def inline_parsing(monkeypatch):
+    monkeypatch.setattr(kibor.settings, "kibor_parse_workers", 0)
+    monkeypatch.setattr(kibor, "_cache", ParseCache(None))
+
+
+@pytest.mark.parametrize("split_pages", [False, True])
+def test_synthetic_sheet_parses_with_pdfplumber(inline_parsing, split_pages):
+    d = date(2025, 3, 14)
+    offers = default_offers(d)
+
+    got = kibor.parse_kibor_offer_rates(build_kibor_pdf(d, offers, split_pages=split_pages))
+
+    assert got == tuple(offers[t] for t in (1, 3, 6, 9, 12))
+
+
+def test_fetch_walks_back_over_holidays_and_filename_variants(inline_parsing, monkeypatch):
+    holiday = date(2025, 3, 14)  # Friday
+    pub = KiborPublisher(
+        holidays={holiday},
+        missing=lambda d: d == date(2025, 3, 13),
+        variant=lambda d: 3 if d == date(2025, 3, 12) else 0,
+    )
+    with pub:
+        monkeypatch.setattr(kibor.settings, "kibor_base_url", pub.base_url)
+
+        # Sunday -> Friday (holiday) -> Thursday (404) -> Wednesday (4th filename variant).
+        kib = kibor.get_kibor_offer_rates(date(2025, 3, 16))
+
+    assert kib.effective_date == date(2025, 3, 12)
+    assert kib.offer_1m == default_offers(date(2025, 3, 12))[1]
+    assert pub.served_count == 1
+    assert pub.request_count == 4 + 4 + 4
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+
+import app.services.kibor_sync as ks
+
+
+@pytest.fixture(autouse=True)
+def sqlite_engine(monkeypatch):
+    monkeypatch.setattr(ks, "engine", create_engine("sqlite+pysqlite:///:memory:", future=True))
+
+
+def _run_one_cycle(monkeypatch) -> None:
+    real_sleep = asyncio.sleep
+    sleeps = {"n": 0}
+
+    async def _sleep(seconds):
+        sleeps["n"] += 1
+        if sleeps["n"] > 1:
+            raise asyncio.CancelledError
+        await real_sleep(0)
+
+    monkeypatch.setattr(ks.settings, "kibor_sync_enabled", True)
+    monkeypatch.setattr(ks.asyncio, "sleep", _sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(ks.kibor_sync_loop())
+
+
+def test_sync_runs_off_the_event_loop_thread(monkeypatch):
+    ran_on: list[int] = []
+    monkeypatch.setattr(ks, "sync_kibor_rates_once", lambda: ran_on.append(threading.get_ident()))
+
+    _run_one_cycle(monkeypatch)
+
+    assert len(ran_on) == 1
+    assert ran_on[0] != threading.get_ident()
+
+
+def test_follower_skips_the_cycle(monkeypatch):
+    ran: list[bool] = []
+    monkeypatch.setattr(ks, "sync_kibor_rates_once", lambda: ran.append(True))
+    monkeypatch.setattr(ks._leader, "acquire", lambda: False)
+
+    _run_one_cycle(monkeypatch)
+
+    assert ran == []
+
+
+def test_non_postgres_engine_always_leads():
+    assert ks._Leadership().acquire() is True
@@ -0,0 +1,60 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.services.kibor_sync import plan_missing_days
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_bank(session, bank_type: str, borrows: list[date]) -> int:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type=bank_type, additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=0)
+    session.add(loan)
+    session.flush()
+    for d in borrows:
+        session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=d, category="principal", amount=100))
+    session.commit()
+    return bank.id
+
+
+def test_plan_groups_banks_per_missing_business_day(session):
+    # Sun 2026-01-04 shifts back to Fri 2026-01-02.
+    conv = _mk_bank(session, "conventional", [date(2026, 1, 4), date(2026, 1, 7)])
+    isl = _mk_bank(session, "islamic", [date(2026, 1, 5)])
+    session.add(KiborFixing(effective_date=date(2026, 1, 6), tenor_months=1, rate=11.0))
+    session.commit()
+
+    plan = plan_missing_days(session, date(2026, 1, 8))
+
+    assert plan == {
+        date(2026, 1, 2): {conv},
+        date(2026, 1, 5): {conv, isl},
+        date(2026, 1, 7): {conv},
+        date(2026, 1, 8): {conv},
+    }
+
+
+def test_plan_is_empty_without_drawdowns(session):
+    _mk_bank(session, "conventional", [])
+    assert plan_missing_days(session, date(2026, 1, 8)) == {}
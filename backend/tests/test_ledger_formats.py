@@ -0,0 +1,99 @@
+import json
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+import app.api.routes.ledger as ledger_routes
+from app.services.ledger import compute_ledger
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(ledger_routes, "today_karachi", lambda: date(2026, 6, 1))
+    monkeypatch.setattr(ledger_routes, "is_ready", lambda s, bank_id, loan_id: True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_loan(session) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="conventional", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=1, kibor_placeholder_rate_percent=10)
+    session.add(loan)
+    session.flush()
+    session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=date(2026, 1, 5), category="principal", amount=1000))
+    session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=date(2026, 2, 9), category="principal", amount=500))
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.add(KiborFixing(effective_date=date(2026, 2, 2), tenor_months=1, rate=13))
+    session.commit()
+    return loan
+
+
+def _ledger(session, loan, fmt: str, provisional: bool = False):
+    return ledger_routes.ledger(
+        loan.bank_id,
+        loan.id,
+        Request({"type": "http", "headers": []}),
+        Response(),
+        start=date(2026, 1, 10),
+        end=date(2026, 3, 31),
+        provisional=provisional,
+        since=None,
+        fmt=fmt,
+        s=session,
+        u={"sub": "tester"},
+    )
+
+
+def test_columnar_matches_row_output(session):
+    loan = _mk_loan(session)
+    rows = compute_ledger(session, loan.bank_id, loan.id, date(2026, 1, 10), date(2026, 3, 31))
+
+    body = json.loads(_ledger(session, loan, "columnar").body)
+    base = date.fromisoformat(body["base_date"])
+    assert base == date(2026, 1, 10)
+    assert [base + timedelta(days=off) for off in body["date"]] == [r["date"] for r in rows]
+    for name in ("principal_balance", "daily_markup", "accrued_markup", "rate_percent"):
+        assert body[name] == [r[name] for r in rows]
+
+    assert len(_ledger(session, loan, "columnar").body) < len(_ledger(session, loan, "json").body) / 2
+
+
+def test_arrow_stream_round_trips(session):
+    pa = pytest.importorskip("pyarrow")
+    loan = _mk_loan(session)
+    rows = compute_ledger(session, loan.bank_id, loan.id, date(2026, 1, 10), date(2026, 3, 31))
+
+    out = _ledger(session, loan, "arrow")
+    assert out.media_type == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(out.body).read_all()
+    assert table.column("date").to_pylist() == [r["date"] for r in rows]
+    assert table.column("accrued_markup").to_pylist() == [r["accrued_markup"] for r in rows]
+
+
+def test_format_errors(session, monkeypatch):
+    loan = _mk_loan(session)
+    with pytest.raises(HTTPException) as e:
+        _ledger(session, loan, "columnar", provisional=True)
+    assert e.value.detail == "ledger_format_not_provisional"
+
+    monkeypatch.setattr(ledger_routes, "arrow_available", lambda: False)
+    with pytest.raises(HTTPException) as e:
+        _ledger(session, loan, "arrow")
+    assert e.value.status_code == 501
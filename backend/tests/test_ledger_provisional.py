@@ -0,0 +1,101 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+import app.api.routes.ledger as ledger_routes
+import app.services.kibor_backfill as kb
+from app.services.kibor_rates import upsert_fixings
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(kb, "today_karachi", lambda: date(2026, 1, 20))
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_islamic_loan(session) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(
+        bank_id=bank.id,
+        name="Loan-A",
+        kibor_tenor_months=1,
+        additional_rate=0,
+        kibor_placeholder_rate_percent=10,
+        max_loan_amount=None,
+    )
+    session.add(loan)
+    session.flush()
+    session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=date(2026, 1, 5), category="principal", amount=1000))
+    session.add(Transaction(bank_id=bank.id, loan_id=loan.id, date=date(2026, 1, 8), category="principal", amount=1000))
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+    return loan
+
+
+def _ledger(session, loan, **kw):
+    return ledger_routes.ledger(
+        loan.bank_id,
+        loan.id,
+        Request({"type": "http", "headers": []}),
+        Response(),
+        start=date(2026, 1, 5),
+        end=date(2026, 1, 10),
+        provisional=True,
+        since=kw.get("since"),
+        fmt=kw.get("fmt", "json"),
+        s=session,
+        u={"sub": "tester"},
+    )
+
+
+def test_provisional_ledger_flags_rows_from_first_missing_anchor(session):
+    loan = _mk_islamic_loan(session)
+
+    out = _ledger(session, loan)
+
+    assert out.provisional is True
+    assert out.missing_dates == [date(2026, 1, 8)]
+    assert out.backfill is not None and out.backfill.status == "running"
+    flagged = [r.date for r in out.rows if r.provisional]
+    assert flagged == [date(2026, 1, 8), date(2026, 1, 9), date(2026, 1, 10)]
+    # The missing anchor uses the latest known rate until it is fetched.
+    assert out.rows[3].rate_percent == pytest.approx(12.0)
+
+
+def test_since_returns_only_corrected_rows_after_backfill(session):
+    loan = _mk_islamic_loan(session)
+    version = _ledger(session, loan).version
+
+    upsert_fixings(session, [{"effective_date": date(2026, 1, 8), "tenor_months": 1, "rate": 14}])
+    session.commit()
+
+    out = _ledger(session, loan, since=version)
+    assert out.provisional is False and out.version is None
+    assert [r.date for r in out.rows] == [date(2026, 1, 8), date(2026, 1, 9), date(2026, 1, 10)]
+    assert not any(r.provisional for r in out.rows)
+    assert out.rows[0].rate_percent == pytest.approx(13.0)
+
+
+def test_bad_version_is_rejected(session):
+    loan = _mk_islamic_loan(session)
+    with pytest.raises(HTTPException) as e:
+        _ledger(session, loan, since="not-a-token")
+    assert e.value.detail == "ledger_version_invalid"
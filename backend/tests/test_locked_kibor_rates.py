@@ -0,0 +1,102 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.schemas.rate import RateCreate
+from app.schemas.transaction import TxCreate
+import app.api.routes.rates as rate_routes
+import app.api.routes.transactions as tx_routes
+import app.services.ledger as ledger_service
+from app.services.kibor_rates import upsert_fixings
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(tx_routes, "ensure_started", lambda bank_id, loan_id, s=None: {"status": "done"})
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_loan(session, bank_type: str = "conventional") -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type=bank_type, additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=10)
+    session.add(loan)
+    session.commit()
+    return loan
+
+
+def _add(session, loan, d: date, amount: float = 1000):
+    return tx_routes.add_tx(loan.bank_id, loan.id, TxCreate(date=d, amount=amount), s=session, u={"sub": "t"})
+
+
+def _locked(session, tx_id: int):
+    v = session.execute(select(Transaction.kibor_rate_percent).where(Transaction.id == tx_id)).scalar_one()
+    return None if v is None else float(v)
+
+
+def test_rate_is_locked_at_insert_or_when_the_fixing_lands(session):
+    loan = _mk_loan(session)
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+
+    on_fixing = _add(session, loan, date(2026, 1, 5))
+    before_fixing = _add(session, loan, date(2026, 1, 7))
+    assert _locked(session, on_fixing.id) == 12.0
+    assert _locked(session, before_fixing.id) is None
+    # Unlocked drawdowns still show the latest earlier rate.
+    assert before_fixing.kibor_rate_percent == 12.0
+
+    upsert_fixings(session, [{"effective_date": date(2026, 1, 7), "tenor_months": 1, "rate": 12.5}])
+    session.commit()
+    assert _locked(session, before_fixing.id) == 12.5
+
+
+def test_overrides_replace_and_deletes_clear_the_locked_rate(session):
+    loan = _mk_loan(session)
+    tx = _add(session, loan, date(2026, 1, 5))
+    assert _locked(session, tx.id) is None
+
+    body = RateCreate(tenor_months=1, effective_date=date(2026, 1, 5), annual_rate_percent=11)
+    rate = rate_routes.add_rate(loan.bank_id, body, s=session, u={"sub": "t"})
+    assert _locked(session, tx.id) == 11.0
+
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+    rate_routes.delete_rate(loan.bank_id, rate.id, s=session, u={"sub": "t"})
+    assert _locked(session, tx.id) == 12.0
+
+
+def test_ledger_reads_the_locked_rate_without_rate_history(session, monkeypatch):
+    loan = _mk_loan(session, bank_type="islamic")
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+    tx = _add(session, loan, date(2026, 1, 5))
+    assert _locked(session, tx.id) == 12.0
+
+    def _no_history(*a, **kw):
+        raise AssertionError("rate history queried")
+
+    monkeypatch.setattr(ledger_service, "_prefetch_rates", _no_history)
+    rows = ledger_service.compute_ledger(session, loan.bank_id, loan.id, date(2026, 1, 5), date(2026, 1, 6))
+    assert rows[0]["rate_percent"] == pytest.approx(12.0)
+
+    monkeypatch.setattr(tx_routes, "rate_history", _no_history)
+    bank, loan_row = tx_routes._require_bank_loan(session, loan.bank_id, loan.id)
+    out = tx_routes._attach_kibor_rates(session, bank, loan_row, [session.get(Transaction, tx.id)])
+    assert out[0].kibor_rate_percent == 12.0
@@ -0,0 +1,101 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.loan import Loan
+from app.models.principal_total import LoanPrincipalTotal
+from app.models.transaction import Transaction
+from app.schemas.transaction import TxCreate
+import app.api.routes.loans as loan_routes
+import app.api.routes.transactions as tx_routes
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backfill(monkeypatch):
+    monkeypatch.setattr(tx_routes, "ensure_started", lambda bank_id, loan_id, s=None: {"status": "done"})
+    monkeypatch.setattr(loan_routes, "today_karachi", lambda: date(2026, 1, 20))
+
+
+def _mk_loan(session, max_loan=None) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="conventional", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(
+        bank_id=bank.id,
+        name="Loan-A",
+        kibor_tenor_months=1,
+        additional_rate=0,
+        kibor_placeholder_rate_percent=10,
+        max_loan_amount=max_loan,
+    )
+    session.add(loan)
+    session.commit()
+    return loan
+
+
+def _add(session, loan, d: date, amount: float, category: str = "principal"):
+    body = TxCreate(date=d, category=category, amount=amount)
+    return tx_routes.add_tx(loan.bank_id, loan.id, body, s=session, u={"sub": "tester"})
+
+
+def _stored_total(session, loan) -> Decimal:
+    return Decimal(str(session.execute(
+        select(LoanPrincipalTotal.principal_total).where(LoanPrincipalTotal.loan_id == loan.id)
+    ).scalar_one()))
+
+
+def test_total_is_seeded_from_history_and_tracks_writes(session):
+    loan = _mk_loan(session)
+    session.add(Transaction(bank_id=loan.bank_id, loan_id=loan.id, date=date(2026, 1, 2), category="principal", amount=400))
+    session.commit()
+
+    _add(session, loan, date(2026, 1, 5), 600)
+    _add(session, loan, date(2026, 1, 6), -50, category="markup")
+    repaid = _add(session, loan, date(2026, 1, 7), -250)
+    assert _stored_total(session, loan) == Decimal("750")
+
+    tx_routes.delete_tx(loan.bank_id, loan.id, repaid.id, s=session, u={"sub": "tester"})
+    assert _stored_total(session, loan) == Decimal("1000")
+
+
+def test_limit_is_checked_against_the_stored_total(session):
+    loan = _mk_loan(session, max_loan=1000)
+    _add(session, loan, date(2026, 1, 5), 900)
+
+    with pytest.raises(HTTPException) as e:
+        _add(session, loan, date(2026, 1, 6), 200)
+    assert e.value.detail == "max_loan_exceeded"
+    assert _stored_total(session, loan) == Decimal("900")
+
+    _add(session, loan, date(2026, 1, 6), -300)
+    _add(session, loan, date(2026, 1, 7), 400)
+    assert _stored_total(session, loan) == Decimal("1000")
+
+
+def test_balance_excludes_future_dated_principal(session):
+    loan = _mk_loan(session)
+    _add(session, loan, date(2026, 1, 5), 1000)
+    _add(session, loan, date(2026, 1, 25), 500)
+
+    out = loan_routes.loan_balance(loan.bank_id, loan.id, s=session, u={"sub": "tester"})
+    assert out.principal_balance == pytest.approx(1000)
+    assert _stored_total(session, loan) == Decimal("1500")
@@ -0,0 +1,184 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.loan_tranche import LoanTranche
+from app.models.transaction import Transaction
+from app.schemas.transaction import TxCreate
+import app.api.routes.tranches as tranche_routes
+import app.api.routes.transactions as tx_routes
+import app.services.ledger as ledger_service
+from app.services.kibor_rates import upsert_fixings
+from app.services.tranche_book import rebuild_tranches
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    monkeypatch.setattr(tx_routes, "ensure_started", lambda bank_id, loan_id, s=None: {"status": "done"})
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_loan(session, bank_type: str = "conventional") -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type=bank_type, additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=10)
+    session.add(loan)
+    session.commit()
+    return loan
+
+
+def _add(session, loan, d: date, amount: float):
+    return tx_routes.add_tx(loan.bank_id, loan.id, TxCreate(date=d, amount=amount), s=session, u={"sub": "t"})
+
+
+def _book(session, loan) -> list[tuple]:
+    session.expire_all()
+    rows = session.execute(
+        select(LoanTranche).where(LoanTranche.loan_id == loan.id).order_by(LoanTranche.start_date, LoanTranche.source_tx_id)
+    ).scalars()
+    return [
+        (
+            r.source_tx_id,
+            r.start_date,
+            float(r.original_amount),
+            float(r.remaining_amount),
+            None if r.locked_rate_percent is None else float(r.locked_rate_percent),
+            r.closed_date,
+        )
+        for r in rows
+    ]
+
+
+def _rebuilt(session, loan) -> list[tuple]:
+    rebuild_tranches(session, loan.bank_id, loan.id)
+    session.commit()
+    return _book(session, loan)
+
+
+def test_drawdowns_open_tranches_and_repayments_close_them_oldest_first(session):
+    loan = _mk_loan(session)
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+
+    a = _add(session, loan, date(2026, 1, 5), 1000)
+    b = _add(session, loan, date(2026, 1, 10), 500)
+    _add(session, loan, date(2026, 2, 1), -1200)
+
+    assert _book(session, loan) == [
+        (a.id, date(2026, 1, 5), 1000.0, 0.0, 12.0, date(2026, 2, 1)),
+        (b.id, date(2026, 1, 10), 500.0, 300.0, None, None),
+    ]
+
+    open_rows = session.execute(
+        select(LoanTranche.source_tx_id).where(LoanTranche.loan_id == loan.id, LoanTranche.closed_date.is_(None))
+    ).scalars().all()
+    assert open_rows == [b.id]
+
+    # A fixing landing later locks the open tranche's rate as well.
+    upsert_fixings(session, [{"effective_date": date(2026, 1, 10), "tenor_months": 1, "rate": 12.5}])
+    session.commit()
+    assert _book(session, loan)[1][4] == 12.5
+
+
+def test_back_dated_and_deleted_transactions_match_a_full_rebuild(session):
+    loan = _mk_loan(session)
+    _add(session, loan, date(2026, 1, 5), 1000)
+    _add(session, loan, date(2026, 3, 1), 500)
+    _add(session, loan, date(2026, 3, 10), -700)
+    # Lands before the repayment, so the book is replayed.
+    early = _add(session, loan, date(2026, 1, 1), 400)
+    incremental = _book(session, loan)
+    assert incremental == _rebuilt(session, loan)
+    assert [r[3] for r in incremental] == [0.0, 700.0, 500.0]
+
+    # Untouched drawdown: only its own row goes.
+    untouched = _add(session, loan, date(2026, 4, 1), 250)
+    tx_routes.delete_tx(loan.bank_id, loan.id, untouched.id, s=session, u={"sub": "t"})
+    assert _book(session, loan) == incremental
+
+    # A repaid drawdown moves the repayment onto later tranches.
+    tx_routes.delete_tx(loan.bank_id, loan.id, early.id, s=session, u={"sub": "t"})
+    after = _book(session, loan)
+    assert after == _rebuilt(session, loan)
+    assert [r[3] for r in after] == [300.0, 500.0]
+
+
+def test_open_tranches_match_the_ledger_replay(session):
+    loan = _mk_loan(session)
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+    for d, amount in [
+        (date(2026, 1, 5), 1000),
+        (date(2026, 2, 1), 600),
+        (date(2026, 2, 10), -1300),
+        (date(2026, 1, 20), 250),
+        (date(2026, 3, 1), -100),
+    ]:
+        _add(session, loan, d, amount)
+
+    txs = session.execute(
+        select(Transaction)
+        .where(Transaction.loan_id == loan.id, Transaction.category == "principal")
+        .order_by(Transaction.date, Transaction.id)
+    ).scalars()
+    replayed: list = []
+    for t in txs:
+        rate = None if t.kibor_rate_percent is None else Decimal(str(t.kibor_rate_percent))
+        ledger_service._apply_principal_tx(replayed, t.date, Decimal(str(t.amount)), base_rate_percent=rate)
+
+    open_rows = [(r[1], r[3], r[4]) for r in _book(session, loan) if r[5] is None]
+    assert open_rows == [
+        (tr.start_date, float(tr.amount), None if tr.base_rate_percent is None else float(tr.base_rate_percent))
+        for tr in replayed
+    ]
+    assert open_rows == [(date(2026, 2, 1), 450.0, None)]
+
+    rows = ledger_service.compute_ledger(session, loan.bank_id, loan.id, date(2026, 3, 1), date(2026, 3, 1))
+    assert rows[-1]["principal_balance"] == sum(r[1] for r in open_rows)
+
+
+def test_ledger_seeds_from_the_book_and_falls_back_when_it_disagrees(session, monkeypatch):
+    loan = _mk_loan(session)
+    session.add(KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=12))
+    session.commit()
+    a = _add(session, loan, date(2026, 1, 5), 1000)
+    _add(session, loan, date(2026, 2, 1), 600)
+    _add(session, loan, date(2026, 2, 10), -1300)
+    window = (date(2026, 1, 1), date(2026, 3, 31))
+
+    txs = session.execute(select(Transaction).where(Transaction.loan_id == loan.id)).scalars().all()
+    assert ledger_service._book_tranches(session, loan.id, window[1], txs) is not None
+    seeded = ledger_service.compute_ledger(session, loan.bank_id, loan.id, *window)
+
+    # A drawdown the book never saw: the ledger ignores the book.
+    session.execute(LoanTranche.__table__.delete().where(LoanTranche.source_tx_id == a.id))
+    session.commit()
+    warnings = []
+    monkeypatch.setattr(ledger_service.logging, "warning", lambda *args: warnings.append(args))
+    txs = session.execute(select(Transaction).where(Transaction.loan_id == loan.id)).scalars().all()
+    assert ledger_service._book_tranches(session, loan.id, window[1], txs) is None
+    assert ledger_service.compute_ledger(session, loan.bank_id, loan.id, *window) == seeded
+    assert warnings
+
+    # The repair route puts the book back.
+    out = tranche_routes.rebuild(loan.bank_id, loan.id, s=session, u={"sub": "admin"})
+    assert out == {"tranches": 2}
+    assert _book(session, loan) == _rebuilt(session, loan)
+    open_rows = tranche_routes.list_tranches(loan.bank_id, loan.id, include_closed=False, s=session, u={"sub": "t"})
+    assert [(r.start_date, float(r.remaining_amount)) for r in open_rows] == [(date(2026, 2, 1), 300.0)]
@@ -0,0 +1,162 @@
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import openpyxl
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import UploadFile
+
+from app.db.base import Base
+from app.models.audit_log import AuditLog
+from app.models.bank import Bank
+from app.models.kibor_fixing import KiborFixing
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+import app.api.routes.transactions as tx_routes
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+@pytest.fixture()
+def started(monkeypatch):
+    calls = []
+
+    def _fake_ensure_started(bank_id, loan_id, s=None):
+        calls.append((bank_id, loan_id))
+        return {"status": "running"}
+
+    monkeypatch.setattr(tx_routes, "ensure_started", _fake_ensure_started)
+    return calls
+
+
+def _mk_loan(session, max_loan=None) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="conventional", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(
+        bank_id=bank.id,
+        name="Loan-A",
+        kibor_tenor_months=1,
+        additional_rate=0,
+        kibor_placeholder_rate_percent=0,
+        max_loan_amount=max_loan,
+    )
+    session.add(loan)
+    session.commit()
+    return loan
+
+
+def _upload(session, loan, name: str, data: bytes):
+    return tx_routes.bulk_add_tx(
+        loan.bank_id,
+        loan.id,
+        file=UploadFile(io.BytesIO(data), filename=name),
+        s=session,
+        u={"sub": "tester"},
+    )
+
+
+def test_csv_rows_are_inserted_with_one_backfill_and_one_audit(session, started):
+    loan = _mk_loan(session)
+    csv_data = (
+        "date,category,amount,note\n"
+        "2026-01-05,principal,1000,first\n"
+        "06-Jan-2026,markup,\"-12.50\",\n"
+        "2026-01-09,principal,500,\n"
+    ).encode()
+
+    out = _upload(session, loan, "statement.csv", csv_data)
+
+    assert out.inserted == 3
+    assert (out.first_date, out.last_date) == (date(2026, 1, 5), date(2026, 1, 9))
+    assert out.principal_total == pytest.approx(1500) and out.markup_total == pytest.approx(-12.5)
+    assert out.kibor_rate_pending is True
+    assert started == [(loan.bank_id, loan.id)]
+
+    amounts = session.execute(select(Transaction.amount).order_by(Transaction.date)).scalars().all()
+    assert [Decimal(a) for a in amounts] == [Decimal("1000"), Decimal("-12.5"), Decimal("500")]
+    audits = session.execute(select(AuditLog)).scalars().all()
+    assert [a.action for a in audits] == ["tx.bulk_create"]
+
+
+def test_json_array_is_accepted(session, started):
+    loan = _mk_loan(session)
+    data = json.dumps([{"date": "2026-01-05", "amount": 10, "category": "markup"}]).encode()
+    out = _upload(session, loan, "rows.json", data)
+    assert out.inserted == 1 and started == []
+
+
+def test_xlsx_rows_are_accepted(session, started):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Date", "Amount", "Note"])
+    ws.append([date(2026, 1, 5), 250, "drawdown"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    loan = _mk_loan(session)
+    out = _upload(session, loan, "rows.xlsx", buf.getvalue())
+    assert out.inserted == 1 and out.principal_total == pytest.approx(250)
+
+
+def test_invalid_rows_and_running_limit_reject_the_whole_file(session, started):
+    loan = _mk_loan(session, max_loan=1000)
+    csv_data = (
+        "date,amount\n"
+        "2026-01-05,800\n"
+        "2026-01-06,-300\n"
+        "2026-01-07,400\n"
+        "2026-01-08,200\n"
+        "not-a-date,10\n"
+    ).encode()
+
+    with pytest.raises(HTTPException) as e:
+        _upload(session, loan, "rows.csv", csv_data)
+
+    detail = e.value.detail
+    assert detail["code"] == "tx_bulk_invalid"
+    assert [(err["row"], err["error"]) for err in detail["errors"]][0] == (4, "max_loan_exceeded")
+    assert detail["errors"][1]["row"] == 5
+    assert session.execute(select(Transaction)).first() is None
+
+
+def test_limit_error_points_at_the_source_row_after_an_unparsed_one(session, started):
+    loan = _mk_loan(session, max_loan=1000)
+    csv_data = "date,amount\nbad,1\n2026-01-05,800\n2026-01-06,400\n".encode()
+
+    with pytest.raises(HTTPException) as e:
+        _upload(session, loan, "rows.csv", csv_data)
+
+    errors = e.value.detail["errors"]
+    assert [(err["row"], err["error"] == "max_loan_exceeded") for err in errors] == [(1, False), (3, True)]
+
+
+def test_placeholder_is_filled_from_the_earliest_drawdown(session, started):
+    loan = _mk_loan(session)
+    session.add_all(
+        [
+            KiborFixing(effective_date=date(2026, 1, 5), tenor_months=1, rate=11),
+            KiborFixing(effective_date=date(2026, 1, 9), tenor_months=1, rate=12),
+        ]
+    )
+    session.commit()
+
+    _upload(session, loan, "rows.csv", b"date,amount\n2026-01-09,500\n2026-01-05,1000\n")
+
+    session.expire_all()
+    assert float(session.get(Loan, loan.id).kibor_placeholder_rate_percent) == 11.0
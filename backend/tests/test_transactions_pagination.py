@@ -0,0 +1,109 @@
+import json
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.bank import Bank
+from app.models.loan import Loan
+from app.models.transaction import Transaction
+from app.schemas.transaction import TxOut
+from app.api.routes.transactions import list_transactions
+from app.core.config import settings
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _mk_loan_with_txs(session, n: int) -> Loan:
+    bank = Bank(name=f"TestBank-{uuid4().hex[:10]}", bank_type="islamic", additional_rate=None)
+    session.add(bank)
+    session.flush()
+    loan = Loan(bank_id=bank.id, name="Loan-A", kibor_tenor_months=1, additional_rate=0, kibor_placeholder_rate_percent=10)
+    session.add(loan)
+    session.flush()
+    # Two entries per day so pages split inside a date.
+    for i in range(n):
+        session.add(
+            Transaction(
+                bank_id=bank.id,
+                loan_id=loan.id,
+                date=date(2026, 1, 1) + timedelta(days=i // 2),
+                category="markup" if i % 2 else "principal",
+                amount=10,
+            )
+        )
+    session.commit()
+    return loan
+
+
+def _page(session, loan, **kw):
+    resp = Response()
+    out = list_transactions(
+        loan.bank_id,
+        loan.id,
+        Request({"type": "http", "headers": []}),
+        resp,
+        start=kw.get("start"),
+        end=None,
+        limit=kw.get("limit"),
+        after=kw.get("after"),
+        s=session,
+        u={"sub": "tester"},
+    )
+    # The list is served on the JSON fast path; it must still parse as TxOut.
+    return [TxOut(**r) for r in json.loads(out.body)], out.headers.get("X-Next-Cursor")
+
+
+def test_pages_walk_date_id_descending_without_gaps(session):
+    loan = _mk_loan_with_txs(session, 7)
+    everything, cursor = _page(session, loan)
+    assert cursor is None and len(everything) == 7
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = _page(session, loan, limit=3, after=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+        assert len(page) == 3
+
+    assert [(t.date, t.id) for t in seen] == [(t.date, t.id) for t in everything]
+
+
+def test_omitted_limit_pages_at_the_default_size(session, monkeypatch):
+    monkeypatch.setattr(settings, "page_size_default", 4)
+    loan = _mk_loan_with_txs(session, 7)
+    page, cursor = _page(session, loan)
+    assert len(page) == 4 and cursor is not None
+    page, cursor = _page(session, loan, after=cursor)
+    assert len(page) == 3 and cursor is None
+
+
+def test_pagination_respects_date_window(session):
+    loan = _mk_loan_with_txs(session, 8)
+    page, cursor = _page(session, loan, start=date(2026, 1, 3), limit=3)
+    assert [t.date for t in page] == [date(2026, 1, 4), date(2026, 1, 4), date(2026, 1, 3)]
+    page, cursor = _page(session, loan, start=date(2026, 1, 3), limit=3, after=cursor)
+    assert [t.date for t in page] == [date(2026, 1, 3)] and cursor is None
+
+
+def test_bad_cursor_is_rejected(session):
+    loan = _mk_loan_with_txs(session, 1)
+    with pytest.raises(HTTPException) as e:
+        _page(session, loan, limit=2, after="%%%")
+    assert e.value.detail == "cursor_invalid"
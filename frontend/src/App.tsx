@@ -433,29 +433,22 @@ export default function App() {
   useEffect(() => {
     if (!exportBackfillStatus || exportBackfillStatus.status !== "running") return;
 
-    let cancelled = false;
-    const id = window.setInterval(async () => {
-      try {
-        const st = await api.getBackfillStatus(selectedBankId, selectedLoanId);
-        if (cancelled) return;
+    const ctrl = new AbortController();
+    api
+      .watchBackfill(selectedBankId, selectedLoanId, setExportBackfillStatus, ctrl.signal)
+      .then((st) => {
+        if (ctrl.signal.aborted) return;
         setExportBackfillStatus(st);
-
-        if (st.status !== "running") {
-          window.clearInterval(id);
-          if (!cancelled && exportPendingRef.current && (st.status === "done" || st.status === "idle")) {
-            exportPendingRef.current = false;
-            void exportReport();
-          }
+        if (exportPendingRef.current && st.status === "done") {
+          exportPendingRef.current = false;
+          void exportReport();
         }
-      } catch {
+      })
+      .catch(() => {
         // ignore
-      }
-    }, 1000);
+      });
 
-    return () => {
-      cancelled = true;
-      window.clearInterval(id);
-    };
+    return () => ctrl.abort();
   }, [exportBackfillStatus?.status, selectedBankId, selectedLoanId, scopeStart, scopeEnd]);
 
   function toISODate(d: Date) {
@@ -526,34 +519,30 @@ export default function App() {
   }, [tokenReady, selectedBankId]);
 
   useEffect(() => {
-    let cancelled = false;
-    let id: number | null = null;
+    const ctrl = new AbortController();
 
-    async function tick() {
+    async function load() {
       if (!tokenReady || !selectedBankId || !selectedLoanId) {
         setScopeBackfillStatus(null);
         return;
       }
       try {
         const st = await api.getBackfillStatus(selectedBankId, selectedLoanId);
-        if (cancelled) return;
+        if (ctrl.signal.aborted) return;
         setScopeBackfillStatus(st);
+        if (st.status !== "running") return;
+
+        const final = await api.watchBackfill(selectedBankId, selectedLoanId, setScopeBackfillStatus, ctrl.signal);
+        if (!ctrl.signal.aborted) setScopeBackfillStatus(final);
       } catch {
-        if (cancelled) return;
+        if (ctrl.signal.aborted) return;
         setScopeBackfillStatus(null);
       }
     }
 
-    void tick();
-    if (tokenReady && selectedBankId && selectedLoanId) {
-      id = window.setInterval(tick, 5000);
-    }
-
-    return () => {
-      cancelled = true;
-      if (id) window.clearInterval(id);
-    };
-  }, [tokenReady, selectedBankId, selectedLoanId]);
+    void load();
+    return () => ctrl.abort();
+  }, [tokenReady, selectedBankId, selectedLoanId, refreshTick]);
 
   const selectedBank = useMemo(() => banks.find((b) => b.id === selectedBankId) || null, [banks, selectedBankId]);
   const selectedLoan = useMemo(() => loans.find((l) => l.id === selectedLoanId) || null, [loans, selectedLoanId]);
@@ -1396,25 +1385,38 @@ function Ledger(props: { bankId: number; loanId: number; start: string; end: str
       ? Math.min(100, Math.round((backfillStatus.processed_days / backfillStatus.total_days) * 100))
       : 0;
 
+  const ledgerVersionRef = useRef<string | null>(null);
+
   async function refresh() {
     props.onError("");
     setLoading(true);
     try {
       setBackfillStatus(null);
-      const out = await api.ledger(props.bankId, props.loanId, props.start, props.end);
-      setRows(out);
+      const out = await api.ledgerProvisional(props.bankId, props.loanId, props.start, props.end);
+      ledgerVersionRef.current = out.version ?? null;
+      setRows(out.rows);
+      if (out.provisional && out.backfill) setBackfillStatus(out.backfill);
     } catch (e: any) {
-      if (e?.name === "BackfillRunningError") {
-        setRows([]);
-        setBackfillStatus(e.status);
-      } else {
-        props.onError(e?.message || "failed_to_load_ledger");
-      }
+      props.onError(e?.message || "failed_to_load_ledger");
     } finally {
       setLoading(false);
     }
   }
 
+  async function refreshCorrected() {
+    const since = ledgerVersionRef.current;
+    if (!since) return refresh();
+    try {
+      const out = await api.ledgerProvisional(props.bankId, props.loanId, props.start, props.end, since);
+      ledgerVersionRef.current = out.version ?? null;
+      const from = out.rows.length ? out.rows[0].date : null;
+      setRows((prev) => (from ? [...prev.filter((r) => r.date < from), ...out.rows] : prev));
+      if (out.provisional && out.backfill) setBackfillStatus(out.backfill);
+    } catch (e: any) {
+      props.onError(e?.message || "failed_to_load_ledger");
+    }
+  }
+
   useEffect(() => {
     if (!props.bankId || !props.loanId) {
       setRows([]);
@@ -1427,28 +1429,21 @@ function Ledger(props: { bankId: number; loanId: number; start: string; end: str
   useEffect(() => {
     if (!backfillStatus || backfillStatus.status !== "running") return;
 
-    let cancelled = false;
-    const id = window.setInterval(async () => {
-      try {
-        const st = await api.getBackfillStatus(props.bankId, props.loanId);
-        if (cancelled) return;
+    const ctrl = new AbortController();
+    api
+      .watchBackfill(props.bankId, props.loanId, setBackfillStatus, ctrl.signal)
+      .then((st) => {
+        if (ctrl.signal.aborted) return;
         setBackfillStatus(st);
-
-        if (st.status !== "running") {
-          window.clearInterval(id);
-          if (st.status === "done" || st.status === "idle") {
-            refresh();
-          }
+        if (st.status === "done") {
+          refreshCorrected();
         }
-      } catch {
+      })
+      .catch(() => {
         // ignore
-      }
-    }, 1000);
+      });
 
-    return () => {
-      cancelled = true;
-      window.clearInterval(id);
-    };
+    return () => ctrl.abort();
   }, [backfillStatus?.status, props.loanId, start, end]);
 
   function fmtCompactMoney(v: number) {
@@ -1475,7 +1470,7 @@ function Ledger(props: { bankId: number; loanId: number; start: string; end: str
             <div>
               <div className="text-sm font-semibold text-slate-900">Backfilling KIBOR rates…</div>
               <div className="mt-1 text-xs text-slate-600">
-                This can take 1–2 minutes for older backdated debits. You can keep using the app while it runs.
+                This can take 1–2 minutes for older backdated debits. Rates marked ~ are estimates until it finishes.
               </div>
               <div className="mt-2 text-xs tabular-nums text-slate-600">
                 {backfillStatus.processed_days} / {backfillStatus.total_days} business days
@@ -1617,7 +1612,15 @@ function Ledger(props: { bankId: number; loanId: number; start: string; end: str
                     <Td className="text-right font-mono">{fmtMoney(r.principal_balance)}</Td>
                     <Td className="text-right font-mono">{fmtMoney(r.daily_markup)}</Td>
                     <Td className="text-right font-mono">{fmtMoney(r.accrued_markup)}</Td>
-                    <Td className="text-right font-mono">{fmtRate(r.rate_percent)}%</Td>
+                    <Td className="text-right font-mono">
+                      {r.provisional ? (
+                        <span className="text-amber-700" title="Estimated until the KIBOR backfill completes">
+                          ~{fmtRate(r.rate_percent)}%
+                        </span>
+                      ) : (
+                        <>{fmtRate(r.rate_percent)}%</>
+                      )}
+                    </Td>
                   </tr>
                 );
               })
@@ -1689,12 +1692,39 @@ function Transactions(props: {
   const isAdmin = props.role === "admin";
   const [addingTx, setAddingTx] = useState(false);
 
+  const TX_PAGE_SIZE = 200;
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+
   async function refresh() {
     props.onError("");
     setLoading(true);
     try {
-      const out = await api.listTxs(props.bankId, props.loanId, props.start, props.end);
-      setRows(out);
+      const out = await api.listTxsPage(props.bankId, props.loanId, {
+        start: props.start,
+        end: props.end,
+        limit: TX_PAGE_SIZE,
+      });
+      setRows(out.rows);
+      setNextCursor(out.nextCursor);
+    } catch (e: any) {
+      props.onError(e?.message || "failed_to_load_transactions");
+    } finally {
+      setLoading(false);
+    }
+  }
+
+  async function loadMore() {
+    if (!nextCursor) return;
+    setLoading(true);
+    try {
+      const out = await api.listTxsPage(props.bankId, props.loanId, {
+        start: props.start,
+        end: props.end,
+        limit: TX_PAGE_SIZE,
+        after: nextCursor,
+      });
+      setRows((prev) => [...prev, ...out.rows]);
+      setNextCursor(out.nextCursor);
     } catch (e: any) {
       props.onError(e?.message || "failed_to_load_transactions");
     } finally {
@@ -1709,28 +1739,21 @@ function Transactions(props: {
   useEffect(() => {
     if (!backfillStatus || backfillStatus.status !== "running") return;
 
-    let cancelled = false;
-    const id = window.setInterval(async () => {
-      try {
-        const st = await api.getBackfillStatus(props.bankId, props.loanId);
-        if (cancelled) return;
+    const ctrl = new AbortController();
+    api
+      .watchBackfill(props.bankId, props.loanId, setBackfillStatus, ctrl.signal)
+      .then((st) => {
+        if (ctrl.signal.aborted) return;
         setBackfillStatus(st);
-
-        if (st.status !== "running") {
-          window.clearInterval(id);
-          if (st.status === "done" || st.status === "idle") {
-            refresh();
-          }
+        if (st.status === "done") {
+          refresh();
         }
-      } catch {
+      })
+      .catch(() => {
         // ignore
-      }
-    }, 1000);
+      });
 
-    return () => {
-      cancelled = true;
-      window.clearInterval(id);
-    };
+    return () => ctrl.abort();
   }, [backfillStatus?.status, props.bankId, props.loanId, start, end]);
 
 
@@ -1787,14 +1810,18 @@ function Transactions(props: {
                 willScrapeKibor = category === "principal" && signed > 0;
                 if (willScrapeKibor) props.onKiborScrapeBusy?.(true);
 
-                await api.addTx(props.bankId, props.loanId, {
+                const added = await api.addTx(props.bankId, props.loanId, {
                   date,
                   category,
                   amount: signed,
                   note: note.trim() ? note.trim() : null,
                 });
 
-                toast.success("Transaction added.");
+                if (added.kibor_rate_pending) {
+                  toast.success("Transaction added. KIBOR rate is being fetched in the background.");
+                } else {
+                  toast.success("Transaction added.");
+                }
                 setAmount("");
                 setNote("");
                 await refresh();
@@ -1900,6 +1927,13 @@ function Transactions(props: {
             )}
           </tbody>
         </Table>
+        {nextCursor ? (
+          <div className="mt-3 flex justify-center">
+            <Button size="sm" onClick={loadMore} disabled={loading}>
+              Load more
+            </Button>
+          </div>
+        ) : null}
       </div>
     </div>
   );
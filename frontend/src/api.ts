@@ -21,12 +21,13 @@ export type LoanOut = {
 };
 
 export type RateOut = {
-  id: number;
+  id: number; // negative for KIBOR fixings, which cannot be deleted
   bank_id: number;
   tenor_months: number;
   effective_date: string; // YYYY-MM-DD
   annual_rate_percent: number;
   created_at?: string;
+  source?: "override" | "fixing";
 };
 
 export type LoanDateBoundsOut = { min_date: string | null; max_date: string | null };
@@ -48,6 +49,7 @@ export type TxOut = {
   category: TxCategory;
   amount: number;
   kibor_rate_percent?: number | null;
+  kibor_rate_pending?: boolean;
   note?: string | null;
   created_at: string;
 };
@@ -58,6 +60,7 @@ export type LedgerRow = {
   daily_markup: number;
   accrued_markup: number;
   rate_percent: number;
+  provisional?: boolean;
 };
 
 export type BackfillStatus = {
@@ -68,6 +71,14 @@ export type BackfillStatus = {
   message?: string | null;
 };
 
+export type ProvisionalLedgerOut = {
+  rows: LedgerRow[];
+  provisional: boolean;
+  missing_dates: string[];
+  version?: string | null;
+  backfill?: BackfillStatus | null;
+};
+
 export class BackfillRunningError extends Error {
   status: BackfillStatus;
   constructor(status: BackfillStatus) {
@@ -142,6 +153,31 @@ async function request<T>(path: string, init: RequestInit = {}) {
   return (await res.json()) as T;
 }
 
+// A keyset-paged list: the rows plus the X-Next-Cursor to pass back as
+// `after`, null on the last page.
+async function requestPage<T>(path: string) {
+  const url = `${String(API_URL).replace(/\/$/, "")}${path}`;
+  const token = getToken();
+
+  let res: Response;
+  try {
+    res = await fetch(url, { headers: token ? { Authorization: `Bearer ${token}` } : undefined });
+  } catch (e: any) {
+    throw new Error(`NETWORK_ERROR: ${e?.message || "request_failed"} (${url})`);
+  }
+
+  if (!res.ok) {
+    let msg = res.statusText || `HTTP_${res.status}`;
+    try {
+      const j = await res.json();
+      msg = j?.detail || j?.message || msg;
+    } catch {}
+    throw new Error(`${msg} (${url})`);
+  }
+
+  return { rows: (await res.json()) as T[], nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 export async function login(username: string, password: string) {
   const url = `${String(API_URL).replace(/\/$/, "")}/auth/login`;
   let res: Response;
@@ -190,8 +226,18 @@ export async function listLoans(bankId: number) {
   return await request<LoanOut[]>(`/banks/${bankId}/loans`);
 }
 
+// Every rate for the bank, newest effective date first, walked page by page.
 export async function listRates(bankId: number) {
-  return await request<RateOut[]>(`/banks/${bankId}/rates`);
+  const out: RateOut[] = [];
+  let after: string | null = null;
+  do {
+    const qs = new URLSearchParams({ limit: "1000" });
+    if (after) qs.set("after", after);
+    const page: { rows: RateOut[]; nextCursor: string | null } = await requestPage<RateOut>(`/banks/${bankId}/rates?${qs.toString()}`);
+    out.push(...page.rows);
+    after = page.nextCursor;
+  } while (after);
+  return out;
 }
 
 export async function loanDateBounds(bankId: number, loanId: number) {
@@ -219,12 +265,30 @@ export async function loanBalance(bankId: number, loanId: number) {
   return await request<LoanBalanceOut>(`/banks/${bankId}/loans/${loanId}/balance`);
 }
 
+// Every transaction in the window, newest first, walked page by page.
 export async function listTxs(bankId: number, loanId: number, start?: string, end?: string) {
-  const qs = new URLSearchParams();
-  if (start) qs.set("start", start);
-  if (end) qs.set("end", end);
-  const q = qs.toString() ? `?${qs.toString()}` : "";
-  return await request<TxOut[]>(`/banks/${bankId}/loans/${loanId}/transactions${q}`);
+  const out: TxOut[] = [];
+  let after: string | null = null;
+  do {
+    const page: { rows: TxOut[]; nextCursor: string | null } = await listTxsPage(bankId, loanId, { start, end, limit: 1000, after });
+    out.push(...page.rows);
+    after = page.nextCursor;
+  } while (after);
+  return out;
+}
+
+// One page of transactions, newest first. Pass nextCursor back as `after` to
+// fetch the following page; it is null on the last page.
+export async function listTxsPage(
+  bankId: number,
+  loanId: number,
+  opts: { start?: string; end?: string; limit: number; after?: string | null }
+) {
+  const qs = new URLSearchParams({ limit: String(opts.limit) });
+  if (opts.start) qs.set("start", opts.start);
+  if (opts.end) qs.set("end", opts.end);
+  if (opts.after) qs.set("after", opts.after);
+  return await requestPage<TxOut>(`/banks/${bankId}/loans/${loanId}/transactions?${qs.toString()}`);
 }
 
 export async function addTx(
@@ -247,9 +311,82 @@ export async function startBackfill(bankId: number, loanId: number) {
   return await request<BackfillStatus>(`/banks/${bankId}/loans/${loanId}/kibor-backfill/start`, { method: "POST" });
 }
 
+// Follows the backfill SSE stream until the job finishes. Progress events go to
+// onProgress; the returned promise resolves with the final status ("done" once
+// the ledger is ready, or "error").
+export async function watchBackfill(
+  bankId: number,
+  loanId: number,
+  onProgress: (st: BackfillStatus) => void,
+  signal?: AbortSignal
+): Promise<BackfillStatus> {
+  const token = getToken();
+  const url = `${String(API_URL).replace(/\/$/, "")}/banks/${bankId}/loans/${loanId}/kibor-backfill/events`;
+  const res = await fetch(url, {
+    headers: { Accept: "text/event-stream", ...(token ? { Authorization: `Bearer ${token}` } : {}) },
+    signal,
+  });
+  if (!res.ok || !res.body) throw new Error(`${res.statusText || `HTTP_${res.status}`} (${url})`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+
+    let sep: number;
+    while ((sep = buf.indexOf("\n\n")) >= 0) {
+      const chunk = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of chunk.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (!data) continue; // keepalive
+
+      const st = JSON.parse(data) as BackfillStatus;
+      if (event === "done") return { ...st, status: "done" };
+      if (event === "error") return st;
+      onProgress(st);
+    }
+  }
+  throw new Error(`backfill_stream_closed (${url})`);
+}
+
+type LedgerColumns = {
+  base_date: string;
+  date: number[];
+  principal_balance: number[];
+  daily_markup: number[];
+  accrued_markup: number[];
+  rate_percent: number[];
+};
+
+function ledgerRowsFromColumns(c: LedgerColumns): LedgerRow[] {
+  const [y, m, d] = c.base_date.split("-").map(Number);
+  const base = Date.UTC(y, m - 1, d);
+  const rows: LedgerRow[] = new Array(c.date.length);
+  for (let i = 0; i < c.date.length; i++) {
+    rows[i] = {
+      date: new Date(base + c.date[i] * 86400000).toISOString().slice(0, 10),
+      principal_balance: c.principal_balance[i],
+      daily_markup: c.daily_markup[i],
+      accrued_markup: c.accrued_markup[i],
+      rate_percent: c.rate_percent[i],
+    };
+  }
+  return rows;
+}
+
 export async function ledger(bankId: number, loanId: number, start: string, end: string) {
   const token = getToken();
-  const qs = new URLSearchParams({ start, end });
+  // Columnar keeps multi-year ledgers small on the wire; rows are rebuilt here.
+  const qs = new URLSearchParams({ start, end, format: "columnar" });
   const res = await fetch(`${API_URL}/banks/${bankId}/loans/${loanId}/ledger?${qs.toString()}`, {
     headers: token ? { Authorization: `Bearer ${token}` } : undefined,
   });
@@ -268,7 +405,7 @@ export async function ledger(bankId: number, loanId: number, start: string, end:
     throw new Error(msg);
   }
 
-  return (await res.json()) as LedgerRow[];
+  return ledgerRowsFromColumns((await res.json()) as LedgerColumns);
 }
 
 export async function downloadReport(bankId: number, loanId: number, start: string, end: string, filename?: string) {
@@ -346,4 +483,13 @@ export async function listAudit(q: AuditQuery = {}) {
   }
 
   return (await res.json()) as AuditOut[];
-}
\ No newline at end of file
+}
+
+// Returns rows right away while KIBOR is still backfilling; rows that used an
+// estimated rate are flagged. Pass the returned version as `since` afterwards
+// to fetch only the rows that changed.
+export async function ledgerProvisional(bankId: number, loanId: number, start: string, end: string, since?: string | null) {
+  const qs = new URLSearchParams({ start, end, provisional: "true" });
+  if (since) qs.set("since", since);
+  return await request<ProvisionalLedgerOut>(`/banks/${bankId}/loans/${loanId}/ledger?${qs.toString()}`);
+}